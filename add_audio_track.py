@@ -1,14 +1,17 @@
 # 导入必要的模块
 import os
 import pyJianYingDraft as draft
+from pyJianYingDraft.metadata import lookup_effect
 import time
 from util import generate_draft_url, is_windows_path, url_to_hash
 import re
 from typing import Optional, Dict, Tuple, List
-from pyJianYingDraft import exceptions, Audio_scene_effect_type, Tone_effect_type, Speech_to_song_type, CapCut_Voice_filters_effect_type,CapCut_Voice_characters_effect_type,CapCut_Speech_to_song_effect_type, trange
+from pyJianYingDraft import exceptions, trange
 from create_draft import get_or_create_draft
+from draft_cache import locked_draft
 from settings.local import IS_CAPCUT_ENV
 
+@locked_draft
 def add_audio_track(
     audio_url: str,
     draft_folder: Optional[str] = None,
@@ -115,35 +118,14 @@ def add_audio_track(
     # Add scene sound effects
     if sound_effects:
         for effect_name, params in sound_effects:
-            # Choose different effect types based on IS_CAPCUT_ENV
-            effect_type = None
-            
+            # Choose different effect types based on IS_CAPCUT_ENV, searched in order
             if IS_CAPCUT_ENV:
-                # In CapCut environment, look for effects in CapCut_Voice_filters_effect_type
-                effect_type = getattr(CapCut_Voice_filters_effect_type, effect_name)
-                # If not found in Voice_filters, continue searching in other CapCut effect types
-                if effect_type is None:
-                    # Look for effects in CapCut_Voice_characters_effect_type
-                    effect_type = getattr(CapCut_Voice_characters_effect_type, effect_name)
-                # If still not found, look for effects in CapCut_Speech_to_song_effect_type
-                if effect_type is None:
-                    effect_type = getattr(CapCut_Speech_to_song_effect_type, effect_name)
+                effect_type = lookup_effect(effect_name, draft.CapCut_Voice_filters_effect_type,
+                                            draft.CapCut_Voice_characters_effect_type, draft.CapCut_Speech_to_song_effect_type)
             else:
-                # In JianYing environment, look for effects in Audio_scene_effect_type
-                effect_type = getattr(Audio_scene_effect_type, effect_name)
-                # If not found in Audio_scene_effect_type, continue searching in other effect types
-                if effect_type is None:
-                    effect_type = getattr(Tone_effect_type, effect_name)
-                # If still not found, look for effects in Speech_to_song_type
-                if effect_type is None:
-                    effect_type = getattr(Speech_to_song_type, effect_name)
-                # Additional effect type lookup logic can be added here as needed
-            
-            # If corresponding effect type is found, add it to the audio segment
-            if effect_type:
-                audio_segment.add_effect(effect_type, params)
-            else:
-                print(f"Warning: Audio effect named {effect_name} not found")
+                effect_type = lookup_effect(effect_name, draft.Audio_scene_effect_type,
+                                            draft.Tone_effect_type, draft.Speech_to_song_type)
+            audio_segment.add_effect(effect_type, params)
     
     # Add audio segment to track
     script.add_segment(audio_segment, track_name=track_name)
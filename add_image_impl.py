@@ -9,7 +9,9 @@ import re
 from typing import Optional, Dict
 from pyJianYingDraft import exceptions
 from create_draft import get_or_create_draft
+from draft_cache import locked_draft
 
+@locked_draft
 def add_image_impl(
     image_url: str,
     draft_folder: Optional[str] = None,
@@ -192,22 +194,22 @@ def add_image_impl(
     if transition:
         try:
             if IS_CAPCUT_ENV:
-                transition_type = getattr(draft.CapCut_Transition_type, transition)
+                transition_type = draft.CapCut_Transition_type.from_name(transition)
             else:
-                transition_type = getattr(draft.Transition_type, transition)
-            # Convert seconds to microseconds (multiply by 1000000)
-            duration_microseconds = int(transition_duration * 1000000) if transition_duration is not None else None
-            image_segment.add_transition(transition_type, duration=duration_microseconds)
-        except AttributeError:
-            raise ValueError(f"Warning: Unsupported transition type {transition}, this parameter will be ignored")
+                transition_type = draft.Transition_type.from_name(transition)
+        except ValueError as e:
+            raise ValueError(f"Warning: Unsupported transition type {transition}, this parameter will be ignored ({e})")
+        # Convert seconds to microseconds (multiply by 1000000)
+        duration_microseconds = int(transition_duration * 1000000) if transition_duration is not None else None
+        image_segment.add_transition(transition_type, duration=duration_microseconds)
     
     # Add mask effect
     if mask_type:
         try:
             if IS_CAPCUT_ENV:
-                mask_type_enum = getattr(draft.CapCut_Mask_type, mask_type)
+                mask_type_enum = draft.CapCut_Mask_type.from_name(mask_type)
             else:
-                mask_type_enum = getattr(draft.Mask_type, mask_type)
+                mask_type_enum = draft.Mask_type.from_name(mask_type)
             image_segment.add_mask(
                 script,
                 mask_type_enum,  # Remove keyword name, pass as positional argument
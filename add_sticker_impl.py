@@ -3,8 +3,10 @@ from pyJianYingDraft import trange
 from typing import Optional, Dict
 from pyJianYingDraft import exceptions
 from create_draft import get_or_create_draft
+from draft_cache import locked_draft
 from util import generate_draft_url
 
+@locked_draft
 def add_sticker_impl(
     resource_id: str,
     start: float,
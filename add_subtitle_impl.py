@@ -1,10 +1,12 @@
 import pyJianYingDraft as draft
 from util import generate_draft_url, hex_to_rgb
 from create_draft import get_or_create_draft
+from draft_cache import locked_draft
 from pyJianYingDraft.text_segment import TextBubble, TextEffect
 from typing import Optional
 import requests
 
+@locked_draft
 def add_subtitle_impl(
     srt_path: str,
     draft_id: str = None,
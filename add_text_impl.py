@@ -1,12 +1,14 @@
 import pyJianYingDraft as draft
 from settings.local import IS_CAPCUT_ENV
 from util import generate_draft_url, hex_to_rgb
-from pyJianYingDraft import trange, Font_type
+from pyJianYingDraft import trange
 from typing import Optional
 from pyJianYingDraft import exceptions
 from create_draft import get_or_create_draft
+from draft_cache import locked_draft
 from pyJianYingDraft.text_segment import TextBubble, TextEffect
 
+@locked_draft
 def add_text_impl(
     text: str,
     start: float,
@@ -77,10 +79,11 @@ def add_text_impl(
     """
     # Validate if font is in Font_type
     try:
-        font_type = getattr(Font_type, font)
-    except:
-        available_fonts = [attr for attr in dir(Font_type) if not attr.startswith('_')]
-        raise ValueError(f"Unsupported font: {font}, please use one of the fonts in Font_type: {available_fonts}")
+        font_type = draft.Font_type.from_name(font)
+    except ValueError:
+        suggestions = draft.Font_type.suggest(font)
+        hint = f"did you mean: {', '.join(suggestions)}?" if suggestions else "please use one of the fonts in Font_type"
+        raise ValueError(f"Unsupported font: {font}, {hint}")
     
     # Validate alpha value range
     if not 0.0 <= font_alpha <= 1.0:
@@ -1,10 +1,12 @@
 import pyJianYingDraft as draft
 from pyJianYingDraft import exceptions
 from create_draft import get_or_create_draft
+from draft_cache import locked_draft
 from typing import Optional, Dict, List
 
 from util import generate_draft_url
 
+@locked_draft
 def add_video_keyframe_impl(
     draft_id: Optional[str] = None,
     track_name: str = "main",
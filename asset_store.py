@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Optional, Union
+
+from util import url_to_hash
+from downloader import download_file, conditional_validators
+from settings.local import ASSET_STORE_CONFIG
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger('flask_video_generator')
+
+# Linux ioctl cloning a file into another on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+
+# Results of a successful fetch: served from the store without any transfer, or downloaded
+FETCH_HIT = "hit"
+FETCH_DOWNLOADED = "downloaded"
+
+
+def link_or_copy(source: str, target: str) -> str:
+    """Place a copy of `source` at `target` as cheaply as the filesystem allows
+
+    Tries a hardlink, then a copy-on-write clone (reflink), then a plain copy.
+
+    :return: "hardlink", "reflink" or "copy"
+    """
+    directory = os.path.dirname(target)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+        return "hardlink"
+    except OSError:
+        pass
+    if fcntl is not None:
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return "reflink"
+        except OSError:
+            pass
+    shutil.copyfile(source, target)
+    return "copy"
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AssetStore:
+    """Content-addressed store of downloaded media shared by all drafts
+
+    Downloaded files are kept once per content hash under `objects/`, and `urls/` maps the
+    hash of each source URL to the content it served. Draft folders receive hardlinks (or
+    reflinks, or copies) of the stored files, so saving a draft that uses media already
+    downloaded for any other draft costs no network. URL entries older than
+    `revalidate_seconds` are checked against the ETag/Last-Modified of the source before reuse.
+    The store is bounded by `max_bytes`, least recently used files are evicted first.
+    """
+
+    def __init__(self, root: str, max_bytes: int, revalidate_seconds: float = 86400):
+        """
+        :param root: Directory of the store
+        :param max_bytes: Disk budget of the stored files, 0 for unbounded
+        :param revalidate_seconds: Age after which a URL entry is revalidated against its source
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._objects_dir = os.path.join(root, "objects")
+        self._urls_dir = os.path.join(root, "urls")
+        self._tmp_dir = os.path.join(root, "tmp")
+        for directory in (self._objects_dir, self._urls_dir, self._tmp_dir):
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # URL hash -> event set when the download running for it finishes
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._total_bytes = sum(entry.stat().st_size for entry in os.scandir(self._objects_dir))
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self._objects_dir, digest)
+
+    def _url_path(self, key: str) -> str:
+        return os.path.join(self._urls_dir, f"{key}.json")
+
+    def _read_url_entry(self, key: str, url: str) -> Optional[dict]:
+        try:
+            with open(self._url_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url or not os.path.exists(self._object_path(entry.get("sha256", ""))):
+            return None
+        return entry
+
+    def _is_current(self, url: str, entry: dict) -> bool:
+        """Check whether the stored content of a URL can be reused, revalidating old entries"""
+        if time.time() - entry.get("fetched_at", 0) < self.revalidate_seconds:
+            return True
+        if not entry.get("validator"):
+            return False
+        if conditional_validators(url, entry["validator"]) != entry["validator"]:
+            return False
+        entry["fetched_at"] = time.time()
+        self._write_url_entry(self._key(url), entry)
+        return True
+
+    def _write_url_entry(self, key: str, entry: dict) -> None:
+        tmp_path = os.path.join(self._tmp_dir, f"{key}.{uuid.uuid4().hex}.json")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._url_path(key))
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return url_to_hash(url, 32)
+
+    def _download(self, url: str, key: str, download: Callable[..., bool]) -> Optional[dict]:
+        """Download a URL into the store, returning its new URL entry or None if the download failed"""
+        validator: Dict[str, str] = {}
+        tmp_path = os.path.join(self._tmp_dir, f"{key}.{uuid.uuid4().hex}")
+        try:
+            if not download(url, tmp_path, validators=validator) or not os.path.exists(tmp_path):
+                return None
+            digest = _file_sha256(tmp_path)
+            size = os.path.getsize(tmp_path)
+            object_path = self._object_path(digest)
+            with self._lock:
+                if os.path.exists(object_path):
+                    # Same content already stored under another URL
+                    os.utime(object_path)
+                else:
+                    os.replace(tmp_path, object_path)
+                    self._total_bytes += size
+            entry = {"url": url, "sha256": digest, "size": size, "validator": validator, "fetched_at": time.time()}
+            self._write_url_entry(key, entry)
+            return entry
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self) -> None:
+        """Delete least recently used files until the store is 10% below its budget"""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            target = self.max_bytes * 0.9
+            entries = sorted(os.scandir(self._objects_dir), key=lambda e: e.stat().st_mtime)
+            for entry in entries:
+                if self._total_bytes <= target:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+                self._total_bytes -= size
+                self._stats["evictions"] += 1
+        # URL entries of evicted files are ignored on lookup and overwritten on the next download
+
+    def fetch(self, url: str, local_path: str, download: Callable[..., bool] = download_file) -> Union[str, bool]:
+        """Place the content of a URL at `local_path`, downloading it only if the store has no current copy
+
+        Concurrent fetches of the same URL wait for a single download.
+
+        :param url: Media URL
+        :param local_path: Destination file, e.g. inside a draft folder
+        :param download: Function downloading a URL to a path and returning whether it succeeded, filling its
+                         `validators` keyword argument with the ETag/Last-Modified of the downloaded content
+        :return: FETCH_HIT if the stored copy was placed, FETCH_DOWNLOADED if it was downloaded first, False on failure
+        """
+        key = self._key(url)
+        while True:
+            entry = self._read_url_entry(key, url)
+            if entry is not None and self._is_current(url, entry):
+                object_path = self._object_path(entry["sha256"])
+                try:
+                    os.utime(object_path)  # Mark as recently used
+                    link_or_copy(object_path, local_path)
+                except FileNotFoundError:
+                    # Evicted meanwhile, download it again
+                    entry = None
+                else:
+                    with self._lock:
+                        self._stats["hits"] += 1
+                    return FETCH_HIT
+
+            with self._lock:
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    break
+            # Another thread is downloading this URL, use its result
+            event.wait()
+
+        try:
+            with self._lock:
+                self._stats["misses"] += 1
+            entry = self._download(url, key, download)
+            if entry is None:
+                return False
+            link_or_copy(self._object_path(entry["sha256"]), local_path)
+            # Evict after linking so an oversized file still reaches the draft
+            self._evict()
+            return FETCH_DOWNLOADED
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def validator(self, url: str) -> Optional[Dict[str, str]]:
+        """ETag/Last-Modified of a URL recorded when its stored copy was downloaded, None if it is not stored"""
+        entry = self._read_url_entry(self._key(url), url)
+        return None if entry is None else entry.get("validator")
+
+    def stats(self) -> Dict[str, int]:
+        """Store statistics: stored bytes, hits, misses and evictions"""
+        with self._lock:
+            return {"bytes": self._total_bytes, **self._stats}
+
+
+ASSET_STORE = AssetStore(
+    root=ASSET_STORE_CONFIG.get("root", "./tmp/asset_store"),
+    max_bytes=ASSET_STORE_CONFIG.get("max_bytes", 20 * 1024 ** 3),
+    revalidate_seconds=ASSET_STORE_CONFIG.get("revalidate_seconds", 86400)
+) if ASSET_STORE_CONFIG.get("enabled", True) else None
+
+
+def fetch_asset(url: str, local_path: str) -> Union[str, bool]:
+    """Download a media file for a draft through the shared asset store (or directly if the store is disabled)
+
+    :param url: Media URL
+    :param local_path: Destination file inside the draft folder
+    :return: FETCH_HIT if the file came from the store without a transfer, FETCH_DOWNLOADED if it was downloaded, False on failure
+    """
+    if ASSET_STORE is None:
+        return FETCH_DOWNLOADED if download_file(url, local_path) else False
+    return ASSET_STORE.fetch(url, local_path)
+
+
+def stored_validator(url: str) -> Optional[Dict[str, str]]:
+    """ETag/Last-Modified recorded when the asset store downloaded a URL, None if unknown or the store is disabled"""
+    if ASSET_STORE is None:
+        return None
+    return ASSET_STORE.validator(url)
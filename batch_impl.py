@@ -0,0 +1,48 @@
+import logging
+from typing import Callable, Dict, List
+
+from draft_cache import DRAFT_CACHE, locked_draft, serialize_draft, deserialize_draft
+
+logger = logging.getLogger('flask_video_generator')
+
+
+class BatchFailed(Exception):
+    """An operation of a batch failed, the draft was restored to its state before the batch"""
+
+    def __init__(self, index: int, results: List[Dict]):
+        super().__init__(f"Operation {index} ({results[-1]['op']}) failed: {results[-1]['error']}")
+        self.index = index
+        self.results = results
+
+
+@locked_draft
+def apply_batch(draft_id: str, operations: List[Dict], handlers: Dict[str, Callable[[dict], dict]]) -> List[Dict]:
+    """Apply operations to a draft in order while holding its lock, all or nothing
+
+    The draft is snapshotted first. When an operation fails, the snapshot is put back and
+    `BatchFailed` is raised; with a shared draft backend nothing is stored then, and a batch
+    that lost a race with another process is re-run on the new version as a whole.
+
+    :param draft_id: Draft every operation is applied to, overrides any draft_id in the parameters
+    :param operations: List of {"op": name, "params": {...}}, names must be keys of `handlers`
+    :param handlers: Operation name -> function taking the parameters and returning
+                     {"success", "output", "error"}, like the body of the matching route
+    :return: Result of every operation, in order
+    :raises BatchFailed: An operation did not succeed
+    """
+    script = DRAFT_CACHE.get(draft_id)
+    snapshot = serialize_draft(script)
+    results = []
+    for index, operation in enumerate(operations):
+        params = dict(operation.get("params") or {})
+        params["draft_id"] = draft_id
+        try:
+            result = handlers[operation["op"]](params)
+        except Exception as e:
+            result = {"success": False, "output": "", "error": str(e)}
+        results.append({"op": operation["op"], **result})
+        if not result.get("success"):
+            DRAFT_CACHE.put(draft_id, deserialize_draft(snapshot))
+            logger.info(f"Batch on draft {draft_id} rolled back at operation {index} ({operation['op']})")
+            raise BatchFailed(index, results)
+    return results
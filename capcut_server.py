@@ -3,19 +3,6 @@ from flask import Flask, request, jsonify, Response, send_file
 import os
 from datetime import datetime
 import pyJianYingDraft as draft
-from pyJianYingDraft.metadata.animation_meta import Intro_type, Outro_type, Group_animation_type
-from pyJianYingDraft.metadata.capcut_animation_meta import CapCut_Intro_type, CapCut_Outro_type, CapCut_Group_animation_type
-from pyJianYingDraft.metadata.transition_meta import Transition_type
-from pyJianYingDraft.metadata.capcut_transition_meta import CapCut_Transition_type
-from pyJianYingDraft.metadata.mask_meta import Mask_type
-from pyJianYingDraft.metadata.capcut_mask_meta import CapCut_Mask_type
-from pyJianYingDraft.metadata.audio_effect_meta import Tone_effect_type, Audio_scene_effect_type, Speech_to_song_type
-from pyJianYingDraft.metadata.capcut_audio_effect_meta import CapCut_Voice_filters_effect_type, CapCut_Voice_characters_effect_type, CapCut_Speech_to_song_effect_type
-from pyJianYingDraft.metadata.font_meta import Font_type
-from pyJianYingDraft.metadata.animation_meta import Text_intro, Text_outro, Text_loop_anim
-from pyJianYingDraft.metadata.capcut_text_animation_meta import CapCut_Text_intro, CapCut_Text_outro, CapCut_Text_loop_anim
-from pyJianYingDraft.metadata.video_effect_meta import Video_scene_effect_type, Video_character_effect_type
-from pyJianYingDraft.metadata.capcut_effect_meta import CapCut_Video_scene_effect_type, CapCut_Video_character_effect_type
 import random
 import uuid
 import json
@@ -26,11 +13,17 @@ from add_text_impl import add_text_impl
 from add_subtitle_impl import add_subtitle_impl
 from add_image_impl import add_image_impl
 from add_video_keyframe_impl import add_video_keyframe_impl
-from save_draft_impl import save_draft_impl, query_task_status, query_script_impl
+from save_draft_impl import save_draft_impl, query_task_status, query_script_impl, cancel_save_task
 from add_effect_impl import add_effect_impl
 from add_sticker_impl import add_sticker_impl
 from create_draft import create_draft
-from util import generate_draft_url as utilgenerate_draft_url
+from batch_impl import apply_batch, BatchFailed
+from draft_cache import DRAFT_CACHE, get_cache_stats, draft_lock, sync_draft, remove_draft
+from download_scheduler import get_download_stats
+from server_lifecycle import readiness
+from catalog_cache import catalog_endpoint
+from save_task_cache import wait_for_task_update, get_task_version, TERMINAL_STATUSES
+from util import generate_draft_url as utilgenerate_draft_url, stream_draft_zip
 
 from settings.local import IS_CAPCUT_ENV, DRAFT_DOMAIN, PREVIEW_ROUTER
 
@@ -61,6 +54,7 @@ def index():
             "POST /add_subtitle": "添加字幕",
             "POST /add_sticker": "添加贴纸",
             "POST /add_effect": "添加特效",
+            "POST /batch": "批量编辑草稿",
             "POST /save_draft": "保存草稿",
             "GET /get_font_types": "获取字体列表",
             "GET /get_transition_types": "获取转场类型",
@@ -323,7 +317,10 @@ def list_fixed_drafts():
  
 @app.route('/add_video', methods=['POST'])
 def add_video():
-    data = request.get_json()
+    return jsonify(add_video_operation(request.get_json()))
+
+def add_video_operation(data: dict) -> dict:
+    """Apply /add_video to a draft, shared by the route and /batch"""
     # Get required parameters
     draft_folder = data.get('draft_folder')
     video_url = data.get('video_url')
@@ -366,7 +363,7 @@ def add_video():
     if not video_url:
         error_message = "Hi, the required parameters 'video_url' are missing."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
     try:
         draft_result = add_video_track(
@@ -403,16 +400,19 @@ def add_video():
         
         result["success"] = True
         result["output"] = draft_result
-        return jsonify(result)
+        return result
 
     except Exception as e:
         error_message = f"Error occurred while processing video: {str(e)}."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
 @app.route('/add_audio', methods=['POST'])
 def add_audio():
-    data = request.get_json()
+    return jsonify(add_audio_operation(request.get_json()))
+
+def add_audio_operation(data: dict) -> dict:
+    """Apply /add_audio to a draft, shared by the route and /batch"""
     
     # Get required parameters
     draft_folder = data.get('draft_folder')
@@ -446,7 +446,7 @@ def add_audio():
     if not audio_url:
         error_message = "Hi, the required parameters 'audio_url' are missing."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
     try:
         # Call the modified add_audio_track method
@@ -468,12 +468,12 @@ def add_audio():
         
         result["success"] = True
         result["output"] = draft_result
-        return jsonify(result)
+        return result
 
     except Exception as e:
         error_message = f"Error occurred while processing audio: {str(e)}."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
 @app.route('/create_draft', methods=['POST'])
 def create_draft_service():
@@ -507,7 +507,10 @@ def create_draft_service():
         
 @app.route('/add_subtitle', methods=['POST'])
 def add_subtitle():
-    data = request.get_json()
+    return jsonify(add_subtitle_operation(request.get_json()))
+
+def add_subtitle_operation(data: dict) -> dict:
+    """Apply /add_subtitle to a draft, shared by the route and /batch"""
     
     # Get required parameters
     srt = data.get('srt')  # Subtitle content or URL
@@ -552,7 +555,7 @@ def add_subtitle():
     if not srt:
         error_message = "Hi, the required parameters 'srt' are missing."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
     try:
         # Call add_subtitle_impl method
@@ -587,16 +590,19 @@ def add_subtitle():
         
         result["success"] = True
         result["output"] = draft_result
-        return jsonify(result)
+        return result
 
     except Exception as e:
         error_message = f"Error occurred while processing subtitle: {str(e)}."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
 @app.route('/add_text', methods=['POST'])
 def add_text():
-    data = request.get_json()
+    return jsonify(add_text_operation(request.get_json()))
+
+def add_text_operation(data: dict) -> dict:
+    """Apply /add_text to a draft, shared by the route and /batch"""
     
     # Get required parameters
     text = data.get('text')
@@ -654,7 +660,7 @@ def add_text():
     if not text or start is None or end is None:
         error_message = "Hi, the required parameters 'text', 'start' or 'end' are missing. "
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
     try:
         
@@ -693,7 +699,7 @@ def add_text():
         
         result["success"] = True
         result["output"] = draft_result
-        return jsonify(result)
+        return result
 
     except Exception as e:
         if is_chinese:
@@ -701,11 +707,14 @@ def add_text():
         else:
             error_message = f"Error occurred while processing text: {str(e)}. You can click the link below for help: "
         result["error"] = error_message + purchase_link
-        return jsonify(result)
+        return result
 
 @app.route('/add_image', methods=['POST'])
 def add_image():
-    data = request.get_json()
+    return jsonify(add_image_operation(request.get_json()))
+
+def add_image_operation(data: dict) -> dict:
+    """Apply /add_image to a draft, shared by the route and /batch"""
     
     # Get required parameters
     draft_folder = data.get('draft_folder')
@@ -753,7 +762,7 @@ def add_image():
     if not image_url:
         error_message = "Hi, the required parameters 'image_url' are missing."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
     try:
         draft_result = add_image_impl(
@@ -794,16 +803,19 @@ def add_image():
         
         result["success"] = True
         result["output"] = draft_result
-        return jsonify(result)
+        return result
 
     except Exception as e:
         error_message = f"Error occurred while processing image: {str(e)}."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
 @app.route('/add_video_keyframe', methods=['POST'])
 def add_video_keyframe():
-    data = request.get_json()
+    return jsonify(add_video_keyframe_operation(request.get_json()))
+
+def add_video_keyframe_operation(data: dict) -> dict:
+    """Apply /add_video_keyframe to a draft, shared by the route and /batch"""
     
     # Get required parameters
     draft_id = data.get('draft_id')
@@ -840,16 +852,19 @@ def add_video_keyframe():
         
         result["success"] = True
         result["output"] = draft_result
-        return jsonify(result)
+        return result
 
     except Exception as e:
         error_message = f"Error occurred while adding keyframe: {str(e)}."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
 @app.route('/add_effect', methods=['POST'])
 def add_effect():
-    data = request.get_json()
+    return jsonify(add_effect_operation(request.get_json()))
+
+def add_effect_operation(data: dict) -> dict:
+    """Apply /add_effect to a draft, shared by the route and /batch"""
     
     # Get required parameters
     effect_type = data.get('effect_type')  # Effect type name, will match from Video_scene_effect_type or Video_character_effect_type
@@ -871,7 +886,7 @@ def add_effect():
     if not effect_type:
         error_message = "Hi, the required parameters 'effect_type' are missing. Please add them and try again."
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
     try:
         # Call add_effect_impl method
@@ -888,12 +903,12 @@ def add_effect():
         
         result["success"] = True
         result["output"] = draft_result
-        return jsonify(result)
+        return result
 
     except Exception as e:
         error_message = f"Error occurred while adding effect: {str(e)}. "
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
 @app.route('/query_script', methods=['POST'])
 def query_script():
@@ -925,7 +940,8 @@ def query_script():
             return jsonify(result)
         
         # Convert script object to JSON serializable dictionary
-        script_str = script.dumps()
+        with draft_lock(draft_id):
+            script_str = script.dumps()
         
         result["success"] = True
         result["output"] = script_str
@@ -943,6 +959,9 @@ def save_draft():
     # Get required parameters
     draft_id = data.get('draft_id')
     draft_folder = data.get('draft_folder')  # Draft folder parameter
+    is_async = data.get('is_async')  # Return task_id immediately, default from save_queue_config
+    priority = data.get('priority', 0)  # Lower values are saved first
+    tenant = data.get('tenant') or request.remote_addr or "default"  # Save workers are shared fairly between tenants
     
     result = {
         "success": False,
@@ -957,8 +976,8 @@ def save_draft():
         return jsonify(result)
     
     try:
-        # Call save_draft_impl method, start background task
-        draft_result = save_draft_impl(draft_id, draft_folder)
+        # Call save_draft_impl method, queue the save task
+        draft_result = save_draft_impl(draft_id, draft_folder, is_async=is_async, priority=int(priority), tenant=tenant)
         
         result["success"] = True
         result["output"] = draft_result
@@ -970,12 +989,52 @@ def save_draft():
         return jsonify(result)
 
 # Add new query status interface
+@app.route('/cancel_save_task', methods=['POST'])
+def cancel_save_task_route():
+    data = request.get_json()
+
+    # Get required parameters
+    task_id = data.get('task_id')
+
+    result = {
+        "success": False,
+        "output": "",
+        "error": ""
+    }
+
+    # Validate required parameters
+    if not task_id:
+        error_message = "Hi, the required parameter 'task_id' is missing. Please add it and try again."
+        result["error"] = error_message
+        return jsonify(result)
+
+    try:
+        if not cancel_save_task(task_id):
+            result["error"] = f"Task with ID {task_id} is not queued or running."
+            return jsonify(result)
+
+        result["success"] = True
+        result["output"] = query_task_status(task_id)
+        return jsonify(result)
+
+    except Exception as e:
+        error_message = f"Error occurred while cancelling save task: {str(e)}."
+        result["error"] = error_message
+        return jsonify(result)
+
+# Upper bound of a long-poll wait and interval of SSE keep-alive comments (seconds)
+MAX_STATUS_WAIT_SECONDS = 60
+STATUS_KEEPALIVE_SECONDS = 15
+
 @app.route('/query_draft_status', methods=['POST'])
 def query_draft_status():
     data = request.get_json()
     
     # Get required parameters
     task_id = data.get('task_id')
+    # Optional long-poll parameters: wait up to `wait` seconds for a change after `version`
+    wait = data.get('wait', 0)
+    since_version = data.get('version', 0)
     
     result = {
         "success": False,
@@ -991,7 +1050,11 @@ def query_draft_status():
     
     try:
         # Get task status
-        task_status = query_task_status(task_id)
+        if wait:
+            version, task_status = wait_for_task_update(task_id, since_version=int(since_version),
+                                                        timeout=min(float(wait), MAX_STATUS_WAIT_SECONDS))
+        else:
+            version, task_status = get_task_version(task_id), query_task_status(task_id)
         
         if task_status["status"] == "not_found":
             error_message = f"Task with ID {task_id} not found. Please check if the task ID is correct."
@@ -1000,6 +1063,7 @@ def query_draft_status():
         
         result["success"] = True
         result["output"] = task_status
+        result["version"] = version
         return jsonify(result)
         
     except Exception as e:
@@ -1007,6 +1071,101 @@ def query_draft_status():
         result["error"] = error_message
         return jsonify(result)
 
+@app.route('/stream_draft_status', methods=['GET'])
+def stream_draft_status():
+    """Push task status changes as Server-Sent Events until the task finishes"""
+    task_id = request.args.get('task_id')
+    # EventSource resends the id of the last received event when it reconnects
+    try:
+        since_version = int(request.headers.get('Last-Event-ID') or request.args.get('version') or 0)
+    except ValueError:
+        # Not an id of this server, start over with the current status
+        since_version = 0
+
+    result = {
+        "success": False,
+        "output": "",
+        "error": ""
+    }
+
+    if not task_id:
+        result["error"] = "Hi, the required parameter 'task_id' is missing. Please add it and try again."
+        return jsonify(result)
+    if not get_task_version(task_id):
+        result["error"] = f"Task with ID {task_id} not found. Please check if the task ID is correct."
+        return jsonify(result)
+
+    def generate():
+        version = since_version
+        while True:
+            new_version, task_status = wait_for_task_update(task_id, since_version=version,
+                                                            timeout=STATUS_KEEPALIVE_SECONDS)
+            if new_version == version and task_status["status"] != "not_found":
+                # No change: a comment line keeps proxies from closing the idle connection
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            yield f"id: {version}\nevent: status\ndata: {json.dumps(task_status, ensure_ascii=False)}\n\n"
+            if task_status["status"] in TERMINAL_STATUSES:
+                return
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Report draft cache memory usage and eviction counters"""
+    result = {
+        "success": False,
+        "output": "",
+        "error": ""
+    }
+
+    try:
+        result["success"] = True
+        result["output"] = get_cache_stats()
+        return jsonify(result)
+
+    except Exception as e:
+        error_message = f"Error occurred while querying cache stats: {str(e)}."
+        result["error"] = error_message
+        return jsonify(result)
+
+@app.route('/download_stats', methods=['GET'])
+def download_stats():
+    """Report download queue depth, active transfers and per-host concurrency limits"""
+    result = {
+        "success": False,
+        "output": "",
+        "error": ""
+    }
+
+    try:
+        result["success"] = True
+        result["output"] = get_download_stats()
+        return jsonify(result)
+
+    except Exception as e:
+        error_message = f"Error occurred while querying download stats: {str(e)}."
+        result["error"] = error_message
+        return jsonify(result)
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"success": True, "output": "ok", "error": ""})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: 503 while the process drains, its draft backend is unreachable or its save queue is full"""
+    ready, checks = readiness()
+    result = {
+        "success": ready,
+        "output": checks,
+        "error": "" if ready else "Server is not ready to accept requests."
+    }
+    return jsonify(result), 200 if ready else 503
+
 @app.route('/generate_draft_url', methods=['POST'])
 def generate_draft_url():
     data = request.get_json()
@@ -1060,8 +1219,21 @@ def download_draft():
     if not draft_id:
         return jsonify({"error": "Missing draft_id parameter"}), 400
     
+    if os.path.basename(draft_id) != draft_id or draft_id in ('.', '..'):
+        return jsonify({"error": "Invalid draft_id parameter"}), 400
+    
     try:
-        # Check if draft folder exists
+        # Saved drafts are kept as folders, their archive is built while it is sent
+        if os.path.isfile(os.path.join(draft_id, "draft_info.json")):
+            if query_task_status(draft_id)["status"] not in ("completed", "not_found"):
+                return jsonify({"error": f"Draft {draft_id} has not been saved successfully yet"}), 409
+            return Response(
+                stream_draft_zip(draft_id),
+                mimetype='application/zip',
+                headers={'Content-Disposition': f'attachment; filename="{draft_id}.zip"'}
+            )
+        
+        # Archives written by earlier versions
         draft_folder = f"./tmp/zip/{draft_id}.zip"
         
         if not os.path.exists(draft_folder):
@@ -1080,7 +1252,10 @@ def download_draft():
 
 @app.route('/add_sticker', methods=['POST'])
 def add_sticker():
-    data = request.get_json()
+    return jsonify(add_sticker_operation(request.get_json()))
+
+def add_sticker_operation(data: dict) -> dict:
+    """Apply /add_sticker to a draft, shared by the route and /batch"""
     # Get required parameters
     resource_id = data.get('sticker_id')
     start = data.get('start', 0)
@@ -1109,7 +1284,7 @@ def add_sticker():
     if not resource_id:
         error_message = "Hi, the required parameter 'sticker_id' is missing. Please add it and try again. "
         result["error"] = error_message
-        return jsonify(result)
+        return result
 
     try:
         # Call add_sticker_impl method
@@ -1134,203 +1309,228 @@ def add_sticker():
 
         result["success"] = True
         result["output"] = draft_result
-        return jsonify(result)
+        return result
 
     except Exception as e:
         error_message = f"Error occurred while adding sticker: {str(e)}. "
         result["error"] = error_message
-        return jsonify(result)
-
-@app.route('/get_intro_animation_types', methods=['GET'])
-def get_intro_animation_types():
-    """Return supported entrance animation type list
-    
-    If IS_CAPCUT_ENV is True, return entrance animation types in CapCut environment
-    Otherwise return entrance animation types in JianYing environment
+        return result
+
+# Operations accepted by /batch, each applied exactly like the route of the same name
+BATCH_OPERATIONS = {
+    "add_video": add_video_operation,
+    "add_audio": add_audio_operation,
+    "add_image": add_image_operation,
+    "add_text": add_text_operation,
+    "add_subtitle": add_subtitle_operation,
+    "add_effect": add_effect_operation,
+    "add_sticker": add_sticker_operation,
+    "add_video_keyframe": add_video_keyframe_operation,
+}
+MAX_BATCH_OPERATIONS = 1000
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Apply an ordered list of edits to one draft in a single request
+
+    Body: {"draft_id": optional, "width", "height" (for a new draft), "operations": [{"op": "add_video", "params": {...}}, ...]}.
+    Without draft_id a new draft is created. The operations run under the draft lock; if one fails,
+    the draft is left exactly as it was before the request (a draft created for the batch is removed).
     """
+    data = request.get_json()
+    draft_id = data.get('draft_id')
+    operations = data.get('operations')
+    width = data.get('width', 1080)
+    height = data.get('height', 1920)
+
     result = {
-        "success": True,
+        "success": False,
         "output": "",
         "error": ""
     }
-    
+
+    # Validate the whole batch before touching the draft
+    if not isinstance(operations, list) or not operations:
+        result["error"] = "Hi, the required parameter 'operations' is missing or is not a non-empty list."
+        return jsonify(result)
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        result["error"] = f"A batch can contain at most {MAX_BATCH_OPERATIONS} operations."
+        return jsonify(result)
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get("op") not in BATCH_OPERATIONS:
+            result["error"] = f"Operation {index} is invalid, 'op' must be one of: {', '.join(BATCH_OPERATIONS)}."
+            return jsonify(result)
+        if not isinstance(operation.get("params", {}), dict):
+            result["error"] = f"Operation {index} is invalid, 'params' must be an object."
+            return jsonify(result)
+
+    created = False
     try:
-        animation_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return entrance animation types in CapCut environment
-            for name, member in CapCut_Intro_type.__members__.items():
-                animation_types.append({
-                    "name": name
-                })
+        if draft_id:
+            sync_draft(draft_id)
+            if draft_id not in DRAFT_CACHE:
+                result["error"] = f"Draft {draft_id} does not exist."
+                return jsonify(result)
         else:
-            # Return entrance animation types in JianYing environment
-            for name, member in Intro_type.__members__.items():
-                animation_types.append({
-                    "name": name
-                })
-        
-        result["output"] = animation_types
+            _, draft_id = create_draft(width=width, height=height)
+            created = True
+
+        results = apply_batch(draft_id, operations, BATCH_OPERATIONS)
+
+        result["success"] = True
+        result["output"] = {
+            "draft_id": draft_id,
+            "draft_url": utilgenerate_draft_url(draft_id),
+            "results": results
+        }
         return jsonify(result)
-    
+
+    except BatchFailed as e:
+        result["error"] = f"{str(e)}. No changes were applied."
+        result["output"] = {"draft_id": "" if created else draft_id, "results": e.results}
     except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting entrance animation types: {str(e)}"
-        return jsonify(result)
-        
+        result["error"] = f"Error occurred while applying batch: {str(e)}."
+    if created:
+        remove_draft(draft_id)
+    return jsonify(result)
+
+@app.route('/get_intro_animation_types', methods=['GET'])
+@catalog_endpoint("entrance animation types")
+def get_intro_animation_types():
+    """Return supported entrance animation type list
+    
+    If IS_CAPCUT_ENV is True, return entrance animation types in CapCut environment
+    Otherwise return entrance animation types in JianYing environment
+    """
+
+    animation_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return entrance animation types in CapCut environment
+        for name, member in draft.CapCut_Intro_type.__members__.items():
+            animation_types.append({
+                "name": name
+            })
+    else:
+        # Return entrance animation types in JianYing environment
+        for name, member in draft.Intro_type.__members__.items():
+            animation_types.append({
+                "name": name
+            })
+
+    return animation_types
+
+
 @app.route('/get_outro_animation_types', methods=['GET'])
+@catalog_endpoint("exit animation types")
 def get_outro_animation_types():
     """Return supported exit animation type list
     
     If IS_CAPCUT_ENV is True, return exit animation types in CapCut environment
     Otherwise return exit animation types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        animation_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return exit animation types in CapCut environment
-            for name, member in CapCut_Outro_type.__members__.items():
-                animation_types.append({
-                    "name": name
-                })
-        else:
-            # Return exit animation types in JianYing environment
-            for name, member in Outro_type.__members__.items():
-                animation_types.append({
-                    "name": name
-                })
-        
-        result["output"] = animation_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting exit animation types: {str(e)}"
-        return jsonify(result)
+
+    animation_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return exit animation types in CapCut environment
+        for name, member in draft.CapCut_Outro_type.__members__.items():
+            animation_types.append({
+                "name": name
+            })
+    else:
+        # Return exit animation types in JianYing environment
+        for name, member in draft.Outro_type.__members__.items():
+            animation_types.append({
+                "name": name
+            })
+
+    return animation_types
 
 
 @app.route('/get_combo_animation_types', methods=['GET'])
+@catalog_endpoint("combo animation types")
 def get_combo_animation_types():
     """Return supported combo animation type list
     
     If IS_CAPCUT_ENV is True, return combo animation types in CapCut environment
     Otherwise return combo animation types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        animation_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return combo animation types in CapCut environment
-            for name, member in CapCut_Group_animation_type.__members__.items():
-                animation_types.append({
-                    "name": name
-                })
-        else:
-            # Return combo animation types in JianYing environment
-            for name, member in Group_animation_type.__members__.items():
-                animation_types.append({
-                    "name": name
-                })
-        
-        result["output"] = animation_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting combo animation types: {str(e)}"
-        return jsonify(result)
+
+    animation_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return combo animation types in CapCut environment
+        for name, member in draft.CapCut_Group_animation_type.__members__.items():
+            animation_types.append({
+                "name": name
+            })
+    else:
+        # Return combo animation types in JianYing environment
+        for name, member in draft.Group_animation_type.__members__.items():
+            animation_types.append({
+                "name": name
+            })
+
+    return animation_types
 
 
 @app.route('/get_transition_types', methods=['GET'])
+@catalog_endpoint("transition animation types")
 def get_transition_types():
     """Return supported transition animation type list
     
     If IS_CAPCUT_ENV is True, return transition animation types in CapCut environment
     Otherwise return transition animation types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        transition_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return transition animation types in CapCut environment
-            for name, member in CapCut_Transition_type.__members__.items():
-                transition_types.append({
-                    "name": name
-                })
-        else:
-            # Return transition animation types in JianYing environment
-            for name, member in Transition_type.__members__.items():
-                transition_types.append({
-                    "name": name
-                })
-        
-        result["output"] = transition_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting transition animation types: {str(e)}"
-        return jsonify(result)
+
+    transition_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return transition animation types in CapCut environment
+        for name, member in draft.CapCut_Transition_type.__members__.items():
+            transition_types.append({
+                "name": name
+            })
+    else:
+        # Return transition animation types in JianYing environment
+        for name, member in draft.Transition_type.__members__.items():
+            transition_types.append({
+                "name": name
+            })
+
+    return transition_types
 
 
 @app.route('/get_mask_types', methods=['GET'])
+@catalog_endpoint("mask types")
 def get_mask_types():
     """Return supported mask type list
     
     If IS_CAPCUT_ENV is True, return mask types in CapCut environment
     Otherwise return mask types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        mask_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return mask types in CapCut environment
-            for name, member in CapCut_Mask_type.__members__.items():
-                mask_types.append({
-                    "name": name
-                })
-        else:
-            # Return mask types in JianYing environment
-            for name, member in Mask_type.__members__.items():
-                mask_types.append({
-                    "name": name
-                })
-        
-        result["output"] = mask_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting mask types: {str(e)}"
-        return jsonify(result)
+
+    mask_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return mask types in CapCut environment
+        for name, member in draft.CapCut_Mask_type.__members__.items():
+            mask_types.append({
+                "name": name
+            })
+    else:
+        # Return mask types in JianYing environment
+        for name, member in draft.Mask_type.__members__.items():
+            mask_types.append({
+                "name": name
+            })
+
+    return mask_types
 
 
 @app.route('/get_audio_effect_types', methods=['GET'])
+@catalog_endpoint("audio effect types")
 def get_audio_effect_types():
     """Return supported audio effect type list
     
@@ -1339,346 +1539,271 @@ def get_audio_effect_types():
     
     The returned structure includes name, type and Effect_param information
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        audio_effect_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return audio effect types in CapCut environment
-            # 1. Voice filters effect types
-            for name, member in CapCut_Voice_filters_effect_type.__members__.items():
-                params_info = []
-                for param in member.value.params:
-                    params_info.append({
-                        "name": param.name,
-                        "default_value": param.default_value * 100,
-                        "min_value": param.min_value * 100,
-                        "max_value": param.max_value * 100
-                    })
-                
-                audio_effect_types.append({
-                    "name": name,
-                    "type": "Voice_filters",
-                    "params": params_info
+
+    audio_effect_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return audio effect types in CapCut environment
+        # 1. Voice filters effect types
+        for name, member in draft.CapCut_Voice_filters_effect_type.__members__.items():
+            params_info = []
+            for param in member.value.params:
+                params_info.append({
+                    "name": param.name,
+                    "default_value": param.default_value * 100,
+                    "min_value": param.min_value * 100,
+                    "max_value": param.max_value * 100
                 })
-            
-            # 2. Voice characters effect types
-            for name, member in CapCut_Voice_characters_effect_type.__members__.items():
-                params_info = []
-                for param in member.value.params:
-                    params_info.append({
-                        "name": param.name,
-                        "default_value": param.default_value * 100,
-                        "min_value": param.min_value * 100,
-                        "max_value": param.max_value * 100
-                    })
-                
-                audio_effect_types.append({
-                    "name": name,
-                    "type": "Voice_characters",
-                    "params": params_info
+
+            audio_effect_types.append({
+                "name": name,
+                "type": "Voice_filters",
+                "params": params_info
+            })
+
+        # 2. Voice characters effect types
+        for name, member in draft.CapCut_Voice_characters_effect_type.__members__.items():
+            params_info = []
+            for param in member.value.params:
+                params_info.append({
+                    "name": param.name,
+                    "default_value": param.default_value * 100,
+                    "min_value": param.min_value * 100,
+                    "max_value": param.max_value * 100
                 })
-            
-            # 3. Speech to song effect types
-            for name, member in CapCut_Speech_to_song_effect_type.__members__.items():
-                params_info = []
-                for param in member.value.params:
-                    params_info.append({
-                        "name": param.name,
-                        "default_value": param.default_value * 100,
-                        "min_value": param.min_value * 100,
-                        "max_value": param.max_value * 100
-                    })
-                
-                audio_effect_types.append({
-                    "name": name,
-                    "type": "Speech_to_song",
-                    "params": params_info
+
+            audio_effect_types.append({
+                "name": name,
+                "type": "Voice_characters",
+                "params": params_info
+            })
+
+        # 3. Speech to song effect types
+        for name, member in draft.CapCut_Speech_to_song_effect_type.__members__.items():
+            params_info = []
+            for param in member.value.params:
+                params_info.append({
+                    "name": param.name,
+                    "default_value": param.default_value * 100,
+                    "min_value": param.min_value * 100,
+                    "max_value": param.max_value * 100
                 })
-        else:
-            # Return audio effect types in JianYing environment
-            # 1. Tone effect types
-            for name, member in Tone_effect_type.__members__.items():
-                params_info = []
-                for param in member.value.params:
-                    params_info.append({
-                        "name": param.name,
-                        "default_value": param.default_value * 100,
-                        "min_value": param.min_value * 100,
-                        "max_value": param.max_value * 100
-                    })
-                
-                audio_effect_types.append({
-                    "name": name,
-                    "type": "Tone",
-                    "params": params_info
+
+            audio_effect_types.append({
+                "name": name,
+                "type": "Speech_to_song",
+                "params": params_info
+            })
+    else:
+        # Return audio effect types in JianYing environment
+        # 1. Tone effect types
+        for name, member in draft.Tone_effect_type.__members__.items():
+            params_info = []
+            for param in member.value.params:
+                params_info.append({
+                    "name": param.name,
+                    "default_value": param.default_value * 100,
+                    "min_value": param.min_value * 100,
+                    "max_value": param.max_value * 100
                 })
-            
-            # 2. Audio scene effect types
-            for name, member in Audio_scene_effect_type.__members__.items():
-                params_info = []
-                for param in member.value.params:
-                    params_info.append({
-                        "name": param.name,
-                        "default_value": param.default_value * 100,
-                        "min_value": param.min_value * 100,
-                        "max_value": param.max_value * 100
-                    })
-                
-                audio_effect_types.append({
-                    "name": name,
-                    "type": "Audio_scene",
-                    "params": params_info
+
+            audio_effect_types.append({
+                "name": name,
+                "type": "Tone",
+                "params": params_info
+            })
+
+        # 2. Audio scene effect types
+        for name, member in draft.Audio_scene_effect_type.__members__.items():
+            params_info = []
+            for param in member.value.params:
+                params_info.append({
+                    "name": param.name,
+                    "default_value": param.default_value * 100,
+                    "min_value": param.min_value * 100,
+                    "max_value": param.max_value * 100
                 })
-            
-            # 3. Speech to song effect types
-            for name, member in Speech_to_song_type.__members__.items():
-                params_info = []
-                for param in member.value.params:
-                    params_info.append({
-                        "name": param.name,
-                        "default_value": param.default_value * 100,
-                        "min_value": param.min_value * 100,
-                        "max_value": param.max_value * 100
-                    })
-                
-                audio_effect_types.append({
-                    "name": name,
-                    "type": "Speech_to_song",
-                    "params": params_info
+
+            audio_effect_types.append({
+                "name": name,
+                "type": "Audio_scene",
+                "params": params_info
+            })
+
+        # 3. Speech to song effect types
+        for name, member in draft.Speech_to_song_type.__members__.items():
+            params_info = []
+            for param in member.value.params:
+                params_info.append({
+                    "name": param.name,
+                    "default_value": param.default_value * 100,
+                    "min_value": param.min_value * 100,
+                    "max_value": param.max_value * 100
                 })
-        
-        result["output"] = audio_effect_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting audio effect types: {str(e)}"
-        return jsonify(result)
+
+            audio_effect_types.append({
+                "name": name,
+                "type": "Speech_to_song",
+                "params": params_info
+            })
+
+    return audio_effect_types
 
 
 @app.route('/get_font_types', methods=['GET'])
+@catalog_endpoint("font types")
 def get_font_types():
     """Return supported font type list
     
     Return font types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        font_types = []
-        
-        # Return font types in JianYing environment
-        for name, member in Font_type.__members__.items():
-            font_types.append({
-                "name": name
-            })
-        
-        result["output"] = font_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting font types: {str(e)}"
-        return jsonify(result)
+
+    font_types = []
+
+    # Return font types in JianYing environment
+    for name, member in draft.Font_type.__members__.items():
+        font_types.append({
+            "name": name
+        })
+
+    return font_types
 
 
 @app.route('/get_text_intro_types', methods=['GET'])
+@catalog_endpoint("text entrance animation types")
 def get_text_intro_types():
     """Return supported text entrance animation type list
     
     If IS_CAPCUT_ENV is True, return text entrance animation types in CapCut environment
     Otherwise return text entrance animation types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        text_intro_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return text entrance animation types in CapCut environment
-            for name, member in CapCut_Text_intro.__members__.items():
-                text_intro_types.append({
-                    "name": name
-                })
-        else:
-            # Return text entrance animation types in JianYing environment
-            for name, member in Text_intro.__members__.items():
-                text_intro_types.append({
-                    "name": name
-                })
-        
-        result["output"] = text_intro_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting text entrance animation types: {str(e)}"
-        return jsonify(result)
+
+    text_intro_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return text entrance animation types in CapCut environment
+        for name, member in draft.CapCut_Text_intro.__members__.items():
+            text_intro_types.append({
+                "name": name
+            })
+    else:
+        # Return text entrance animation types in JianYing environment
+        for name, member in draft.Text_intro.__members__.items():
+            text_intro_types.append({
+                "name": name
+            })
+
+    return text_intro_types
+
 
 @app.route('/get_text_outro_types', methods=['GET'])
+@catalog_endpoint("text exit animation types")
 def get_text_outro_types():
     """Return supported text exit animation type list
     
     If IS_CAPCUT_ENV is True, return text exit animation types in CapCut environment
     Otherwise return text exit animation types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        text_outro_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return text exit animation types in CapCut environment
-            for name, member in CapCut_Text_outro.__members__.items():
-                text_outro_types.append({
-                    "name": name
-                })
-        else:
-            # Return text exit animation types in JianYing environment
-            for name, member in Text_outro.__members__.items():
-                text_outro_types.append({
-                    "name": name
-                })
-        
-        result["output"] = text_outro_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting text exit animation types: {str(e)}"
-        return jsonify(result)
+
+    text_outro_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return text exit animation types in CapCut environment
+        for name, member in draft.CapCut_Text_outro.__members__.items():
+            text_outro_types.append({
+                "name": name
+            })
+    else:
+        # Return text exit animation types in JianYing environment
+        for name, member in draft.Text_outro.__members__.items():
+            text_outro_types.append({
+                "name": name
+            })
+
+    return text_outro_types
+
 
 @app.route('/get_text_loop_anim_types', methods=['GET'])
+@catalog_endpoint("text loop animation types")
 def get_text_loop_anim_types():
     """Return supported text loop animation type list
     
     If IS_CAPCUT_ENV is True, return text loop animation types in CapCut environment
     Otherwise return text loop animation types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        text_loop_anim_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return text loop animation types in CapCut environment
-            for name, member in CapCut_Text_loop_anim.__members__.items():
-                text_loop_anim_types.append({
-                    "name": name
-                })
-        else:
-            # Return text loop animation types in JianYing environment
-            for name, member in Text_loop_anim.__members__.items():
-                text_loop_anim_types.append({
-                    "name": name
-                })
-        
-        result["output"] = text_loop_anim_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting text loop animation types: {str(e)}"
-        return jsonify(result)
+
+    text_loop_anim_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return text loop animation types in CapCut environment
+        for name, member in draft.CapCut_Text_loop_anim.__members__.items():
+            text_loop_anim_types.append({
+                "name": name
+            })
+    else:
+        # Return text loop animation types in JianYing environment
+        for name, member in draft.Text_loop_anim.__members__.items():
+            text_loop_anim_types.append({
+                "name": name
+            })
+
+    return text_loop_anim_types
 
 
 @app.route('/get_video_scene_effect_types', methods=['GET'])
+@catalog_endpoint("scene effect types")
 def get_video_scene_effect_types():
     """Return supported scene effect type list
     
     If IS_CAPCUT_ENV is True, return scene effect types in CapCut environment
     Otherwise return scene effect types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        effect_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return scene effect types in CapCut environment
-            for name, member in CapCut_Video_scene_effect_type.__members__.items():
-                effect_types.append({
-                    "name": name
-                })
-        else:
-            # Return scene effect types in JianYing environment
-            for name, member in Video_scene_effect_type.__members__.items():
-                effect_types.append({
-                    "name": name
-                })
-        
-        result["output"] = effect_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting scene effect types: {str(e)}"
-        return jsonify(result)
+
+    effect_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return scene effect types in CapCut environment
+        for name, member in draft.CapCut_Video_scene_effect_type.__members__.items():
+            effect_types.append({
+                "name": name
+            })
+    else:
+        # Return scene effect types in JianYing environment
+        for name, member in draft.Video_scene_effect_type.__members__.items():
+            effect_types.append({
+                "name": name
+            })
+
+    return effect_types
 
 
 @app.route('/get_video_character_effect_types', methods=['GET'])
+@catalog_endpoint("character effect types")
 def get_video_character_effect_types():
     """Return supported character effect type list
     
     If IS_CAPCUT_ENV is True, return character effect types in CapCut environment
     Otherwise return character effect types in JianYing environment
     """
-    result = {
-        "success": True,
-        "output": "",
-        "error": ""
-    }
-    
-    try:
-        effect_types = []
-        
-        if IS_CAPCUT_ENV:
-            # Return character effect types in CapCut environment
-            for name, member in CapCut_Video_character_effect_type.__members__.items():
-                effect_types.append({
-                    "name": name
-                })
-        else:
-            # Return character effect types in JianYing environment
-            for name, member in Video_character_effect_type.__members__.items():
-                effect_types.append({
-                    "name": name
-                })
-        
-        result["output"] = effect_types
-        return jsonify(result)
-    
-    except Exception as e:
-        result["success"] = False
-        result["error"] = f"Error occurred while getting character effect types: {str(e)}"
-        return jsonify(result)
+
+    effect_types = []
+
+    if IS_CAPCUT_ENV:
+        # Return character effect types in CapCut environment
+        for name, member in draft.CapCut_Video_character_effect_type.__members__.items():
+            effect_types.append({
+                "name": name
+            })
+    else:
+        # Return character effect types in JianYing environment
+        for name, member in draft.Video_character_effect_type.__members__.items():
+            effect_types.append({
+                "name": name
+            })
+
+    return effect_types
 
 
 if __name__ == '__main__':
+    # Development server, use `python serve.py` in production
     app.run(host='0.0.0.0', port=9000)
\ No newline at end of file
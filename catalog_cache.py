@@ -0,0 +1,76 @@
+import gzip
+import json
+import hashlib
+import logging
+import functools
+import threading
+from typing import Callable, List, Optional
+
+from flask import Response, jsonify, request
+
+logger = logging.getLogger('flask_video_generator')
+
+# The catalogs only change with a deployment, clients may reuse them for an hour and then revalidate with the ETag
+CATALOG_CACHE_CONTROL = "public, max-age=3600"
+
+
+class _EncodedCatalog:
+    """Response body of a catalog endpoint, encoded once: JSON bytes, their gzip form and the ETags of both"""
+
+    __slots__ = ("body", "gzip_body", "etag", "gzip_etag")
+
+    def __init__(self, output: List):
+        self.body = json.dumps({"success": True, "output": output, "error": ""},
+                               ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        # mtime=0 keeps the compressed bytes identical across processes and restarts
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        # Each content encoding is a different representation and needs its own strong ETag
+        self.gzip_etag = self.etag + "-gzip"
+
+    def response(self) -> Response:
+        """Serve the catalog: 304 if the client holds the current version, gzip if the client accepts it"""
+        use_gzip = request.accept_encodings.quality("gzip") > 0
+        etag = self.gzip_etag if use_gzip else self.etag
+        if request.if_none_match.contains_weak(self.etag) or request.if_none_match.contains_weak(self.gzip_etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.gzip_body if use_gzip else self.body, mimetype="application/json")
+            if use_gzip:
+                response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = CATALOG_CACHE_CONTROL
+        return response
+
+
+def catalog_endpoint(description: str) -> Callable:
+    """Decorator for the get_*_types routes, whose output is static for the lifetime of the process
+
+    The decorated function builds the output list. It runs on the first request only; the
+    encoded result is kept and every later request is answered from the stored bytes,
+    with ETag/If-None-Match and gzip support. A failing build is not cached.
+
+    :param description: Catalog name used in the error message, e.g. "transition animation types"
+    """
+    def decorator(build: Callable[[], List]) -> Callable:
+        lock = threading.Lock()
+        encoded: List[Optional[_EncodedCatalog]] = [None]
+
+        @functools.wraps(build)
+        def wrapper():
+            if encoded[0] is None:
+                with lock:
+                    if encoded[0] is None:
+                        try:
+                            encoded[0] = _EncodedCatalog(build())
+                        except Exception as e:
+                            logger.error(f"Building {description} failed: {str(e)}", exc_info=True)
+                            return jsonify({
+                                "success": False,
+                                "output": "",
+                                "error": f"Error occurred while getting {description}: {str(e)}"
+                            })
+            return encoded[0].response()
+        return wrapper
+    return decorator
@@ -34,11 +34,13 @@ def get_or_create_draft(draft_id=None, width=1080, height=1920):
     global DRAFT_CACHE  # Declare use of global variable
     
     if draft_id is not None and draft_id in DRAFT_CACHE:
-        # Get existing draft information from cache
-        print(f"Getting draft from cache: {draft_id}")
-        # Update last access time
-        update_cache(draft_id, DRAFT_CACHE[draft_id])
-        return draft_id, DRAFT_CACHE[draft_id]
+        # Get existing draft information from cache (rehydrated from disk if it was spilled)
+        script = DRAFT_CACHE.get(draft_id)
+        if script is not None:
+            print(f"Getting draft from cache: {draft_id}")
+            # Update last access time
+            update_cache(draft_id, script)
+            return draft_id, script
 
     # Create new draft logic
     print("Creating new draft")
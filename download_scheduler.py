@@ -0,0 +1,241 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional
+from urllib.parse import urlparse
+
+from asset_store import fetch_asset, FETCH_HIT
+from settings.local import DOWNLOAD_SCHEDULER_CONFIG
+
+logger = logging.getLogger('flask_video_generator')
+
+# Transfers smaller than this are dominated by latency, their speed says nothing about saturation
+MIN_RATE_SAMPLE_BYTES = 1024 * 1024
+
+# Idle hosts whose adaptive state is kept for reuse
+MAX_IDLE_HOSTS = 256
+
+
+class _HostState:
+    """Adaptive concurrency limit and counters of the downloads from one host
+
+    The limit grows by one for every `limit` successful downloads (additive increase) while
+    transfers keep running at least at half the best speed seen from the host, and is halved
+    on every failure (multiplicative decrease). A collapse of the transfer speed means the
+    host or the link is saturated, the limit then shrinks by a quarter.
+    """
+
+    def __init__(self, limit: float, max_limit: int):
+        self.limit = float(limit)
+        self.max_limit = max_limit
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes = 0
+        # Best observed speed of a single transfer in bytes/s, decays so the host can recover
+        self.best_rate = 0.0
+
+    def has_capacity(self) -> bool:
+        return self.active < int(self.limit)
+
+    def on_success(self, size: int, seconds: float) -> None:
+        self.completed += 1
+        self.bytes += size
+        if size >= MIN_RATE_SAMPLE_BYTES:
+            rate = size / max(seconds, 1e-3)
+            self.best_rate = max(self.best_rate * 0.95, rate)
+            if rate < self.best_rate * 0.5:
+                self.limit = max(1.0, self.limit * 0.75)
+                return
+        self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def on_failure(self) -> None:
+        self.failed += 1
+        self.limit = max(1.0, self.limit / 2)
+
+
+class _DownloadJob:
+    __slots__ = ("url", "local_path", "download", "host", "future")
+
+    def __init__(self, url: str, local_path: str, download: Callable[[str, str], bool], host: str):
+        self.url = url
+        self.local_path = local_path
+        self.download = download
+        self.host = host
+        self.future: Future = Future()
+
+
+class DownloadScheduler:
+    """Process-wide pool of download workers shared by all saves
+
+    All downloads run on at most `workers` threads. Each host gets an adaptive number of
+    concurrent downloads between 1 and `max_per_host` (see `_HostState`). Downloads are
+    grouped by the task submitting them and groups take turns, so a save with hundreds of
+    assets cannot starve the saves queued after it. A group whose next downloads all target
+    busy hosts is skipped until a slot on one of them frees up.
+    """
+
+    def __init__(self, workers: int, max_per_host: int, initial_per_host: int = 4):
+        """
+        :param workers: Maximum number of downloads running at the same time
+        :param max_per_host: Upper bound of the concurrent downloads from one host
+        :param initial_per_host: Concurrent downloads allowed from a host before any feedback
+        """
+        self.workers = max(1, workers)
+        self.max_per_host = max(1, max_per_host)
+        self.initial_per_host = min(max(1, initial_per_host), self.max_per_host)
+        self._condition = threading.Condition()
+        # group -> queued jobs; OrderedDict order is the round-robin order
+        self._groups: "OrderedDict[str, Deque[_DownloadJob]]" = OrderedDict()
+        # host -> state, least recently used first
+        self._hosts: "OrderedDict[str, _HostState]" = OrderedDict()
+        self._queued = 0
+        self._active = 0
+        self._totals = {"completed": 0, "failed": 0}
+        self._threads: List[threading.Thread] = []
+
+    def _host_state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.initial_per_host, self.max_per_host)
+            idle = [name for name, other in self._hosts.items() if not other.active]
+            for name in idle[:max(0, len(idle) - MAX_IDLE_HOSTS)]:
+                del self._hosts[name]
+        self._hosts.move_to_end(host)
+        return state
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"download-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, group: str, url: str, local_path: str,
+               download: Callable[[str, str], bool] = fetch_asset) -> Future:
+        """Queue a download
+
+        :param group: Task the download belongs to (e.g. the save task ID), used for fair sharing
+        :param url: Media URL
+        :param local_path: Destination file
+        :param download: Function downloading a URL to a path and returning whether it succeeded
+        :return: Future resolving to the return value of `download`; cancelling it drops a download that has not started
+        """
+        host = urlparse(url).netloc or "local"
+        job = _DownloadJob(url, local_path, download, host)
+        with self._condition:
+            self._host_state(host)
+            self._groups.setdefault(group, deque()).append(job)
+            self._queued += 1
+            self._start_workers()
+            self._condition.notify()
+        return job.future
+
+    def _next_job(self) -> Optional[_DownloadJob]:
+        """Pop the first job of the next group in rotation whose host has a free slot"""
+        for group, jobs in list(self._groups.items()):
+            chosen = None
+            for job in list(jobs):
+                if job.future.cancelled():
+                    jobs.remove(job)
+                    self._queued -= 1
+                elif self._host_state(job.host).has_capacity():
+                    chosen = job
+                    break
+            if not jobs:
+                del self._groups[group]
+            if chosen is not None:
+                jobs.remove(chosen)
+                self._queued -= 1
+                if jobs:
+                    # The group that was just served goes to the back of the rotation
+                    self._groups.move_to_end(group)
+                else:
+                    del self._groups[group]
+                return chosen
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                host = self._host_state(job.host)
+                host.active += 1
+                self._active += 1
+            succeeded = False
+            result = None
+            started = time.time()
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    result = job.download(job.url, job.local_path)
+                    succeeded = bool(result)
+                    job.future.set_result(result)
+                else:
+                    succeeded = None  # Cancelled while being picked, no feedback
+            except Exception as e:
+                logger.error(f"Download of {job.url} failed: {str(e)}", exc_info=True)
+                job.future.set_exception(e)
+            finally:
+                with self._condition:
+                    host.active -= 1
+                    self._active -= 1
+                    if succeeded and result == FETCH_HIT:
+                        # Placed from the asset store without a transfer, says nothing about the host
+                        host.completed += 1
+                        self._totals["completed"] += 1
+                    elif succeeded:
+                        try:
+                            size = os.path.getsize(job.local_path)
+                        except OSError:
+                            size = 0
+                        host.on_success(size, time.time() - started)
+                        self._totals["completed"] += 1
+                    elif succeeded is False:
+                        host.on_failure()
+                        self._totals["failed"] += 1
+                    # A freed host slot may unblock jobs skipped by other workers
+                    self._condition.notify_all()
+
+    def stats(self) -> Dict:
+        """Scheduler metrics: queue depth, active transfers, totals and the per-host limits of busy hosts"""
+        with self._condition:
+            queued_per_host: Dict[str, int] = {}
+            for jobs in self._groups.values():
+                for job in jobs:
+                    queued_per_host[job.host] = queued_per_host.get(job.host, 0) + 1
+            return {
+                "workers": self.workers,
+                "queued": self._queued,
+                "active": self._active,
+                "groups": len(self._groups),
+                **self._totals,
+                "hosts": {
+                    name: {
+                        "limit": int(state.limit),
+                        "active": state.active,
+                        "queued": queued_per_host.get(name, 0),
+                        "completed": state.completed,
+                        "failed": state.failed,
+                        "bytes": state.bytes,
+                    }
+                    for name, state in self._hosts.items()
+                    if state.active or name in queued_per_host
+                },
+            }
+
+
+DOWNLOAD_SCHEDULER = DownloadScheduler(
+    workers=DOWNLOAD_SCHEDULER_CONFIG.get("workers", 32),
+    max_per_host=DOWNLOAD_SCHEDULER_CONFIG.get("max_per_host", 8),
+    initial_per_host=DOWNLOAD_SCHEDULER_CONFIG.get("initial_per_host", 4)
+)
+
+
+def get_download_stats() -> Dict:
+    """Get download scheduler statistics (queue depth, active transfers, per-host limits)"""
+    return DOWNLOAD_SCHEDULER.stats()
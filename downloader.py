@@ -1,9 +1,13 @@
 import os
 import subprocess
 import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, Timeout
 from urllib.parse import urlparse, unquote
+from settings.local import DOWNLOAD_CONFIG
 
 def download_video(video_url, draft_name, material_name):
     """
@@ -108,14 +112,31 @@ def download_audio(audio_url, draft_name, material_name):
     except subprocess.CalledProcessError as e:
         raise Exception(f"Failed to download audio:\n{e.stderr}")
 
-def download_file(url:str, local_filename, max_retries=3, timeout=180):
-    # Extract directory part
-    directory = os.path.dirname(local_filename)
+def _create_session():
+    """Create the HTTP session shared by all downloads
+
+    Connections are kept alive and reused across files, threads and saves; each host gets
+    at most `max_connections_per_host` connections, extra requests wait for a free one.
+    """
+    session = requests.Session()
+    per_host = DOWNLOAD_CONFIG.get("max_connections_per_host", 16)
+    adapter = HTTPAdapter(pool_connections=DOWNLOAD_CONFIG.get("max_hosts", 64), pool_maxsize=per_host, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_SESSION = _create_session()
+
+def get_session():
+    """Return the shared download session"""
+    return _SESSION
 
+def _download_headers(url):
+    """Extra request headers required by some storage providers"""
     # 检查是否是豆包OSS URL，如果是则添加特殊的HTTP头
     if 'ark-content-generation-cn-beijing.tos-cn-beijing.volces.com' in url:
         print(f"检测到豆包OSS URL，使用特殊HTTP头进行下载: {url}")
-        headers = {
+        return {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'video/mp4,video/*,*/*;q=0.9',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
@@ -127,8 +148,184 @@ def download_file(url:str, local_filename, max_retries=3, timeout=180):
             'Sec-Fetch-Mode': 'no-cors',
             'Sec-Fetch-Site': 'cross-site'
         }
-    else:
-        headers = {}
+    return {}
+
+def _response_validators(response):
+    """ETag/Last-Modified of a response, in the form recorded by the asset store and the probe cache"""
+    validators = {}
+    if response.headers.get('ETag'):
+        validators['etag'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        validators['last_modified'] = response.headers['Last-Modified']
+    return validators
+
+def _if_range(validators):
+    return validators.get('etag') or validators.get('last_modified')
+
+def conditional_validators(url, cached, timeout=10):
+    """Ask the server whether the content of a URL still matches the `cached` ETag/Last-Modified
+
+    Sends a conditional GET for the first byte over the shared session with the download headers,
+    so it reuses pooled connections and works on URLs signed for GET only (where HEAD is refused).
+
+    :return: `cached` if the server answered 304, the current validators otherwise, None if the request failed
+    """
+    headers = _download_headers(url)
+    headers['Range'] = 'bytes=0-0'
+    headers['Accept-Encoding'] = 'identity'
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    try:
+        with _SESSION.get(url, stream=True, timeout=timeout, headers=headers) as response:
+            if response.status_code == 304:
+                return cached
+            if response.status_code >= 400:
+                return None
+            return _response_validators(response)
+    except RequestException as e:
+        print(f"Failed to revalidate {url}: {e}")
+        return None
+
+def _probe_range_support(url, headers, timeout):
+    """Ask for the first byte of a URL to learn whether its server serves byte ranges
+
+    :return: (total size, ETag/Last-Modified) if ranges are supported, otherwise None
+    """
+    probe_headers = dict(headers)
+    probe_headers['Range'] = 'bytes=0-0'
+    probe_headers['Accept-Encoding'] = 'identity'
+    try:
+        with _SESSION.get(url, stream=True, timeout=timeout, headers=probe_headers) as response:
+            if response.status_code != 206:
+                return None
+            # Content-Range: bytes 0-0/<total>
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            if not total.isdigit():
+                return None
+            return int(total), _response_validators(response)
+    except RequestException:
+        return None
+
+def _plan_segments(size):
+    """Split `size` bytes into inclusive (start, end) ranges, one per connection
+
+    The number of segments grows with the file size (one per `min_segment_size` bytes) and is
+    capped by `max_segments` and by the connections the pool allows per host.
+    """
+    count = min(
+        size // max(DOWNLOAD_CONFIG.get("min_segment_size", 16 * 1024 * 1024), 1),
+        DOWNLOAD_CONFIG.get("max_segments", 8),
+        DOWNLOAD_CONFIG.get("max_connections_per_host", 16)
+    )
+    count = max(int(count), 1)
+    step = -(-size // count)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+def _download_segment(url, part_filename, start, end, headers, validator, timeout, max_retries, cancelled):
+    """Write bytes start..end (inclusive) of a URL at the same offsets of the preallocated part file
+
+    A dropped connection is retried from the last byte written. Raises if the server stops serving
+    the range (e.g. the file changed, so If-Range returns the whole body) or retries run out.
+    """
+    chunk_size = DOWNLOAD_CONFIG.get("chunk_size", 64 * 1024)
+    position = start
+    attempts = 0
+    with open(part_filename, 'r+b') as file:
+        while position <= end:
+            if attempts:
+                time.sleep(2 ** attempts)
+            segment_headers = dict(headers)
+            segment_headers['Range'] = f"bytes={position}-{end}"
+            segment_headers['Accept-Encoding'] = 'identity'
+            if validator:
+                segment_headers['If-Range'] = validator
+            try:
+                with _SESSION.get(url, stream=True, timeout=timeout, headers=segment_headers) as response:
+                    if response.status_code != 206:
+                        raise ValueError(f"server answered {response.status_code} to a range request")
+                    file.seek(position)
+                    for chunk in response.iter_content(chunk_size):
+                        if cancelled.is_set():
+                            raise RuntimeError("cancelled")
+                        chunk = chunk[:end + 1 - position]
+                        file.write(chunk)
+                        position += len(chunk)
+                        if position > end:
+                            break
+            except RequestException as e:
+                print(f"Segment {start}-{end} of {url} interrupted at byte {position}: {e}")
+            if position <= end:
+                attempts += 1
+                if attempts >= max_retries:
+                    raise RequestException(f"segment {start}-{end} incomplete after {max_retries} attempts")
+
+def _download_segmented(url, part_filename, size, validator, headers, timeout, max_retries):
+    """Download a URL as concurrent byte ranges into a part file preallocated to `size` bytes"""
+    segments = _plan_segments(size)
+    with open(part_filename, 'wb') as file:
+        file.truncate(size)
+    cancelled = threading.Event()
+    with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="segment") as pool:
+        futures = [
+            pool.submit(_download_segment, url, part_filename, start, end, headers, validator, timeout, max_retries, cancelled)
+            for start, end in segments
+        ]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            # Stop the other segments, the caller falls back to a single stream
+            cancelled.set()
+            raise
+    return len(segments)
+
+def download_file(url:str, local_filename, max_retries=3, timeout=180, validators=None):
+    """
+    Download a file over the shared connection pool
+    
+    The file is written to `<local_filename>.part` and renamed once complete. After a
+    failure, the next attempt resumes from the bytes already written using a Range request
+    (guarded by If-Range, so a file changed on the server is downloaded again from the start).
+    With `DOWNLOAD_CONFIG["segmented"]` enabled, files of at least `segmented_min_size` bytes on
+    servers supporting Range requests are fetched as several concurrent byte ranges instead;
+    if that fails the file is downloaded again as a single stream.
+    :param url: File URL
+    :param local_filename: Local path of the downloaded file
+    :param max_retries: Maximum number of attempts
+    :param timeout: Connect/read timeout in seconds
+    :param validators: Optional dictionary filled with the ETag/Last-Modified ("etag"/"last_modified")
+                       the server sent with the downloaded content
+    :return: Whether the download succeeded
+    """
+    # Extract directory part
+    directory = os.path.dirname(local_filename)
+    part_filename = f"{local_filename}.part"
+    base_headers = _download_headers(url)
+    chunk_size = DOWNLOAD_CONFIG.get("chunk_size", 64 * 1024)
+    validator = None  # ETag or Last-Modified of the partially downloaded content
+
+    if DOWNLOAD_CONFIG.get("segmented", False):
+        ranges = _probe_range_support(url, base_headers, timeout)
+        if ranges and ranges[0] >= DOWNLOAD_CONFIG.get("segmented_min_size", 64 * 1024 * 1024):
+            size, range_validators = ranges
+            start_time = time.time()
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            try:
+                segment_count = _download_segmented(url, part_filename, size, _if_range(range_validators), base_headers,
+                                                    timeout, max_retries)
+                os.replace(part_filename, local_filename)
+                if validators is not None:
+                    validators.update(range_validators)
+                print(f"Download completed in {time.time()-start_time:.2f} seconds ({segment_count} segments)")
+                print(f"File saved as: {os.path.abspath(local_filename)}")
+                return True
+            except Exception as e:
+                print(f"Segmented download failed ({e}), downloading {url} as a single stream")
+                if os.path.exists(part_filename):
+                    os.remove(part_filename)
 
     retries = 0
     while retries < max_retries:
@@ -146,33 +343,56 @@ def download_file(url:str, local_filename, max_retries=3, timeout=180):
                 os.makedirs(directory, exist_ok=True)
                 print(f"Created directory: {directory}")
 
-            # 使用headers进行下载
-            with requests.get(url, stream=True, timeout=timeout, headers=headers) as response:
-                response.raise_for_status()
-                
-                total_size = int(response.headers.get('content-length', 0))
-                block_size = 1024
-                
-                with open(local_filename, 'wb') as file:
-                    bytes_written = 0
-                    for chunk in response.iter_content(block_size):
-                        if chunk:
-                            file.write(chunk)
-                            bytes_written += len(chunk)
-                            
-                            if total_size > 0:
-                                progress = bytes_written / total_size * 100
-                                # For frequently updated progress, consider using logger.debug or more granular control to avoid large log files
-                                # Or only output progress to console, not write to file
-                                print(f"\r[PROGRESS] {progress:.2f}% ({bytes_written/1024:.2f}KB/{total_size/1024:.2f}KB)", end='')
-                                pass # Avoid printing too much progress information in log files
-                
-                if total_size > 0:
-                    # print() # Original newline
-                    pass
-                print(f"Download completed in {time.time()-start_time:.2f} seconds")
-                print(f"File saved as: {os.path.abspath(local_filename)}")
-                return True
+            headers = dict(base_headers)
+            offset = os.path.getsize(part_filename) if os.path.exists(part_filename) else 0
+            if offset and validator:
+                # Byte offsets are only meaningful on the unencoded content
+                headers['Range'] = f"bytes={offset}-"
+                headers['If-Range'] = validator
+                headers['Accept-Encoding'] = 'identity'
+            else:
+                offset = 0
+
+            with _SESSION.get(url, stream=True, timeout=timeout, headers=headers) as response:
+                if response.status_code == 416 and offset:
+                    # Nothing left after the offset: the previous attempt got the whole file
+                    response.close()
+                else:
+                    response.raise_for_status()
+                    resumed = offset > 0 and response.status_code == 206
+                    if offset and not resumed:
+                        print(f"Server did not resume {url} at byte {offset}, downloading from the start")
+                        offset = 0
+                    response_validators = _response_validators(response)
+                    validator = _if_range(response_validators)
+                    if validators is not None:
+                        validators.clear()
+                        validators.update(response_validators)
+
+                    content_length = int(response.headers.get('content-length', 0))
+                    total_size = offset + content_length if content_length else 0
+
+                    with open(part_filename, 'ab' if resumed else 'wb') as file:
+                        bytes_written = offset
+                        for chunk in response.iter_content(chunk_size):
+                            if chunk:
+                                file.write(chunk)
+                                bytes_written += len(chunk)
+                                
+                                if total_size > 0:
+                                    progress = bytes_written / total_size * 100
+                                    # For frequently updated progress, consider using logger.debug or more granular control
+                                    # to avoid large log files
+                                    # Or only output progress to console, not write to file
+                                    print(f"\r[PROGRESS] {progress:.2f}% ({bytes_written/1024:.2f}KB/{total_size/1024:.2f}KB)", end='')
+
+                    if total_size and bytes_written < total_size:
+                        raise RequestException(f"Connection closed after {bytes_written} of {total_size} bytes")
+
+            os.replace(part_filename, local_filename)
+            print(f"Download completed in {time.time()-start_time:.2f} seconds")
+            print(f"File saved as: {os.path.abspath(local_filename)}")
+            return True
                 
         except Timeout:
             print(f"Download timed out after {timeout} seconds")
@@ -184,5 +404,6 @@ def download_file(url:str, local_filename, max_retries=3, timeout=180):
         retries += 1
     
     print(f"Download failed after {max_retries} attempts for URL: {url}")
+    if os.path.exists(part_filename):
+        os.remove(part_filename)
     return False
-
@@ -0,0 +1,311 @@
+import os
+import abc
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, Tuple
+
+logger = logging.getLogger('flask_video_generator')
+
+
+class VersionConflict(Exception):
+    """The draft was changed by another process since it was loaded"""
+
+    def __init__(self, draft_id: str, expected_version: int):
+        super().__init__(f"Draft {draft_id} was modified concurrently (expected version {expected_version})")
+        self.draft_id = draft_id
+        self.expected_version = expected_version
+
+
+class DraftBackend(abc.ABC):
+    """Draft state store shared by server processes
+
+    Drafts are stored as serialized bytes together with a version number. Every successful
+    `store` increments the version, and a store based on an outdated version is rejected
+    with `VersionConflict` (optimistic concurrency control). Version 0 means "not stored".
+    """
+
+    # Whether the state is visible to other processes; local-only backends skip syncing entirely
+    shared = True
+
+    @abc.abstractmethod
+    def version(self, draft_id: str) -> int:
+        """Current version of a draft, 0 if the backend does not know it"""
+
+    @abc.abstractmethod
+    def load(self, draft_id: str) -> Optional[Tuple[int, bytes]]:
+        """Load (version, serialized draft), None if the backend does not know the draft"""
+
+    @abc.abstractmethod
+    def store(self, draft_id: str, data: bytes, expected_version: int) -> int:
+        """Store a draft if its current version is still `expected_version`, return the new version
+
+        :raises VersionConflict: The draft was stored by someone else in the meantime
+        """
+
+    @abc.abstractmethod
+    def delete(self, draft_id: str) -> None:
+        """Forget a draft"""
+
+    # Save task status, only used by shared backends so that every process sees the tasks of the others
+
+    @abc.abstractmethod
+    def claim_task(self, task_id: str, owner: int, status: dict) -> int:
+        """Start a task in process `owner` unless another live process is still running it
+
+        :param status: Initial task status, stored together with the claim
+        :return: New version of the task status, 0 if another process owns the unfinished task
+        """
+
+    @abc.abstractmethod
+    def store_task(self, task_id: str, status: dict) -> int:
+        """Store the status of a task, return its new version"""
+
+    @abc.abstractmethod
+    def load_task(self, task_id: str) -> Optional[Tuple[int, dict]]:
+        """Load (version, task status), None if the task does not exist"""
+
+    @abc.abstractmethod
+    def request_task_cancel(self, task_id: str) -> bool:
+        """Flag an unfinished task for cancellation, return whether such a task exists"""
+
+    @abc.abstractmethod
+    def task_cancel_requested(self, task_id: str) -> bool:
+        """Whether cancellation of the task has been requested since it was claimed"""
+
+    @abc.abstractmethod
+    def task_abandoned(self, task_id: str) -> bool:
+        """Whether the task is unfinished but the process running it no longer exists"""
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process of this host is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        # Windows raises OSError for processes that do not exist
+        return False
+    return True
+
+
+class InProcessDraftBackend(DraftBackend):
+    """Default backend: the in-process draft cache is the only copy of the state
+
+    Nothing is stored, so a single server process pays no serialization or bookkeeping cost.
+    Since `shared` is False the draft cache and the task cache never sync with it, every
+    method is a no-op reporting an empty backend.
+    """
+
+    shared = False
+
+    def version(self, draft_id: str) -> int:
+        return 0
+
+    def load(self, draft_id: str) -> Optional[Tuple[int, bytes]]:
+        return None
+
+    def store(self, draft_id: str, data: bytes, expected_version: int) -> int:
+        return 0
+
+    def delete(self, draft_id: str) -> None:
+        pass
+
+    def claim_task(self, task_id: str, owner: int, status: dict) -> int:
+        # There is no other process that could own the task
+        return 1
+
+    def store_task(self, task_id: str, status: dict) -> int:
+        return 0
+
+    def load_task(self, task_id: str) -> Optional[Tuple[int, dict]]:
+        return None
+
+    def request_task_cancel(self, task_id: str) -> bool:
+        return False
+
+    def task_cancel_requested(self, task_id: str) -> bool:
+        return False
+
+    def task_abandoned(self, task_id: str) -> bool:
+        return False
+
+
+class SQLiteDraftBackend(DraftBackend):
+    """Shared backend on a local SQLite database, usable by all worker processes of one host
+
+    The database runs in WAL mode so readers never block the writer; a compare-and-set on the
+    version column implements the optimistic versioning. Save task statuses live in a second
+    table together with the PID of the process running the task.
+    """
+
+    # Unfinished task states, a task in one of them belongs to its owner process while that process lives
+    ACTIVE_TASK_STATES = ("initialized", "queued", "processing")
+    # Finished tasks are forgotten after this many seconds
+    TASK_RETENTION_SECONDS = 7 * 86400
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        :param path: Database file path, created if it does not exist
+        :param timeout: Seconds to wait for the database write lock
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS drafts ("
+            "draft_id TEXT PRIMARY KEY, version INTEGER NOT NULL, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "task_id TEXT PRIMARY KEY, version INTEGER NOT NULL, state TEXT NOT NULL, status TEXT NOT NULL, "
+            "owner INTEGER NOT NULL, cancel_requested INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads, keep one per thread;
+        # a connection inherited through fork (e.g. a preloaded server app) is not reused either
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def version(self, draft_id: str) -> int:
+        row = self._connection().execute(
+            "SELECT version FROM drafts WHERE draft_id = ?", (draft_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def load(self, draft_id: str) -> Optional[Tuple[int, bytes]]:
+        row = self._connection().execute(
+            "SELECT version, data FROM drafts WHERE draft_id = ?", (draft_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], bytes(row[1])
+
+    def store(self, draft_id: str, data: bytes, expected_version: int) -> int:
+        conn = self._connection()
+        now = time.time()
+        if expected_version == 0:
+            try:
+                conn.execute(
+                    "INSERT INTO drafts (draft_id, version, data, updated_at) VALUES (?, 1, ?, ?)",
+                    (draft_id, sqlite3.Binary(data), now)
+                )
+            except sqlite3.IntegrityError:
+                raise VersionConflict(draft_id, expected_version)
+            return 1
+        cursor = conn.execute(
+            "UPDATE drafts SET version = version + 1, data = ?, updated_at = ? WHERE draft_id = ? AND version = ?",
+            (sqlite3.Binary(data), now, draft_id, expected_version)
+        )
+        if cursor.rowcount != 1:
+            raise VersionConflict(draft_id, expected_version)
+        return expected_version + 1
+
+    def delete(self, draft_id: str) -> None:
+        self._connection().execute("DELETE FROM drafts WHERE draft_id = ?", (draft_id,))
+
+    def claim_task(self, task_id: str, owner: int, status: dict) -> int:
+        conn = self._connection()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes cannot both see the task as free
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT version, state, owner FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row is not None and row[1] in self.ACTIVE_TASK_STATES and row[2] != owner and process_alive(row[2]):
+                conn.execute("COMMIT")
+                return 0
+            version = row[0] + 1 if row else 1
+            conn.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, version, state, status, owner, cancel_requested, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?)",
+                (task_id, version, status.get("status", ""), json.dumps(status), owner, now)
+            )
+            placeholders = ", ".join("?" * len(self.ACTIVE_TASK_STATES))
+            conn.execute(
+                f"DELETE FROM tasks WHERE updated_at < ? AND state NOT IN ({placeholders})",
+                (now - self.TASK_RETENTION_SECONDS, *self.ACTIVE_TASK_STATES)
+            )
+            conn.execute("COMMIT")
+            return version
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def store_task(self, task_id: str, status: dict) -> int:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "UPDATE tasks SET version = version + 1, state = ?, status = ?, updated_at = ? WHERE task_id = ?",
+                (status.get("status", ""), json.dumps(status), time.time(), task_id)
+            )
+            if cursor.rowcount != 1:
+                conn.execute(
+                    "INSERT INTO tasks (task_id, version, state, status, owner, updated_at) VALUES (?, 1, ?, ?, ?, ?)",
+                    (task_id, status.get("status", ""), json.dumps(status), os.getpid(), time.time())
+                )
+            version = conn.execute("SELECT version FROM tasks WHERE task_id = ?", (task_id,)).fetchone()[0]
+            conn.execute("COMMIT")
+            return version
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def load_task(self, task_id: str) -> Optional[Tuple[int, dict]]:
+        row = self._connection().execute(
+            "SELECT version, status FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def request_task_cancel(self, task_id: str) -> bool:
+        placeholders = ", ".join("?" * len(self.ACTIVE_TASK_STATES))
+        cursor = self._connection().execute(
+            f"UPDATE tasks SET cancel_requested = 1 WHERE task_id = ? AND state IN ({placeholders})",
+            (task_id, *self.ACTIVE_TASK_STATES)
+        )
+        return cursor.rowcount == 1
+
+    def task_cancel_requested(self, task_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT cancel_requested FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def task_abandoned(self, task_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT state, owner FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return bool(row and row[0] in self.ACTIVE_TASK_STATES and not process_alive(row[1]))
+
+
+def create_backend(config: dict) -> DraftBackend:
+    """Create the draft backend selected by the `draft_backend_config` settings
+
+    :param config: Dictionary with `type` ("memory" or "sqlite") and backend specific options
+    """
+    backend_type = config.get("type", "memory")
+    if backend_type == "memory":
+        return InProcessDraftBackend()
+    if backend_type == "sqlite":
+        path = config.get("sqlite_path", "./tmp/draft_state.db")
+        logger.info(f"Using shared SQLite draft backend at {path}")
+        return SQLiteDraftBackend(path, timeout=config.get("timeout", 30.0))
+    raise ValueError(f"Unknown draft backend type: {backend_type}")
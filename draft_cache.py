@@ -1,19 +1,530 @@
+import os
+import time
+import shutil
+import zlib
+import pickle
+import atexit
+import inspect
+import logging
+import threading
+import functools
+import weakref
+import contextlib
 from collections import OrderedDict
 import pyJianYingDraft as draft
-from typing import Dict
+from typing import Dict, Optional, Iterator, Any, Callable, List
+from settings.local import DRAFT_CACHE_CONFIG, DRAFT_BACKEND_CONFIG
+from draft_backend import create_backend, process_alive, VersionConflict
 
-# Modify global variable, use OrderedDict to implement LRU cache, limit the maximum number to 10000
-DRAFT_CACHE: Dict[str, 'draft.Script_file'] = OrderedDict()  # Use Dict for type hinting
-MAX_CACHE_SIZE = 10000
+logger = logging.getLogger('flask_video_generator')
+
+MAX_CACHE_SIZE = DRAFT_CACHE_CONFIG.get("max_memory_drafts", 10000)
+MAX_CACHE_BYTES = DRAFT_CACHE_CONFIG.get("max_memory_bytes", 2 * 1024 ** 3)
+CACHE_SHARDS = max(1, DRAFT_CACHE_CONFIG.get("shards", 16))
+BACKEND_MAX_RETRIES = max(1, DRAFT_BACKEND_CONFIG.get("max_retries", 10))
+
+
+def serialize_draft(script: draft.Script_file) -> bytes:
+    """Serialize a draft object into the compact on-disk format (zlib compressed pickle)"""
+    return zlib.compress(pickle.dumps(script, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def deserialize_draft(data: bytes) -> draft.Script_file:
+    """Restore a draft object from the compact on-disk format"""
+    return pickle.loads(zlib.decompress(data))
+
+
+def process_spill_dir(spill_root: str) -> str:
+    """Spill directory of this server process below `spill_root`, empty if spilling is disabled
+
+    Every process spills into a subdirectory named after its PID, so worker processes never
+    rehydrate, trim or overwrite each other's drafts. Drafts left behind by processes that no
+    longer run (or stored directly in `spill_root` by older versions) are moved into the
+    directory of this process first, so they survive a restart.
+    """
+    if not spill_root:
+        return spill_root
+    own_dir = os.path.join(spill_root, str(os.getpid()))
+    os.makedirs(own_dir, exist_ok=True)
+    for entry in os.scandir(spill_root):
+        if entry.is_dir():
+            if not entry.name.isdigit() or entry.path == own_dir or process_alive(int(entry.name)):
+                continue
+            orphans = [e for e in os.scandir(entry.path) if e.name.endswith(".draft")]
+        elif entry.name.endswith(".draft"):
+            orphans = [entry]
+        else:
+            continue
+        for orphan in orphans:
+            try:
+                # A rename keeps the modification time, which orders the disk tier
+                os.replace(orphan.path, os.path.join(own_dir, orphan.name))
+            except FileNotFoundError:
+                # Another process that started at the same time adopted it
+                pass
+        if entry.is_dir():
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return own_dir
+
+
+class TieredDraftCache:
+    """Draft store with a hot in-memory LRU tier and a cold on-disk tier
+
+    Drafts evicted from memory (or idle for longer than `idle_seconds`) are spilled to
+    `spill_dir` and transparently rehydrated the next time they are looked up, so an
+    LRU eviction or a graceful restart no longer loses drafts that clients are editing.
+
+    The memory tier is bounded both by entry count and by the estimated retained size
+    of the drafts (`Script_file.retained_size`), so one huge draft counts as much as
+    the many small drafts it displaces.
+
+    All public methods are serialized by an internal lock, so one instance can be shared
+    between request threads; `ShardedDraftCache` stripes several instances to reduce contention.
+    """
+
+    def __init__(self, max_size: int, spill_dir: str, idle_seconds: float, max_disk_drafts: int,
+                 max_bytes: int = 0, owns_key: Optional[Callable[[str], bool]] = None):
+        """
+        :param max_size: Maximum number of drafts kept in memory
+        :param spill_dir: Directory used for the on-disk tier, empty to disable spilling
+        :param idle_seconds: Drafts not accessed for this long are spilled to disk, 0 to disable
+        :param max_disk_drafts: Maximum number of drafts kept on disk, oldest are deleted first
+        :param max_bytes: Memory budget in bytes for the in-memory tier, 0 to disable
+        :param owns_key: Predicate selecting which spilled drafts in `spill_dir` belong to this cache
+        """
+        self.max_size = max_size
+        self.spill_dir = spill_dir
+        self.idle_seconds = idle_seconds
+        self.max_disk_drafts = max_disk_drafts
+        self.max_bytes = max_bytes
+
+        self._hot: Dict[str, draft.Script_file] = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._current_bytes = 0
+        self._stats = {"evictions": 0, "idle_spills": 0, "rehydrations": 0, "disk_deletions": 0}
+        self._spilled: Dict[str, None] = OrderedDict()
+        self._last_idle_scan = time.time()
+        self._lock = threading.RLock()
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            # Rebuild the disk index (oldest first) so spilled drafts survive a restart
+            entries = [e for e in os.scandir(self.spill_dir) if e.name.endswith(".draft")]
+            for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+                key = entry.name[:-len(".draft")]
+                if owns_key is None or owns_key(key):
+                    self._spilled[key] = None
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.draft")
+
+    def _write_spill(self, key: str, value: draft.Script_file) -> bool:
+        """Write a draft to the disk tier, returning whether it succeeded"""
+        if not self.spill_dir:
+            return False
+        path = self._spill_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(serialize_draft(value))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Failed to spill draft {key} to disk: {str(e)}", exc_info=True)
+            return False
+
+        self._spilled.pop(key, None)
+        self._spilled[key] = None
+        while len(self._spilled) > self.max_disk_drafts:
+            oldest, _ = self._spilled.popitem(last=False)
+            logger.warning(f"{oldest}, disk tier is full, deleting the oldest spilled draft")
+            self._remove_spill_file(oldest)
+            self._stats["disk_deletions"] += 1
+        return True
+
+    def _remove_spill_file(self, key: str) -> None:
+        try:
+            os.remove(self._spill_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _forget(self, key: str) -> Optional[draft.Script_file]:
+        """Remove a draft from the memory tier and its size accounting"""
+        self._last_access.pop(key, None)
+        self._current_bytes -= self._sizes.pop(key, 0)
+        return self._hot.pop(key, None)
+
+    def _refresh_size(self, key: str) -> None:
+        """Re-read the estimated size of a hot draft, which grows as segments are added or modified"""
+        size = getattr(self._hot[key], "retained_size", 0)
+        self._current_bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _over_budget(self) -> bool:
+        if len(self._hot) > self.max_size:
+            return True
+        return bool(self.max_bytes) and self._current_bytes > self.max_bytes
+
+    def _evict(self, key: str) -> None:
+        """Move a draft from memory to the disk tier"""
+        value = self._forget(key)
+        if not self._write_spill(key, value):
+            logger.warning(f"{key}, draft evicted from memory without a disk copy")
+
+    def _rehydrate(self, key: str) -> Optional[draft.Script_file]:
+        """Load a spilled draft back into memory, removing its disk copy"""
+        if key not in self._spilled:
+            return None
+        try:
+            with open(self._spill_path(key), "rb") as f:
+                value = deserialize_draft(f.read())
+        except Exception as e:
+            logger.error(f"Failed to rehydrate draft {key} from disk: {str(e)}", exc_info=True)
+            self._spilled.pop(key, None)
+            return None
+
+        # The in-memory copy becomes the only source of truth again
+        self._spilled.pop(key, None)
+        self._remove_spill_file(key)
+        logger.info(f"Rehydrated draft {key} from disk")
+        self._stats["rehydrations"] += 1
+        self.put(key, value)
+        return value
+
+    def spill_idle(self) -> int:
+        """Spill every draft that has not been accessed within `idle_seconds`
+
+        :return: Number of drafts spilled
+        """
+        with self._lock:
+            if not self.idle_seconds or not self.spill_dir:
+                return 0
+            deadline = time.time() - self.idle_seconds
+            idle_keys = [key for key in self._hot if self._last_access.get(key, 0) < deadline]
+            for key in idle_keys:
+                self._evict(key)
+            self._stats["idle_spills"] += len(idle_keys)
+            return len(idle_keys)
+
+    def flush(self) -> None:
+        """Write every in-memory draft to the disk tier, used on shutdown"""
+        with self._lock:
+            for key, value in list(self._hot.items()):
+                self._write_spill(key, value)
+
+    def put(self, key: str, value: draft.Script_file) -> None:
+        """Insert or refresh a draft as the most recently used item"""
+        with self._lock:
+            if key in self._hot and self._hot[key] is not value:
+                self._forget(key)
+            self._hot.pop(key, None)
+            self._hot[key] = value
+            self._last_access[key] = time.time()
+            self._refresh_size(key)
+
+            # If the cache is over its entry or byte budget, move the least recently used items
+            # (the first items) to disk, but never the draft that is being inserted
+            while self._over_budget() and len(self._hot) > 1:
+                oldest = next(iter(self._hot))
+                logger.info(f"{key}, Cache is full, spilling the least recently used draft {oldest}")
+                self._evict(oldest)
+                self._stats["evictions"] += 1
+
+            # A newer in-memory version supersedes any disk copy
+            if key in self._spilled:
+                self._spilled.pop(key)
+                self._remove_spill_file(key)
+
+            # Periodically move idle drafts out of memory
+            if self.idle_seconds and time.time() - self._last_idle_scan > min(self.idle_seconds, 60):
+                self._last_idle_scan = time.time()
+                self.spill_idle()
+
+    def get(self, key: str, default: Optional[draft.Script_file] = None) -> Optional[draft.Script_file]:
+        with self._lock:
+            if key in self._hot:
+                return self._hot[key]
+            value = self._rehydrate(key)
+            return default if value is None else value
+
+    def pop(self, key: str, default: Optional[draft.Script_file] = None) -> Optional[draft.Script_file]:
+        """Remove a draft from both tiers
+
+        A spilled draft is deleted from disk without loading it, `default` is returned for it.
+        """
+        with self._lock:
+            if key in self._hot:
+                return self._forget(key)
+            if key in self._spilled:
+                self._spilled.pop(key)
+                self._remove_spill_file(key)
+            return default
+
+    def stats(self) -> Dict[str, Any]:
+        """Current memory usage and eviction counters of the cache"""
+        with self._lock:
+            for key in self._hot:
+                self._refresh_size(key)
+            return {
+                "entries": len(self._hot),
+                "bytes": self._current_bytes,
+                "max_entries": self.max_size,
+                "max_bytes": self.max_bytes,
+                "spilled_entries": len(self._spilled),
+                **self._stats
+            }
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._hot or key in self._spilled
+
+    def __getitem__(self, key: str) -> draft.Script_file:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: draft.Script_file) -> None:
+        self.put(key, value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._hot)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._hot))
+
+
+class ShardedDraftCache:
+    """Lock-striped draft cache made of several independent `TieredDraftCache` shards
+
+    Each draft_id is mapped to one shard by a stable hash, so lookups and evictions of
+    unrelated drafts only contend when they land on the same shard. Entry, byte and disk
+    budgets are split evenly between the shards.
+    """
+
+    def __init__(self, shards: int, max_size: int, spill_dir: str, idle_seconds: float,
+                 max_disk_drafts: int, max_bytes: int = 0):
+        self.shard_count = shards
+        self.shards: List[TieredDraftCache] = [
+            TieredDraftCache(
+                max_size=max(1, max_size // shards),
+                spill_dir=spill_dir,
+                idle_seconds=idle_seconds,
+                max_disk_drafts=max(1, max_disk_drafts // shards),
+                max_bytes=max_bytes // shards,
+                owns_key=functools.partial(self._owns, index)
+            )
+            for index in range(shards)
+        ]
+
+    def _index(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % self.shard_count
+
+    def _owns(self, index: int, key: str) -> bool:
+        return self._index(key) == index
+
+    def shard_for(self, key: str) -> TieredDraftCache:
+        return self.shards[self._index(key)]
+
+    def put(self, key: str, value: draft.Script_file) -> None:
+        self.shard_for(key).put(key, value)
+
+    def get(self, key: str, default: Optional[draft.Script_file] = None) -> Optional[draft.Script_file]:
+        return self.shard_for(key).get(key, default)
+
+    def pop(self, key: str, default: Optional[draft.Script_file] = None) -> Optional[draft.Script_file]:
+        return self.shard_for(key).pop(key, default)
+
+    def spill_idle(self) -> int:
+        return sum(shard.spill_idle() for shard in self.shards)
+
+    def flush(self) -> None:
+        for shard in self.shards:
+            shard.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregated statistics of all shards"""
+        total: Dict[str, Any] = {}
+        for shard in self.shards:
+            for name, value in shard.stats().items():
+                total[name] = total.get(name, 0) + value
+        total["shards"] = self.shard_count
+        return total
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key in self.shard_for(key)
+
+    def __getitem__(self, key: str) -> draft.Script_file:
+        return self.shard_for(key)[key]
+
+    def __setitem__(self, key: str, value: draft.Script_file) -> None:
+        self.put(key, value)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def __iter__(self) -> Iterator[str]:
+        keys: List[str] = []
+        for shard in self.shards:
+            keys.extend(shard)
+        return iter(keys)
+
+
+class _DraftLock:
+    """Re-entrant mutation lock of a single draft, kept alive only while someone holds it"""
+
+    __slots__ = ("_lock", "__weakref__")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "_DraftLock":
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._lock.release()
+
+
+# Global draft store, hot drafts are kept in LRU order, limited to MAX_CACHE_SIZE in memory
+DRAFT_CACHE = ShardedDraftCache(
+    shards=CACHE_SHARDS,
+    max_size=MAX_CACHE_SIZE,
+    spill_dir=process_spill_dir(DRAFT_CACHE_CONFIG.get("spill_dir", "")),
+    idle_seconds=DRAFT_CACHE_CONFIG.get("idle_seconds", 0),
+    max_disk_drafts=DRAFT_CACHE_CONFIG.get("max_disk_drafts", 100000),
+    max_bytes=MAX_CACHE_BYTES
+)
+
+# Persist hot drafts on a normal interpreter exit so a restart does not lose them
+atexit.register(DRAFT_CACHE.flush)
+
+# Draft state backend; with a shared backend the local cache only holds copies of known versions
+DRAFT_BACKEND = create_backend(DRAFT_BACKEND_CONFIG)
+
+# Drafts modified by the outermost `locked_draft` call of the current thread, persisted when it returns
+_transaction = threading.local()
 
 def update_cache(key: str, value: draft.Script_file) -> None:
     """Update LRU cache"""
-    if key in DRAFT_CACHE:
-        # If the key exists, delete the old item
-        DRAFT_CACHE.pop(key)
-    elif len(DRAFT_CACHE) >= MAX_CACHE_SIZE:
-        print(f"{key}, Cache is full, deleting the least recently used item")
-        # If the cache is full, delete the least recently used item (the first item)
-        DRAFT_CACHE.popitem(last=False)
-    # Add new item to the end (most recently used)
-    DRAFT_CACHE[key] = value
\ No newline at end of file
+    DRAFT_CACHE.put(key, value)
+    if DRAFT_BACKEND.shared:
+        touched = getattr(_transaction, "touched", None)
+        if touched is not None:
+            touched.add(key)
+        else:
+            with draft_lock(key):
+                _commit_draft(key)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Get draft cache statistics (entries, estimated bytes, eviction counts)"""
+    return DRAFT_CACHE.stats()
+
+_DRAFT_LOCKS: "weakref.WeakValueDictionary[str, _DraftLock]" = weakref.WeakValueDictionary()
+_DRAFT_LOCKS_GUARD = threading.Lock()
+
+def draft_lock(draft_id: str) -> _DraftLock:
+    """Get the mutation lock of a draft, edits of the same draft must hold it
+
+    Usage: `with draft_lock(draft_id): ...`. The lock is re-entrant, so nested
+    helpers operating on the same draft may acquire it again.
+    """
+    with _DRAFT_LOCKS_GUARD:
+        lock = _DRAFT_LOCKS.get(draft_id)
+        if lock is None:
+            lock = _DraftLock()
+            _DRAFT_LOCKS[draft_id] = lock
+        return lock
+
+def _sync_draft(draft_id: str) -> None:
+    """Replace the local copy of a draft if the shared backend holds a newer version"""
+    current = DRAFT_BACKEND.version(draft_id)
+    if current == 0:
+        return
+    script = DRAFT_CACHE.get(draft_id)
+    if script is not None and getattr(script, "_backend_version", 0) == current:
+        return
+    loaded = DRAFT_BACKEND.load(draft_id)
+    if loaded is None:
+        return
+    version, data = loaded
+    script = deserialize_draft(data)
+    script._backend_version = version
+    DRAFT_CACHE.put(draft_id, script)
+
+def _commit_draft(draft_id: str) -> None:
+    """Store the local copy of a draft in the shared backend, based on the version it was loaded from
+
+    :raises VersionConflict: Another process stored the draft after it was loaded
+    """
+    script = DRAFT_CACHE.get(draft_id)
+    if script is None:
+        return
+    expected_version = getattr(script, "_backend_version", 0)
+    script._backend_version = DRAFT_BACKEND.store(draft_id, serialize_draft(script), expected_version)
+
+def _discard_local_copies(draft_ids) -> None:
+    """Drop local copies of drafts stored in the backend so the next access reloads them"""
+    for key in draft_ids:
+        script = DRAFT_CACHE.get(key)
+        if script is not None and getattr(script, "_backend_version", 0):
+            DRAFT_CACHE.pop(key)
+
+def sync_draft(draft_id: str) -> None:
+    """Make sure the local cache holds the latest version of a draft before reading it"""
+    if DRAFT_BACKEND.shared:
+        with draft_lock(draft_id):
+            _sync_draft(draft_id)
+
+def remove_draft(draft_id: str) -> None:
+    """Forget a draft, locally and in the shared backend"""
+    with draft_lock(draft_id):
+        DRAFT_CACHE.pop(draft_id)
+        DRAFT_BACKEND.delete(draft_id)
+
+def locked_draft(func: Callable) -> Callable:
+    """Decorator serializing calls that modify the draft given by their `draft_id` argument
+
+    Calls without a draft_id create a new draft that no other request can see yet,
+    so they run without locking.
+
+    With a shared draft backend the outermost call also loads the latest version of the draft
+    first and stores every draft it touched afterwards. If another process stored one of them
+    in between, the local copies are dropped and the call is retried on the new version.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        draft_id = signature.bind_partial(*args, **kwargs).arguments.get("draft_id")
+        lock = draft_lock(draft_id) if draft_id else contextlib.nullcontext()
+        if not DRAFT_BACKEND.shared or getattr(_transaction, "touched", None) is not None:
+            with lock:
+                return func(*args, **kwargs)
+
+        for attempt in range(1, BACKEND_MAX_RETRIES + 1):
+            touched = set()
+            with lock:
+                _transaction.touched = touched
+                try:
+                    if draft_id:
+                        _sync_draft(draft_id)
+                    result = func(*args, **kwargs)
+                    for key in touched:
+                        with draft_lock(key):
+                            _commit_draft(key)
+                    return result
+                except VersionConflict as e:
+                    if attempt == BACKEND_MAX_RETRIES:
+                        raise
+                    logger.warning(f"{e}, retrying {func.__name__} (attempt {attempt + 1}/{BACKEND_MAX_RETRIES})")
+                    _discard_local_copies(touched)
+                except Exception:
+                    # Drop partially modified copies, the backend still holds the last good version
+                    _discard_local_copies(touched)
+                    raise
+                finally:
+                    _transaction.touched = None
+    return wrapper
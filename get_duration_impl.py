@@ -1,52 +1,31 @@
 import subprocess
 import json
 import time
+from media_probe import probe_media, media_duration
 
-def get_video_duration(video_url):
+def get_video_duration(video_url, timeout_seconds=10, max_retries=3):
     """
     Get video duration with timeout retry support.
     :param video_url: Video URL
+    :param timeout_seconds: Timeout of each attempt in seconds
+    :param max_retries: Maximum number of attempts
     :return: Video duration (seconds)
     """
     
-    # Define retry count and wait time for each retry
-    max_retries = 3
+    # Wait time between retries
     retry_delay_seconds = 1 # 1 second interval between retries
-    timeout_seconds = 10 # Set timeout for each attempt
 
     for attempt in range(max_retries):
         print(f"Attempting to get video duration (Attempt {attempt + 1}/{max_retries}) ...")
         result = {"success": False, "output": 0, "error": None} # Reset result before each retry
         
         try:
-            command = [
-                'ffprobe',
-                '-v', 'error',
-                '-show_entries', 'stream=duration',
-                '-show_entries', 'format=duration',
-                '-print_format', 'json',
-                video_url
-            ]
+            # One ffprobe call for all streams, shared through the media probe cache
+            info = probe_media(video_url, timeout=timeout_seconds)
             
-            # Use subprocess.run for more flexible handling of timeout and output
-            process = subprocess.run(command, 
-                                     capture_output=True, 
-                                     text=True, # Auto decode to text
-                                     timeout=timeout_seconds, # Use variable to set timeout
-                                     check=True) # Raise CalledProcessError if non-zero exit code
-
-            info = json.loads(process.stdout)
-            
-            # Prioritize getting duration from streams because it's more accurate
-            media_streams = [s for s in info.get('streams', []) if 'duration' in s]
-            
-            if media_streams:
-                duration = float(media_streams[0]['duration'])
-                result["output"] = duration
-                result["success"] = True
-            # Otherwise get duration from format information
-            elif 'format' in info and 'duration' in info['format']:
-                duration = float(info['format']['duration'])
+            # Prioritize getting duration from streams because it's more accurate, otherwise use format information
+            duration = media_duration(info)
+            if duration is not None:
                 result["output"] = duration
                 result["success"] = True
             else:
@@ -61,8 +40,9 @@ def get_video_duration(video_url):
             result["error"] = f"Getting video duration timed out (exceeded {timeout_seconds} seconds)."
             print(f"Attempt {attempt + 1} timed out.")
         except subprocess.CalledProcessError as e:
-            result["error"] = f"Error executing ffprobe command (exit code {e.returncode}): {e.stderr.strip()}"
-            print(f"Attempt {attempt + 1} failed. Error: {e.stderr.strip()}")
+            error_output = e.output.decode('utf-8', errors='replace').strip() if e.output else ""
+            result["error"] = f"Error executing ffprobe command (exit code {e.returncode}): {error_output}"
+            print(f"Attempt {attempt + 1} failed. Error: {error_output}")
         except json.JSONDecodeError as e:
             result["error"] = f"Error parsing JSON data: {e}"
             print(f"Attempt {attempt + 1} failed. JSON parsing error: {e}")
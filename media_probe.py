@@ -0,0 +1,450 @@
+import os
+import json
+import time
+import struct
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+import imageio.v2 as imageio
+
+from util import url_to_hash
+from settings.local import MEDIA_PROBE_CACHE_CONFIG
+
+logger = logging.getLogger('flask_video_generator')
+
+# Timeout of the HEAD request used to read and revalidate ETag/Last-Modified
+VALIDATOR_TIMEOUT_SECONDS = 5
+
+# Bytes read from the start of an image to find its dimensions, enough for the header of
+# every supported format and for JPEG files whose EXIF block precedes the frame header
+IMAGE_HEADER_BYTES = 64 * 1024
+
+
+def _is_remote(url: str) -> bool:
+    return url.startswith(("http://", "https://"))
+
+
+def _local_validator(path: str) -> Optional[Dict[str, str]]:
+    """Validator of a local file: a change of size or modification time invalidates its probe results"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"stat": f"{stat.st_size}-{stat.st_mtime_ns}"}
+
+
+def remote_validator(url: str, cached: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+    """Read the ETag/Last-Modified of a remote file, conditionally when `cached` validators are known
+
+    :return: The cached validators if the server answered 304, the new validators otherwise
+             (empty when the server sends none), None if the request failed
+    """
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        response = requests.head(url, headers=headers, timeout=VALIDATOR_TIMEOUT_SECONDS, allow_redirects=True)
+    except requests.RequestException as e:
+        logger.warning(f"Failed to read validators of {url}: {str(e)}")
+        return None
+    if response.status_code == 304 and cached:
+        return cached
+    if response.status_code >= 400:
+        return None
+    validator = {}
+    if response.headers.get("ETag"):
+        validator["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validator["last_modified"] = response.headers["Last-Modified"]
+    return validator
+
+
+class ProbeCache:
+    """Cache of media probe results (ffprobe output, image size...) keyed by the hash of the media URL
+
+    Each media has one entry holding the results of every probe query made for it, together
+    with its ETag/Last-Modified (or size and mtime for local files). Entries younger than
+    `ttl_seconds` are used as is; older entries are revalidated with a conditional HEAD request
+    and their results dropped if the media changed. Entries live in an LRU memory tier and,
+    when `disk_dir` is set, in one JSON file per media so they survive restarts and are shared
+    by all worker processes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, disk_dir: str = "", max_disk_entries: int = 0):
+        """
+        :param max_entries: Maximum number of media kept in memory
+        :param ttl_seconds: Age after which an entry is revalidated against the media
+        :param disk_dir: Directory of the on-disk tier, empty to disable it
+        :param max_disk_entries: Maximum number of files in the on-disk tier, oldest are deleted first, 0 for unbounded
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "revalidations": 0, "invalidations": 0}
+        self._lock = threading.RLock()
+        self._disk_count = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_count = sum(1 for name in os.listdir(self.disk_dir) if name.endswith(".json"))
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[dict]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable probe cache entry {key}: {str(e)}")
+            return None
+
+    def _write_disk(self, key: str, entry: dict) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            existed = os.path.exists(path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write probe cache entry {key}: {str(e)}")
+            return
+        if not existed:
+            self._disk_count += 1
+            if self.max_disk_entries and self._disk_count > self.max_disk_entries:
+                self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        """Delete the oldest tenth of the on-disk entries"""
+        entries = [e for e in os.scandir(self.disk_dir) if e.name.endswith(".json")]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        excess = len(entries) - self.max_disk_entries + self.max_disk_entries // 10
+        for entry in entries[:max(excess, 0)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        self._disk_count = len(entries) - max(excess, 0)
+
+    def _remember(self, key: str, entry: dict) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def _is_fresh(self, url: str, entry: dict) -> bool:
+        """Check whether an entry can be used without asking the server"""
+        if not _is_remote(url):
+            return entry.get("validator") == _local_validator(url)
+        return time.time() - entry.get("fetched_at", 0) < self.ttl_seconds
+
+    def _revalidate(self, url: str, entry: dict) -> bool:
+        """Ask the server whether a stale entry still describes the media"""
+        # Without validators there is no cheap way to tell whether the media changed
+        if not _is_remote(url) or not entry.get("validator"):
+            return False
+        return remote_validator(url, entry["validator"]) == entry["validator"]
+
+    def get(self, url: str, query: str, compute: Callable[[], Any], validator: Optional[Dict[str, str]] = None) -> Any:
+        """Return the cached result of a probe query on a media, computing and caching it on a miss
+
+        Exceptions raised by `compute` propagate and nothing is cached for the query.
+
+        :param url: Remote URL or local path of the media
+        :param query: Name of the probe query, results of different queries are cached separately
+        :param compute: Function performing the probe
+        :param validator: ETag/Last-Modified of a remote media already known to the caller, stored on a miss
+                          instead of asking the server with a HEAD request; {} if none are known
+        """
+        key = url_to_hash(url, 32)
+        with self._lock:
+            entry = self._load(key)
+            if entry is not None and entry.get("url") != url:
+                entry = None
+            fresh = entry is not None and self._is_fresh(url, entry)
+            if fresh and query in entry["results"]:
+                self._stats["hits"] += 1
+                return entry["results"][query]
+
+        # Network requests and probes run outside the lock
+        if entry is not None and not fresh:
+            revalidated = self._revalidate(url, entry)
+            with self._lock:
+                self._stats["revalidations"] += 1
+                if revalidated:
+                    entry["fetched_at"] = time.time()
+                    self._write_disk(key, entry)
+                    if query in entry["results"]:
+                        self._stats["hits"] += 1
+                        return entry["results"][query]
+                else:
+                    self._stats["invalidations"] += 1
+                    entry = None
+        with self._lock:
+            self._stats["misses"] += 1
+
+        if entry is None:
+            if not _is_remote(url):
+                validator = _local_validator(url)
+            elif validator is None:
+                # Read the validators before probing, so a change during the probe is caught next time
+                validator = remote_validator(url)
+            entry = {"url": url, "validator": validator, "fetched_at": time.time(), "results": {}}
+        result = compute()
+
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.get("url") == url and current.get("validator") == entry["validator"]:
+                # Another thread cached other queries of the same media meanwhile
+                entry = current
+            entry["results"][query] = result
+            self._remember(key, entry)
+            self._write_disk(key, entry)
+        return result
+
+    def invalidate(self, url: str) -> None:
+        """Forget every probe result of a media"""
+        key = url_to_hash(url, 32)
+        with self._lock:
+            self._entries.pop(key, None)
+            if self.disk_dir:
+                try:
+                    os.remove(self._disk_path(key))
+                    self._disk_count -= 1
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics: memory entries, hits, misses, revalidations and invalidations"""
+        with self._lock:
+            return {"memory_entries": len(self._entries), "disk_entries": self._disk_count, **self._stats}
+
+
+PROBE_CACHE = ProbeCache(
+    max_entries=MEDIA_PROBE_CACHE_CONFIG.get("max_entries", 10000),
+    ttl_seconds=MEDIA_PROBE_CACHE_CONFIG.get("ttl_seconds", 86400),
+    disk_dir=MEDIA_PROBE_CACHE_CONFIG.get("disk_dir", "./tmp/probe_cache"),
+    max_disk_entries=MEDIA_PROBE_CACHE_CONFIG.get("max_disk_entries", 100000)
+)
+
+
+def run_ffprobe(media_path: str, args: List[str], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Run ffprobe with JSON output on a media and return the parsed result
+
+    :param media_path: Remote URL or local path of the media
+    :param args: ffprobe options selecting streams and entries, `-v error -of json` is added
+    :param timeout: Seconds before the ffprobe process is killed, None for no limit
+    :raises subprocess.CalledProcessError: ffprobe failed
+    :raises subprocess.TimeoutExpired: ffprobe did not finish in time
+    :raises ValueError: The output contains no JSON data
+    """
+    command = ['ffprobe', '-v', 'error', *args, '-of', 'json', media_path]
+    output = subprocess.check_output(command, stderr=subprocess.STDOUT, timeout=timeout).decode('utf-8')
+    # Find JSON start position (first '{'), ffprobe may print warnings before it
+    json_start = output.find('{')
+    if json_start == -1:
+        raise ValueError(f"No JSON data found in ffprobe output: {output}")
+    return json.loads(output[json_start:])
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _copy_validator(local_path: Optional[str], validator: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """Validators to cache the probe of a media under
+
+    A probe of a downloaded copy never asks the server: it uses the validators recorded by the download,
+    or none at all, in which case the cached results expire after the TTL instead of being revalidated.
+    """
+    if validator is None and local_path:
+        return {}
+    return validator
+
+
+def probe_media(media_path: str, timeout: Optional[float] = None, local_path: Optional[str] = None,
+                validator: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Probe all streams and the container of a media with a single ffprobe call, through the probe cache
+
+    :param media_path: Remote URL or local path of the media
+    :param timeout: Seconds before the ffprobe process is killed, None for no limit
+    :param local_path: Downloaded copy of the media, probed instead of fetching `media_path` again;
+                       the result is still cached under `media_path`
+    :param validator: ETag/Last-Modified of `media_path` recorded when `local_path` was downloaded
+    :return: {"format_name": str, "format_duration": float or None,
+              "streams": [{"codec_type": str, "width": int, "height": int, "duration": float or None}, ...]}
+    :raises subprocess.CalledProcessError: ffprobe failed
+    :raises subprocess.TimeoutExpired: ffprobe did not finish in time
+    :raises ValueError: The output contains no JSON data
+    """
+    def probe() -> Dict[str, Any]:
+        info = run_ffprobe(local_path or media_path, [
+            '-show_entries', 'stream=codec_type,width,height,duration',
+            '-show_entries', 'format=duration,format_name',
+        ], timeout)
+        media_format = info.get('format', {})
+        return {
+            "format_name": media_format.get('format_name', ''),
+            "format_duration": _optional_float(media_format.get('duration')),
+            "streams": [{
+                "codec_type": stream.get('codec_type', ''),
+                "width": int(stream.get('width', 0)),
+                "height": int(stream.get('height', 0)),
+                "duration": _optional_float(stream.get('duration')),
+            } for stream in info.get('streams', [])]
+        }
+    return PROBE_CACHE.get(media_path, "media", probe, _copy_validator(local_path, validator))
+
+
+def first_stream(media_info: Dict[str, Any], codec_type: str) -> Optional[Dict[str, Any]]:
+    """First stream of the given codec type ("video", "audio"...) in a `probe_media` result, None if absent"""
+    for stream in media_info["streams"]:
+        if stream["codec_type"] == codec_type:
+            return stream
+    return None
+
+
+def media_duration(media_info: Dict[str, Any], codec_type: Optional[str] = None) -> Optional[float]:
+    """Duration in seconds from a `probe_media` result
+
+    Stream durations are more accurate and preferred, the container duration is the fallback.
+
+    :param codec_type: Take the duration of the first stream of this type, None for the first stream having one
+    """
+    if codec_type is not None:
+        stream = first_stream(media_info, codec_type)
+        streams = [stream] if stream is not None else []
+    else:
+        streams = media_info["streams"]
+    for stream in streams:
+        if stream["duration"] is not None:
+            return stream["duration"]
+    return media_info["format_duration"]
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Walk the JPEG markers up to the first start-of-frame segment, which holds the size"""
+    index = 2
+    while index + 4 <= len(data):
+        if data[index] != 0xFF:
+            return None
+        marker = data[index + 1]
+        if marker == 0xFF:  # Fill byte
+            index += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # Markers without a length
+            index += 2
+            continue
+        # Start of frame markers, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if index + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[index + 5:index + 9])
+            return width, height
+        index += 2 + struct.unpack(">H", data[index + 2:index + 4])[0]
+    return None
+
+
+def read_image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read the (width, height) of a PNG, JPEG, GIF, WebP or BMP image from the start of its file
+
+    :param data: First bytes of the file, `IMAGE_HEADER_BYTES` is enough in practice
+    :return: None if the format is not recognized or the header is incomplete
+    """
+    try:
+        if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR":
+            return struct.unpack(">II", data[16:24])
+        if data.startswith(b"\xff\xd8"):
+            return _jpeg_size(data)
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", data[6:10])
+        if data.startswith(b"RIFF") and data[8:12] == b"WEBP":
+            chunk = data[12:16]
+            if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+                width, height = struct.unpack("<HH", data[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L" and data[20:21] == b"\x2f":
+                bits = struct.unpack("<I", data[21:25])[0]
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+            return None
+        if data.startswith(b"BM"):
+            header_size = struct.unpack("<I", data[14:18])[0]
+            if header_size == 12:  # OS/2 bitmap header
+                return struct.unpack("<HH", data[18:22])
+            width, height = struct.unpack("<ii", data[18:26])
+            return width, abs(height)  # Negative height means a top-down bitmap
+    except struct.error:
+        return None
+    return None
+
+
+def _read_image_header(media_path: str, timeout: Optional[float]) -> bytes:
+    """Read the first `IMAGE_HEADER_BYTES` of a local or remote image, using an HTTP Range request"""
+    if not _is_remote(media_path):
+        with open(media_path, "rb") as f:
+            return f.read(IMAGE_HEADER_BYTES)
+    headers = {"Range": f"bytes=0-{IMAGE_HEADER_BYTES - 1}"}
+    # Servers ignoring the Range header send the whole file, stop reading after the header anyway
+    with requests.get(media_path, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        data = b""
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            data += chunk
+            if len(data) >= IMAGE_HEADER_BYTES:
+                break
+    return data[:IMAGE_HEADER_BYTES]
+
+
+def probe_image_size(media_path: str, timeout: Optional[float] = None, local_path: Optional[str] = None,
+                     validator: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """Get the pixel size of an image from its header, through the probe cache
+
+    Only the start of the file is read; the image is downloaded and decoded in full
+    only when the header cannot be parsed.
+
+    :param media_path: Remote URL or local path of the image
+    :param timeout: Timeout of the network requests in seconds, None for no limit
+    :param local_path: Downloaded copy of the image, read instead of `media_path`;
+                       the result is still cached under `media_path`
+    :param validator: ETag/Last-Modified of `media_path` recorded when `local_path` was downloaded
+    :return: {"width": int, "height": int}
+    """
+    def probe() -> Dict[str, int]:
+        source = local_path or media_path
+        size = read_image_size(_read_image_header(source, timeout))
+        if size is None:
+            logger.info(f"Unrecognized image header, decoding {source} to read its size")
+            height, width = imageio.imread(source).shape[:2]
+            size = (width, height)
+        return {"width": int(size[0]), "height": int(size[1])}
+    return PROBE_CACHE.get(media_path, "image_size", probe, _copy_validator(local_path, validator))
@@ -1,47 +1,182 @@
 
 import oss2
 import os
-from settings.local import OSS_CONFIG, MP4_OSS_CONFIG
+import time
+import logging
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from oss2.models import PartInfo
+from settings.local import OSS_CONFIG, MP4_OSS_CONFIG, OSS_UPLOAD_CONFIG
+
+logger = logging.getLogger('flask_video_generator')
+
+# Bucket objects keep their HTTP session (and its connections) alive, they are created once per configuration
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+def get_bucket():
+    """Return the shared Bucket of OSS_CONFIG"""
+    key = ("default", OSS_CONFIG['access_key_id'], OSS_CONFIG['access_key_secret'],
+           OSS_CONFIG['endpoint'], OSS_CONFIG['bucket_name'])
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            auth = oss2.Auth(OSS_CONFIG['access_key_id'], OSS_CONFIG['access_key_secret'])
+            bucket = _BUCKETS[key] = oss2.Bucket(auth, OSS_CONFIG['endpoint'], OSS_CONFIG['bucket_name'])
+        return bucket
+
+def get_mp4_bucket():
+    """Return the shared Bucket of MP4_OSS_CONFIG (custom domain, v4 signature)"""
+    key = ("mp4", MP4_OSS_CONFIG['access_key_id'], MP4_OSS_CONFIG['access_key_secret'],
+           MP4_OSS_CONFIG['endpoint'], MP4_OSS_CONFIG['bucket_name'], MP4_OSS_CONFIG['region'])
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            auth = oss2.AuthV4(MP4_OSS_CONFIG['access_key_id'], MP4_OSS_CONFIG['access_key_secret'])
+            bucket = _BUCKETS[key] = oss2.Bucket(
+                auth,
+                MP4_OSS_CONFIG['endpoint'],
+                MP4_OSS_CONFIG['bucket_name'],
+                region=MP4_OSS_CONFIG['region'],
+                is_cname=True
+            )
+        return bucket
+
+def _is_retriable(error):
+    """Network errors and server-side (5xx) errors are worth retrying, other errors are not"""
+    return isinstance(error, oss2.exceptions.RequestError) or \
+        (isinstance(error, oss2.exceptions.ServerError) and error.status >= 500)
+
+def _with_retries(operation, description):
+    """Run an OSS operation, retrying transient failures with exponential backoff"""
+    max_retries = max(1, OSS_UPLOAD_CONFIG.get("max_retries", 3))
+    for attempt in range(1, max_retries + 1):
+        try:
+            return operation()
+        except oss2.exceptions.OssError as e:
+            if attempt == max_retries or not _is_retriable(e):
+                raise
+            logger.warning(f"{description} failed ({e.__class__.__name__}, status {e.status}), "
+                           f"retrying (attempt {attempt + 1}/{max_retries})")
+            time.sleep(2 ** attempt)
+
+def upload_file(bucket, object_name, path):
+    """Upload a local file
+
+    Files of at least `multipart_threshold` bytes are uploaded as parts, `num_threads` at a
+    time. The parts already uploaded are recorded in `checkpoint_dir`, so a retry (or a later
+    call after a crash) only uploads the missing parts.
+    """
+    store = oss2.ResumableStore(root=os.path.abspath(OSS_UPLOAD_CONFIG.get("checkpoint_dir", "./tmp/oss_checkpoints")))
+    _with_retries(lambda: oss2.resumable_upload(
+        bucket, object_name, path,
+        store=store,
+        multipart_threshold=OSS_UPLOAD_CONFIG.get("multipart_threshold", 64 * 1024 * 1024),
+        part_size=OSS_UPLOAD_CONFIG.get("part_size", 8 * 1024 * 1024),
+        num_threads=OSS_UPLOAD_CONFIG.get("num_threads", 4)
+    ), f"Upload of {object_name}")
+
+def _iter_parts(data, part_size):
+    """Regroup an iterator of bytes into blocks of `part_size` bytes (the last one may be shorter)"""
+    buffer = bytearray()
+    for chunk in data:
+        buffer += chunk
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+def upload_stream(bucket, object_name, data):
+    """Upload content produced by an iterator of bytes, e.g. a zip archive being built
+
+    Content fitting in one part is sent with a single request. Longer content is uploaded as
+    parts, `num_threads` at a time while the next parts are produced; at most twice that
+    many parts are held in memory. Failed parts are retried; the stream itself cannot be
+    replayed, so there is no checkpoint.
+    """
+    part_size = OSS_UPLOAD_CONFIG.get("part_size", 8 * 1024 * 1024)
+    num_threads = max(1, OSS_UPLOAD_CONFIG.get("num_threads", 4))
+    parts = _iter_parts(data, part_size)
+    first = next(parts, b"")
+    second = next(parts, None)
+    if second is None:
+        _with_retries(lambda: bucket.put_object(object_name, first), f"Upload of {object_name}")
+        return
+
+    upload_id = _with_retries(lambda: bucket.init_multipart_upload(object_name).upload_id, f"Initiating upload of {object_name}")
+
+    def upload_part(number, content):
+        result = _with_retries(lambda: bucket.upload_part(object_name, upload_id, number, content),
+                               f"Upload of part {number} of {object_name}")
+        return PartInfo(number, result.etag, size=len(content))
+
+    try:
+        with ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="oss-part") as pool:
+            futures = []
+            pending = set()
+            for number, content in enumerate(itertools.chain([first, second], parts), 1):
+                if len(pending) >= num_threads * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                future = pool.submit(upload_part, number, content)
+                futures.append(future)
+                pending.add(future)
+            uploaded = [future.result() for future in futures]
+        _with_retries(lambda: bucket.complete_multipart_upload(object_name, upload_id, uploaded),
+                      f"Completing upload of {object_name}")
+    except BaseException:
+        try:
+            bucket.abort_multipart_upload(object_name, upload_id)
+        except oss2.exceptions.OssError as e:
+            logger.warning(f"Failed to abort upload {upload_id} of {object_name}: {e}")
+        raise
 
 def upload_to_oss(path):
-    # Create OSS client
-    auth = oss2.Auth(OSS_CONFIG['access_key_id'], OSS_CONFIG['access_key_secret'])
-    bucket = oss2.Bucket(auth, OSS_CONFIG['endpoint'], OSS_CONFIG['bucket_name'])
-    
+    # Reuse the OSS client
+    bucket = get_bucket()
+
     # Upload file
     object_name = os.path.basename(path)
-    bucket.put_object_from_file(object_name, path)
-    
+    upload_file(bucket, object_name, path)
+
     # Generate signed URL (valid for 24 hours)
     url = bucket.sign_url('GET', object_name, 24 * 60 * 60)
-    
+
     # Clean up temporary file
     os.remove(path)
-    
+
     return url
 
+def upload_stream_to_oss(object_name, data):
+    """Upload content produced by an iterator of bytes, e.g. a zip archive being built
+
+    No temporary file is needed, see `upload_stream`.
+    :param object_name: Object key
+    :param data: Iterator of bytes
+    :return: Signed URL of the object, valid for 24 hours
+    """
+    bucket = get_bucket()
+
+    upload_stream(bucket, object_name, data)
+
+    return bucket.sign_url('GET', object_name, 24 * 60 * 60)
+
 def upload_mp4_to_oss(path):
     """Special method for uploading MP4 files, using custom domain and v4 signature"""
-    # Directly use credentials from the configuration file
-    auth = oss2.AuthV4(MP4_OSS_CONFIG['access_key_id'], MP4_OSS_CONFIG['access_key_secret'])
-    
-    # Create OSS client with custom domain
-    bucket = oss2.Bucket(
-        auth, 
-        MP4_OSS_CONFIG['endpoint'], 
-        MP4_OSS_CONFIG['bucket_name'], 
-        region=MP4_OSS_CONFIG['region'], 
-        is_cname=True
-    )
-    
+    # Reuse the OSS client with custom domain
+    bucket = get_mp4_bucket()
+
     # Upload file
     object_name = os.path.basename(path)
-    bucket.put_object_from_file(object_name, path)
-    
+    upload_file(bucket, object_name, path)
+
     # Generate pre-signed URL (valid for 24 hours), set slash_safe to True to avoid path escaping
     url = bucket.sign_url('GET', object_name, 24 * 60 * 60, slash_safe=True)
-    
+
     # Clean up temporary file
     os.remove(path)
-    
-    return url
\ No newline at end of file
+
+    return url
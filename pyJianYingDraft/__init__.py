@@ -7,19 +7,9 @@ from .video_segment import Video_segment, Sticker_segment, Clip_settings
 from .effect_segment import Effect_segment, Filter_segment
 from .text_segment import Text_segment, Text_style, Text_border, Text_background
 
-from .metadata import Font_type
 from .metadata import Mask_type
 from .metadata import CapCut_Mask_type
-from .metadata import Transition_type, Filter_type
-from .metadata import CapCut_Transition_type
-from .metadata import Intro_type, Outro_type, Group_animation_type
-from .metadata import CapCut_Intro_type, CapCut_Outro_type, CapCut_Group_animation_type
-from .metadata import Text_intro, Text_outro, Text_loop_anim
-from .metadata import CapCut_Text_intro, CapCut_Text_outro, CapCut_Text_loop_anim
-from .metadata import Audio_scene_effect_type, Tone_effect_type, Speech_to_song_type
-from .metadata import CapCut_Voice_filters_effect_type, CapCut_Voice_characters_effect_type, CapCut_Speech_to_song_effect_type
-from .metadata import Video_scene_effect_type, Video_character_effect_type
-from .metadata import CapCut_Video_scene_effect_type, CapCut_Video_character_effect_type
+from . import metadata as _metadata
 
 from .track import Track_type
 from .template_mode import Shrink_mode, Extend_mode
@@ -28,6 +18,12 @@ from .draft_folder import Draft_folder
 
 from .time_util import SEC, tim, trange
 
+def __getattr__(name: str):
+    # 字体/特效/动画等元数据枚举由metadata子包按需加载
+    if name in _metadata._LAZY_TYPES:
+        return getattr(_metadata, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 __all__ = [
     "Font_type",
     "Mask_type",
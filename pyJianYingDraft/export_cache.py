@@ -0,0 +1,159 @@
+"""带脏标记的导出缓存, 未修改的片段/素材/轨道在再次导出时直接复用上次的JSON片段"""
+
+import weakref
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+class Dirty_tracked:
+    """修改公开属性时自动标记为脏, 并缓存`export_json()`结果的混入类
+
+    赋值给公开属性的`Dirty_tracked`对象及列表中的元素会记录其所有者, 它们被修改时所有者的缓存一并失效;
+    列表属性会被替换为`Tracked_list`, 因此向列表中追加或删除元素同样会使缓存失效.
+    其他影响导出结果的原地修改(如修改属性中的字典)需调用`mark_dirty()`.
+
+    `cached_export()`返回的字典为共享的缓存对象, 调用方不得修改, 需要改动时应先复制.
+    `util.cached_retained_size()`缓存的内存占用估算同样在对象被修改时失效.
+    """
+
+    _shared_attrs: Tuple[str, ...] = ()
+    """引用其他对象共享的实例(如素材)的属性, 不计入本对象的内存占用估算"""
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+            return
+        object.__setattr__(self, name, self._adopt(value))
+        self.mark_dirty()
+
+    def _adopt(self, value: Any) -> Any:
+        """登记本对象为属性值的所有者, 普通列表转换为`Tracked_list`"""
+        if isinstance(value, Dirty_tracked):
+            value._add_owner(self)
+        elif isinstance(value, list) and not (isinstance(value, Tracked_list) and value.owner is self):
+            value = Tracked_list(self, value)
+        return value
+
+    def _add_owner(self, owner: "Dirty_tracked") -> None:
+        owners = self.__dict__.get("_owners")
+        if owners is None:
+            owners = []
+            object.__setattr__(self, "_owners", owners)
+        elif any(ref() is owner for ref in owners):
+            return
+        owners.append(weakref.ref(owner))
+
+    def mark_dirty(self, _seen: Optional[Set[int]] = None) -> None:
+        """标记对象已被修改, 使本对象及其所有者的导出缓存失效"""
+        self.__dict__.pop("_export_cache", None)
+        self.__dict__.pop("_size_cache", None)
+        owners = self.__dict__.get("_owners")
+        if not owners:
+            return
+        if _seen is None:
+            _seen = set()
+        _seen.add(id(self))
+        for ref in owners:
+            owner = ref()
+            if owner is not None and id(owner) not in _seen:
+                owner.mark_dirty(_seen)
+
+    def cached_export(self) -> Dict[str, Any]:
+        """返回`export_json()`的结果, 自上次导出后未被修改时直接复用"""
+        exported = self.__dict__.get("_export_cache")
+        if exported is None:
+            exported = self.export_json()  # type: ignore[attr-defined]
+            object.__setattr__(self, "_export_cache", exported)
+        return exported
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # 缓存及所有者引用可随时重建, 不随草稿一起序列化
+        state = self.__dict__.copy()
+        state.pop("_export_cache", None)
+        state.pop("_size_cache", None)
+        state.pop("_owners", None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value if name.startswith("_") else self._adopt(value))
+
+
+class Tracked_list(list):
+    """被修改时通知所有者的列表, 序列化时还原为普通列表"""
+
+    __slots__ = ("_owner_ref",)
+
+    def __init__(self, owner: Dirty_tracked, items=()):
+        super().__init__(items)
+        self._owner_ref = weakref.ref(owner)
+        for item in self:
+            self._adopt_item(item)
+
+    @property
+    def owner(self) -> Optional[Dirty_tracked]:
+        return self._owner_ref()
+
+    def _adopt_item(self, item: Any) -> None:
+        owner = self._owner_ref()
+        if owner is not None and isinstance(item, Dirty_tracked):
+            item._add_owner(owner)
+
+    def _changed(self) -> None:
+        owner = self._owner_ref()
+        if owner is not None:
+            owner.mark_dirty()
+
+    def append(self, item: Any) -> None:
+        super().append(item)
+        self._adopt_item(item)
+        self._changed()
+
+    def insert(self, index: int, item: Any) -> None:
+        super().insert(index, item)
+        self._adopt_item(item)
+        self._changed()
+
+    def extend(self, items) -> None:
+        items = list(items)
+        super().extend(items)
+        for item in items:
+            self._adopt_item(item)
+        self._changed()
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        for item in (value if isinstance(index, slice) else (value,)):
+            self._adopt_item(item)
+        self._changed()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._changed()
+
+    def pop(self, *args) -> Any:
+        item = super().pop(*args)
+        self._changed()
+        return item
+
+    def remove(self, item: Any) -> None:
+        super().remove(item)
+        self._changed()
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._changed()
+
+    def __reduce_ex__(self, protocol):
+        return (list, (list(self),))
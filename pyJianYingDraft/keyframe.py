@@ -3,7 +3,9 @@ import uuid
 from enum import Enum
 from typing import Dict, List, Any
 
-class Keyframe:
+from .export_cache import Dirty_tracked
+
+class Keyframe(Dirty_tracked):
     """一个关键帧（关键点）, 目前只支持线性插值"""
 
     kf_id: str
@@ -62,7 +64,7 @@ class Keyframe_property(Enum):
     volume = "KFTypeVolume"
     """音量, 1.0为原始音量, 仅对`Audio_segment`和`Video_segment`有效"""
 
-class Keyframe_list:
+class Keyframe_list(Dirty_tracked):
     """关键帧列表, 记录与某个特定属性相关的一系列关键帧"""
 
     list_id: str
@@ -17,7 +17,10 @@ else:
             return key
 import imageio.v2 as imageio
 
-class Crop_settings:
+from media_probe import probe_media, first_stream, media_duration
+from .export_cache import Dirty_tracked
+
+class Crop_settings(Dirty_tracked):
     """素材的裁剪设置, 各属性均在0-1之间, 注意素材的坐标原点在左上角"""
 
     upper_left_x: float
@@ -55,7 +58,7 @@ class Crop_settings:
             "lower_right_y": self.lower_right_y
         }
 
-class Video_material:
+class Video_material(Dirty_tracked):
     """本地视频素材（视频或图片）, 一份素材可以在多个片段中使用"""
 
     material_id: str
@@ -162,40 +165,20 @@ class Video_material:
         try:
             # 使用ffprobe获取媒体信息
             media_path = self.path if self.path else self.remote_url
-            command = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'v:0',  # 选择第一个视频流
-                '-show_entries', 'stream=width,height,duration,codec_type',  # 添加codec_type
-                '-show_entries', 'format=duration,format_name',  # 添加format_name
-                '-of', 'json',
-                media_path
-            ]
-            result = subprocess.check_output(command, stderr=subprocess.STDOUT)
-            result_str = result.decode('utf-8')
-            # 查找JSON开始位置（第一个'{'）
-            json_start = result_str.find('{')
-            if json_start != -1:
-                json_str = result_str[json_start:]
-                info = json.loads(json_str)
-            else:
-                raise ValueError(f"无法在输出中找到JSON数据: {result_str}")
+            # 一次ffprobe获取所有流及格式信息, 同一素材的探测结果由所有草稿共享
+            info = probe_media(media_path)
+            stream = first_stream(info, "video")
             
-            if 'streams' in info and len(info['streams']) > 0:
-                stream = info['streams'][0]
-                self.width = int(stream.get('width', 0))
-                self.height = int(stream.get('height', 0))
+            if stream is not None:
+                self.width = stream["width"]
+                self.height = stream["height"]
                 
                 # 如果指定了material_type，则优先使用指定的类型
                 if material_type is not None:
                     self.material_type = material_type
                 else:
-                    # 通过format_name和codec_type判断是否是动态视频
-                    format_name = info.get('format', {}).get('format_name', '').lower()
-                    codec_type = stream.get('codec_type', '').lower()
-                    
                     # 检查是否是GIF或其他动态视频
-                    if 'gif' in format_name or (codec_type == 'video' and stream.get('duration') is not None):
+                    if 'gif' in info["format_name"].lower() or stream["duration"] is not None:
                         self.material_type = "video"
                     else:
                         self.material_type = "photo"
@@ -203,7 +186,7 @@ class Video_material:
                 # 设置持续时间
                 if self.material_type == "video":
                     # 优先使用流的duration，如果没有则使用格式的duration
-                    duration = stream.get('duration') or info['format'].get('duration', '0')
+                    duration = media_duration(info, "video") or 0
                     self.duration = int(float(duration) * 1e6)  # 转换为微秒
                 else:
                     self.duration = 10800000000  # 静态图片默认3小时
@@ -277,7 +260,7 @@ class Video_material:
         }
         return video_material_json
 
-class Audio_material:
+class Audio_material(Dirty_tracked):
     """本地音频素材"""
 
     material_id: str
@@ -339,53 +322,17 @@ class Audio_material:
         self.duration = 0  # 初始化为0，如果有path则后续会更新
     
         try:
-            # 使用ffprobe获取音频信息
-            command = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'a:0',  # 选择第一个音频流
-                '-show_entries', 'stream=duration',
-                '-show_entries', 'format=duration',
-                '-of', 'json',
-                path if path else remote_url
-            ]
-            result = subprocess.check_output(command, stderr=subprocess.STDOUT)
-            result_str = result.decode('utf-8')
-            # 查找JSON开始位置（第一个'{'）
-            json_start = result_str.find('{')
-            if json_start != -1:
-                json_str = result_str[json_start:]
-                info = json.loads(json_str)
-            else:
-                raise ValueError(f"无法在输出中找到JSON数据: {result_str}")
+            # 一次ffprobe获取所有流信息
+            info = probe_media(path if path else remote_url)
 
             # 检查是否有视频流
-            video_command = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=codec_type',
-                '-of', 'json',
-                path if path else remote_url
-            ]
-            video_result = subprocess.check_output(video_command, stderr=subprocess.STDOUT)
-            video_result_str = video_result.decode('utf-8')
-            # 查找JSON开始位置（第一个'{'）
-            video_json_start = video_result_str.find('{')
-            if video_json_start != -1:
-                video_json_str = video_result_str[video_json_start:]
-                video_info = json.loads(video_json_str)
-            else:
-                print(f"无法在输出中找到JSON数据: {video_result_str}")
-            
-            if 'streams' in video_info and len(video_info['streams']) > 0:
+            if first_stream(info, "video") is not None:
                 raise ValueError("音频素材不应包含视频轨道")
 
             # 检查音频流
-            if 'streams' in info and len(info['streams']) > 0:
-                stream = info['streams'][0]
+            if first_stream(info, "audio") is not None:
                 # 优先使用流的duration，如果没有则使用格式的duration
-                duration_value = stream.get('duration') or info['format'].get('duration', '0')
+                duration_value = media_duration(info, "audio") or 0
                 self.duration = int(float(duration_value) * 1e6)  # 转换为微秒
             else:
                 raise ValueError(f"给定的素材文件 {path} 没有音频轨道")
@@ -1,25 +1,78 @@
-"""记录各种特效/音效/滤镜等的元数据"""
+"""记录各种特效/音效/滤镜等的元数据
 
-from .effect_meta import Effect_meta, Effect_param_instance
+除体积很小的基础类及蒙版外, 各类元数据枚举按需加载: 首次访问某个枚举时才导入定义它的模块,
+因此未使用的枚举(如另一个环境, 剪映或CapCut的全部元数据)不会占用启动时间和内存.
+"""
+
+import sys
+import importlib
+from typing import Any, Dict, List, Tuple
+
+from .effect_meta import Effect_meta, Effect_param_instance, Animation_meta, Transition_meta, lookup_effect
 
-from .font_meta import Font_type
 from .mask_meta import Mask_type, Mask_meta
 from .capcut_mask_meta import CapCut_Mask_type
-from .filter_meta import Filter_type
-from .transition_meta import Transition_type
-from .capcut_transition_meta import CapCut_Transition_type
-from .animation_meta import Intro_type, Outro_type, Group_animation_type
-from .capcut_animation_meta import CapCut_Intro_type, CapCut_Outro_type, CapCut_Group_animation_type
-from .animation_meta import Text_intro, Text_outro, Text_loop_anim
-from .capcut_text_animation_meta import CapCut_Text_intro, CapCut_Text_outro, CapCut_Text_loop_anim
-from .audio_effect_meta import Audio_scene_effect_type, Tone_effect_type, Speech_to_song_type
-from .capcut_audio_effect_meta import CapCut_Voice_filters_effect_type, CapCut_Voice_characters_effect_type, CapCut_Speech_to_song_effect_type
-from .video_effect_meta import Video_scene_effect_type, Video_character_effect_type
-from .capcut_effect_meta import CapCut_Video_scene_effect_type, CapCut_Video_character_effect_type
+
+_LAZY_TYPES: Dict[str, str] = {
+    "Font_type": "font_meta",
+    "Filter_type": "filter_meta",
+    "Transition_type": "transition_meta",
+    "CapCut_Transition_type": "capcut_transition_meta",
+    "Intro_type": "animation_meta",
+    "Outro_type": "animation_meta",
+    "Group_animation_type": "animation_meta",
+    "CapCut_Intro_type": "capcut_animation_meta",
+    "CapCut_Outro_type": "capcut_animation_meta",
+    "CapCut_Group_animation_type": "capcut_animation_meta",
+    "Text_intro": "animation_meta",
+    "Text_outro": "animation_meta",
+    "Text_loop_anim": "animation_meta",
+    "CapCut_Text_intro": "capcut_text_animation_meta",
+    "CapCut_Text_outro": "capcut_text_animation_meta",
+    "CapCut_Text_loop_anim": "capcut_text_animation_meta",
+    "Audio_scene_effect_type": "audio_effect_meta",
+    "Tone_effect_type": "audio_effect_meta",
+    "Speech_to_song_type": "audio_effect_meta",
+    "CapCut_Voice_filters_effect_type": "capcut_audio_effect_meta",
+    "CapCut_Voice_characters_effect_type": "capcut_audio_effect_meta",
+    "CapCut_Speech_to_song_effect_type": "capcut_audio_effect_meta",
+    "Video_scene_effect_type": "video_effect_meta",
+    "Video_character_effect_type": "video_effect_meta",
+    "CapCut_Video_scene_effect_type": "capcut_effect_meta",
+    "CapCut_Video_character_effect_type": "capcut_effect_meta",
+}
+"""按需加载的枚举名 -> 定义该枚举的模块名"""
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_TYPES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # 存入模块字典, 之后的访问不再经过__getattr__
+    globals()[name] = value
+    return value
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_TYPES))
+
+def loaded_types(*names: str) -> Tuple[type, ...]:
+    """返回给定枚举中已经加载的那些, 用于`isinstance`检查
+
+    尚未加载的枚举不可能有实例, 因此检查时无需为此加载它们.
+    """
+    types = []
+    for name in names:
+        module = sys.modules.get(f"{__name__}.{_LAZY_TYPES[name]}")
+        if module is not None:
+            types.append(getattr(module, name))
+    return tuple(types)
 
 __all__ = [
     "Effect_meta",
     "Effect_param_instance",
+    "Animation_meta",
+    "Transition_meta",
+    "lookup_effect",
     "Mask_type",
     "Mask_meta",
     "CapCut_Mask_type",
@@ -1,5 +1,5 @@
 from .effect_meta import Effect_enum
-from .animation_meta import Animation_meta
+from .effect_meta import Animation_meta
 
 class CapCut_Intro_type(Effect_enum):
     """CapCut自带的入场动画, 默认时长为0.5秒"""
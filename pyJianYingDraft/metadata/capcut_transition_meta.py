@@ -1,5 +1,5 @@
 from .effect_meta import Effect_enum
-from .transition_meta import Transition_meta
+from .effect_meta import Transition_meta
 
 class CapCut_Transition_type(Effect_enum):
     """CapCut自带的转场效果类型"""
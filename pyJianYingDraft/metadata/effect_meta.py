@@ -1,4 +1,6 @@
 from enum import Enum
+from bisect import bisect_left
+from difflib import get_close_matches
 
 from typing import List, Dict, Any
 from typing import TypeVar, Optional
@@ -87,11 +89,105 @@ class Effect_meta:
         return ret
 
 
+class Animation_meta:
+    title: str
+    is_vip: bool
+    duration: int
+    """效果默认时长, 单位为微秒"""
+
+    resource_id: str
+    effect_id: str
+    md5: str
+
+    def __init__(self, title: str, is_vip: bool, duration: float, resource_id: str, effect_id: str, md5: str):
+        self.title = title
+        self.is_vip = is_vip
+        self.duration = int(round(duration * 1e6))
+        self.resource_id = resource_id
+        self.effect_id = effect_id
+        self.md5 = md5
+
+class Transition_meta:
+    """转场元数据"""
+
+    name: str
+    """转场名称"""
+    is_vip: bool
+    """是否为VIP特权"""
+
+    resource_id: str
+    """资源ID"""
+    effect_id: str
+    """效果ID"""
+    md5: str
+
+    default_duration: int
+    """默认持续时间, 单位为微秒"""
+    is_overlap: bool
+    """是否允许重叠(?)"""
+
+    def __init__(self, name: str, is_vip: bool, resource_id: str, effect_id: str, md5: str, default_duration: float, is_overlap: bool):
+        self.name = name
+        self.is_vip = is_vip
+        self.resource_id = resource_id
+        self.effect_id = effect_id
+        self.md5 = md5
+
+        self.default_duration = int(round(default_duration * 1e6))
+        self.is_overlap = is_overlap
+
+
 Effect_enum_subclass = TypeVar("Effect_enum_subclass", bound="Effect_enum")
 
+def _normalize_name(name: str) -> str:
+    """名称比较时忽略大小写、空格和下划线"""
+    return name.lower().replace(" ", "").replace("_", "")
+
+class _Name_index:
+    """一个特效枚举的名称索引, 首次按名称查找时构建"""
+
+    members: Dict[str, "Effect_enum"]
+    """规范化名称 -> 枚举成员"""
+    names: Dict[str, str]
+    """规范化名称 -> 成员名, 用于给出建议"""
+    keys: List[str]
+    """排序后的规范化名称, 用于前缀匹配"""
+
+    def __init__(self, enum_cls: "type[Effect_enum]"):
+        self.members = {}
+        self.names = {}
+        for name, member in enum_cls.__members__.items():
+            key = _normalize_name(name)
+            if key not in self.members:
+                self.members[key] = member
+                self.names[key] = name
+        self.keys = sorted(self.members)
+
+    def suggest(self, key: str, limit: int) -> List[str]:
+        """以`key`为前缀的名称在前, 其后是拼写相近的名称"""
+        matches: List[str] = []
+        for candidate in self.keys[bisect_left(self.keys, key):]:
+            if len(matches) >= limit or not candidate.startswith(key):
+                break
+            matches.append(candidate)
+        if len(matches) < limit:
+            for candidate in get_close_matches(key, self.keys, n=limit):
+                if candidate not in matches:
+                    matches.append(candidate)
+        return [self.names[candidate] for candidate in matches[:limit]]
+
+_NAME_INDEXES: Dict[type, _Name_index] = {}
+
 class Effect_enum(Enum):
     """特效枚举基类, 提供一个`from_name`方法用于根据名称获取特效元数据"""
 
+    @classmethod
+    def _name_index(cls) -> _Name_index:
+        index = _NAME_INDEXES.get(cls)
+        if index is None:
+            index = _NAME_INDEXES.setdefault(cls, _Name_index(cls))
+        return index
+
     @classmethod
     def from_name(cls: "type[Effect_enum_subclass]", name: str) -> Effect_enum_subclass:
         """根据名称获取特效元数据, 忽略大小写、空格和下划线
@@ -100,10 +196,31 @@ class Effect_enum(Enum):
             name (str): 特效名称
 
         Raises:
-            `ValueError`: 特效名称不存在
+            `ValueError`: 特效名称不存在, 错误信息中附带相近的名称
         """
-        name = name.lower().replace(" ", "").replace("_", "")
-        for effect in cls:
-            if effect.name.lower().replace(" ", "").replace("_", "") == name:
-                return effect
-        raise ValueError(f"Effect named '{name}' not found")
+        return lookup_effect(name, cls)
+
+    @classmethod
+    def suggest(cls, name: str, limit: int = 5) -> List[str]:
+        """给出与`name`相近的成员名, 前缀匹配的在前, 其后是拼写相近的"""
+        return cls._name_index().suggest(_normalize_name(name), limit)
+
+def lookup_effect(name: str, *enum_classes: "type[Effect_enum]") -> "Effect_enum":
+    """依次在给定的特效枚举中按名称查找, 返回第一个匹配的成员, 名称规则同`Effect_enum.from_name`
+
+    Raises:
+        `ValueError`: 所有枚举中都不存在该名称, 错误信息中附带相近的名称
+    """
+    key = _normalize_name(name)
+    for enum_cls in enum_classes:
+        member = enum_cls._name_index().members.get(key)
+        if member is not None:
+            return member
+
+    suggestions: List[str] = []
+    for enum_cls in enum_classes:
+        suggestions.extend(enum_cls._name_index().suggest(key, 5))
+    message = f"Effect named '{name}' not found"
+    if suggestions:
+        message += f", did you mean: {', '.join(list(dict.fromkeys(suggestions))[:5])}?"
+    raise ValueError(message)
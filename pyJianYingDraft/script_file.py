@@ -4,7 +4,7 @@ import math
 from copy import deepcopy
 
 from typing import Optional, Literal, Union, overload
-from typing import Type, Dict, List, Any
+from typing import Type, Dict, List, Any, Iterable, Tuple, TYPE_CHECKING
 
 from . import util
 from . import exceptions
@@ -19,7 +19,16 @@ from .text_segment import Text_segment, Text_style, TextBubble, Text_border, Tex
 from .track import Track_type, Base_track, Track
 
 from settings.local import IS_CAPCUT_ENV
-from .metadata import Video_scene_effect_type, Video_character_effect_type, Filter_type
+if TYPE_CHECKING:
+    from .metadata import Video_scene_effect_type, Video_character_effect_type, Filter_type
+
+def _read_template(file_name: str) -> Dict[str, Any]:
+    with open(os.path.join(os.path.dirname(__file__), file_name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _nested_keys(content: Dict[str, Any], exclude: Iterable[str]) -> Tuple[str, ...]:
+    """返回值为字典或列表的字段名, 不包括`exclude`中的字段"""
+    return tuple(key for key, value in content.items() if isinstance(value, (dict, list)) and key not in exclude)
 
 class Script_material:
     """草稿文件中的素材信息部分"""
@@ -104,7 +113,7 @@ class Script_material:
             "audio_effects": [effect.export_json() for effect in self.audio_effects],
             "audio_fades": [fade.export_json() for fade in self.audio_fades],
             "audio_track_indexes": [],
-            "audios": [audio.export_json() for audio in self.audios],
+            "audios": [audio.cached_export() for audio in self.audios],
             "beats": [],
             "canvases": [canvas.export_json() for canvas in self.canvases],
             "chromas": [],
@@ -131,7 +140,7 @@ class Script_material:
             "smart_crops": [],
             "smart_relights": [],
             "sound_channel_mappings": [],
-            "speeds": [spd.export_json() for spd in self.speeds],
+            "speeds": [spd.cached_export() for spd in self.speeds],
             "stickers": self.stickers,
             "tail_leaders": [],
             "text_templates": [],
@@ -140,7 +149,7 @@ class Script_material:
             "transitions": [transition.export_json() for transition in self.transitions],
             "video_effects": [effect.export_json() for effect in self.video_effects],
             "video_trackings": [],
-            "videos": [video.export_json() for video in self.videos],
+            "videos": [video.cached_export() for video in self.videos],
             "vocal_beautifys": [],
             "vocal_separations": []
         }
@@ -159,7 +168,7 @@ class Script_file:
     save_path: Optional[str]
     """草稿文件保存路径, 仅在模板模式下有效"""
     content: Dict[str, Any]
-    """草稿文件内容"""
+    """草稿文件内容中相对模板被覆盖的部分, 导出时与模板内容合并"""
 
     width: int
     """视频的宽度, 单位为像素"""
@@ -180,7 +189,18 @@ class Script_file:
     imported_tracks: List[Track]
     """导入的轨道信息"""
 
+    _base_retained_size: int
+    """草稿中轨道以外部分(素材、导入的轨道等)的估算内存占用(字节), 随素材的添加增量更新"""
+
     TEMPLATE_FILE = "draft_content_template.json"
+    _template_content: Dict[str, Any] = _read_template(TEMPLATE_FILE)
+    """模板内容, 导入时解析一次并由所有草稿只读共享, 不可修改"""
+    _EXPORTED_FIELDS = ("canvas_config", "materials", "last_modified_platform", "platform", "tracks")
+    """`export_content`每次重新生成的字段"""
+    _template_nested_keys: Tuple[str, ...] = _nested_keys(_template_content, _EXPORTED_FIELDS)
+    """模板中原样导出的嵌套字段, 导出时复制一份, 修改导出结果不会改动共享的模板"""
+    _inherits_template: bool = True
+    """导出时是否以模板内容为基础, 从文件加载的草稿内容是完整的, 不需要合并模板"""
 
     def __init__(self, width: int, height: int, fps: int = 30):
         """创建一个剪映草稿
@@ -203,8 +223,17 @@ class Script_file:
         self.imported_materials = {}
         self.imported_tracks = []
 
-        with open(os.path.join(os.path.dirname(__file__), self.TEMPLATE_FILE), "r", encoding="utf-8") as f:
-            self.content = json.load(f)
+        # 模板内容共享, 每个草稿只保存自己覆盖的字段
+        self.content = {}
+        self._base_retained_size = util.estimate_retained_size(self)
+
+    @property
+    def retained_size(self) -> int:
+        """估算的草稿内存占用(字节), 供草稿缓存按内存预算淘汰使用
+
+        轨道按其缓存的估算结果计入, 片段在加入轨道后被原地修改(如添加关键帧、动画、特效)时会重新估算.
+        """
+        return self._base_retained_size + sum(util.cached_retained_size(track) for track in self.tracks.values())
 
     @staticmethod
     def load_template(json_path: str) -> "Script_file":
@@ -222,12 +251,14 @@ class Script_file:
             raise FileNotFoundError("JSON文件 '%s' 不存在" % json_path)
         with open(json_path, "r", encoding="utf-8") as f:
             obj.content = json.load(f)
+        obj._inherits_template = False
 
         util.assign_attr_with_json(obj, ["fps", "duration"], obj.content)
         util.assign_attr_with_json(obj, ["width", "height"], obj.content["canvas_config"])
 
         obj.imported_materials = deepcopy(obj.content["materials"])
         obj.imported_tracks = [import_track(track_data, obj.imported_materials) for track_data in obj.content["tracks"]]
+        obj._base_retained_size = util.estimate_retained_size(obj.content) + util.estimate_retained_size(obj.imported_tracks)
 
         return obj
 
@@ -241,6 +272,7 @@ class Script_file:
             self.materials.audios.append(material)
         else:
             raise TypeError("错误的素材类型: '%s'" % type(material))
+        self._base_retained_size += util.estimate_retained_size(material)
         return self
 
     def add_track(self, track_type: Track_type, track_name: Optional[str] = None, *,
@@ -405,10 +437,9 @@ class Script_file:
         # 添加片段素材
         if isinstance(segment, (Video_segment, Audio_segment)):
             self.add_material(segment.material_instance)
-
         return self
 
-    def add_effect(self, effect: Union[Video_scene_effect_type, Video_character_effect_type],
+    def add_effect(self, effect: Union["Video_scene_effect_type", "Video_character_effect_type"],
                    t_range: Timerange, track_name: Optional[str] = None, *,
                    params: Optional[List[Optional[float]]] = None) -> "Script_file":
         """向指定的特效轨道中添加一个特效片段
@@ -437,7 +468,7 @@ class Script_file:
             self.materials.video_effects.append(segment.effect_inst)
         return self
 
-    def add_filter(self, filter_meta: Filter_type, t_range: Timerange,
+    def add_filter(self, filter_meta: "Filter_type", t_range: Timerange,
                    track_name: Optional[str] = None, intensity: float = 100.0) -> "Script_file":
         """向指定的滤镜轨道中添加一个滤镜片段
 
@@ -640,6 +671,7 @@ class Script_file:
             for seg in imported_track.segments:
                 seg.target_timerange.start = max(0, seg.target_timerange.start + offset_us)
         self.imported_tracks.append(imported_track)
+        self._base_retained_size += util.estimate_retained_size(imported_track)
 
         # 收集所有需要复制的素材ID
         material_ids = set()
@@ -854,18 +886,26 @@ class Script_file:
             if effect["type"] == "text_effect":
                 print("\tResource id: %s '%s'" % (effect["resource_id"], effect.get("name", "")))
 
-    def dumps(self) -> str:
-        """将草稿文件内容导出为JSON字符串"""
-        self.content["fps"] = float(self.fps)  # 确保fps是浮点数
-        self.content["duration"] = self.duration
-        self.content["canvas_config"] = {"width": self.width, "height": self.height, "ratio": "original"}
-        self.content["materials"] = self.materials.export_json()
+    def export_content(self) -> Dict[str, Any]:
+        """导出草稿文件内容, 返回的字典可能与草稿共享部分对象, 调用方只应修改其顶层字段"""
+        # 在模板内容上叠加本草稿的覆盖字段, 导出时计算的字段只写入本次导出的副本
+        if self._inherits_template:
+            content = {**self._template_content, **self.content}
+            for key in self._template_nested_keys:
+                if key not in self.content:
+                    content[key] = deepcopy(content[key])
+        else:
+            content = dict(self.content)
+        content["fps"] = float(self.fps)  # 确保fps是浮点数
+        content["duration"] = self.duration
+        content["canvas_config"] = {"width": self.width, "height": self.height, "ratio": "original"}
+        content["materials"] = self.materials.export_json()
 
         # 设置渲染模式
-        self.content["render_index_track_mode_on"] = True
+        content["render_index_track_mode_on"] = True
         
         # 设置颜色空间
-        self.content["color_space"] = -1
+        content["color_space"] = -1
 
         # 根据配置选择平台信息
         try:
@@ -873,8 +913,8 @@ class Script_file:
             platform_info = get_platform_info()
             if platform_info:
                 # CapCut模式
-                self.content["last_modified_platform"] = platform_info
-                self.content["platform"] = platform_info
+                content["last_modified_platform"] = platform_info
+                content["platform"] = platform_info
             else:
                 # 剪映模式 - 根据实际系统生成平台信息
                 import platform
@@ -908,8 +948,8 @@ class Script_file:
                     "os_version": os_version
                 }
                 
-                self.content["last_modified_platform"] = platform_config
-                self.content["platform"] = platform_config
+                content["last_modified_platform"] = platform_config
+                content["platform"] = platform_config
         except ImportError:
             # 默认使用剪映模式 - 根据实际系统生成平台信息
             import platform
@@ -943,23 +983,27 @@ class Script_file:
                 "os_version": os_version
             }
             
-            self.content["last_modified_platform"] = platform_config
-            self.content["platform"] = platform_config
+            content["last_modified_platform"] = platform_config
+            content["platform"] = platform_config
 
         # 合并导入的素材
         for material_type, material_list in self.imported_materials.items():
-            if material_type not in self.content["materials"]:
-                self.content["materials"][material_type] = material_list
+            if material_type not in content["materials"]:
+                content["materials"][material_type] = material_list
             else:
-                self.content["materials"][material_type].extend(material_list)
+                content["materials"][material_type].extend(material_list)
 
         # 对轨道排序并导出
         track_list: List[Base_track] = list(self.tracks.values())
         track_list.extend(self.imported_tracks)
         track_list.sort(key=lambda track: track.render_index)
-        self.content["tracks"] = [track.export_json() for track in track_list]
+        content["tracks"] = [track.cached_export() if isinstance(track, Track) else track.export_json() for track in track_list]
 
-        return json.dumps(self.content, ensure_ascii=False, indent=4)
+        return content
+
+    def dumps(self) -> str:
+        """将草稿文件内容导出为JSON字符串"""
+        return json.dumps(self.export_content(), ensure_ascii=False, indent=4)
 
     def dump(self, file_path: str) -> None:
         """将草稿文件内容写入文件"""
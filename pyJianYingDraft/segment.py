@@ -4,10 +4,11 @@ import uuid
 from typing import Optional, Dict, List, Any, Union
 
 from .animation import Segment_animations
+from .export_cache import Dirty_tracked
 from .time_util import Timerange, tim
 from .keyframe import Keyframe_list, Keyframe_property
 
-class Base_segment:
+class Base_segment(Dirty_tracked):
     """片段基类"""
 
     segment_id: str
@@ -76,7 +77,7 @@ class Base_segment:
             "keyframe_refs": [],  # 意义不明
         }
 
-class Speed:
+class Speed(Dirty_tracked):
     """播放速度对象, 目前只支持固定速度"""
 
     global_id: str
@@ -97,7 +98,7 @@ class Speed:
             "type": "speed"
         }
 
-class Clip_settings:
+class Clip_settings(Dirty_tracked):
     """素材片段的图像调节设置"""
 
     alpha: float
@@ -154,6 +155,9 @@ class Clip_settings:
 class Media_segment(Base_segment):
     """媒体片段基类"""
 
+    _shared_attrs = ("material_instance",)
+    """素材实例可能被多个片段共享, 由`Script_file.add_material`单独计入内存占用估算"""
+
     source_timerange: Optional[Timerange]
     """截取的素材片段的时间范围, 对贴纸而言不存在"""
     speed: Speed
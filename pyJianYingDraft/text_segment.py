@@ -5,16 +5,18 @@ import uuid
 from copy import deepcopy
 
 from typing import Dict, Tuple, Any
-from typing import Union, Optional, Literal
-
-from pyJianYingDraft.metadata.capcut_text_animation_meta import CapCut_Text_intro, CapCut_Text_outro, CapCut_Text_loop_anim
+from typing import Union, Optional, Literal, TYPE_CHECKING
 
 from .time_util import Timerange, tim
 from .segment import Clip_settings, Visual_segment
 from .animation import Segment_animations, Text_animation
 
-from .metadata import Font_type, Effect_meta
-from .metadata import Text_intro, Text_outro, Text_loop_anim
+from .metadata import Effect_meta, loaded_types
+
+if TYPE_CHECKING:
+    from .metadata import Font_type
+    from .metadata import Text_intro, Text_outro, Text_loop_anim
+    from .metadata import CapCut_Text_intro, CapCut_Text_outro, CapCut_Text_loop_anim
 
 class Text_style:
     """字体样式类"""
@@ -226,7 +228,7 @@ class Text_segment(Visual_segment):
     """固定高度, -1表示不固定"""
 
     def __init__(self, text: str, timerange: Timerange, *,
-                 font: Optional[Font_type] = None,
+                 font: Optional["Font_type"] = None,
                  style: Optional[Text_style] = None, clip_settings: Optional[Clip_settings] = None,
                  border: Optional[Text_border] = None, background: Optional[Text_background] = None,
                  fixed_width: int = -1, fixed_height: int = -1):
@@ -278,8 +280,8 @@ class Text_segment(Visual_segment):
 
         return new_segment
 
-    def add_animation(self, animation_type: Union[Text_intro, Text_outro, Text_loop_anim,
-                                                  CapCut_Text_intro, CapCut_Text_outro, CapCut_Text_loop_anim],
+    def add_animation(self, animation_type: Union["Text_intro", "Text_outro", "Text_loop_anim",
+                                                  "CapCut_Text_intro", "CapCut_Text_outro", "CapCut_Text_loop_anim"],
                       duration: Union[str, float] = 500000) -> "Text_segment":
         """将给定的入场/出场/循环动画添加到此片段的动画列表中, 出入场动画的持续时间可以自行设置, 循环动画则会自动填满其余无动画部分
 
@@ -292,11 +294,11 @@ class Text_segment(Visual_segment):
         """
         duration = min(tim(duration), self.target_timerange.duration)
 
-        if (isinstance(animation_type, Text_intro) or isinstance(animation_type, CapCut_Text_intro)):
+        if isinstance(animation_type, loaded_types("Text_intro", "CapCut_Text_intro")):
             start = 0
-        elif (isinstance(animation_type, Text_outro) or isinstance(animation_type, CapCut_Text_outro)):
+        elif isinstance(animation_type, loaded_types("Text_outro", "CapCut_Text_outro")):
             start = self.target_timerange.duration - duration
-        elif (isinstance(animation_type, Text_loop_anim) or isinstance(animation_type, CapCut_Text_loop_anim)):
+        elif isinstance(animation_type, loaded_types("Text_loop_anim", "CapCut_Text_loop_anim")):
             intro_trange = self.animations_instance and self.animations_instance.get_animation_trange("in")
             outro_trange = self.animations_instance and self.animations_instance.get_animation_trange("out")
             start = intro_trange.start if intro_trange else 0
@@ -3,6 +3,8 @@
 from typing import Union
 from typing import Dict
 
+from .export_cache import Dirty_tracked
+
 SEC = 1000000
 """一秒=1e6微秒"""
 
@@ -31,7 +33,7 @@ def tim(inp: Union[str, float]) -> int:
 
     return int(round(total_time) * sign)
 
-class Timerange:
+class Timerange(Dirty_tracked):
     """记录了起始时间及持续长度的时间范围"""
     start: int
     """起始时间, 单位为微秒"""
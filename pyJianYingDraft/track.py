@@ -10,6 +10,7 @@ from abc import ABC, abstractmethod
 import pyJianYingDraft as draft
 
 from .exceptions import SegmentOverlap
+from .export_cache import Dirty_tracked
 from .segment import Base_segment
 from .video_segment import Video_segment, Sticker_segment
 from .audio_segment import Audio_segment
@@ -70,7 +71,7 @@ class Base_track(ABC):
     def export_json(self) -> Dict[str, Any]: ...
 
 Seg_type = TypeVar("Seg_type", bound=Base_segment)
-class Track(Base_track, Generic[Seg_type]):
+class Track(Dirty_tracked, Base_track, Generic[Seg_type]):
     """非模板模式下的轨道"""
 
     mute: bool
@@ -196,10 +197,8 @@ class Track(Base_track, Generic[Seg_type]):
         return self
 
     def export_json(self) -> Dict[str, Any]:
-        # 为每个片段写入render_index
-        segment_exports = [seg.export_json() for seg in self.segments]
-        for seg in segment_exports:
-            seg["render_index"] = self.render_index
+        # 未修改的片段复用缓存的导出结果, 在副本中写入render_index以免修改缓存
+        segment_exports = [{**seg.cached_export(), "render_index": self.render_index} for seg in self.segments]
 
         return {
             "attribute": int(self.mute),
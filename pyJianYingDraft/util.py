@@ -1,9 +1,15 @@
 """辅助函数，主要与模板模式有关"""
 
+import sys
+import json
 import inspect
+import importlib
 
-from typing import Union, Type
-from typing import List, Dict, Any
+from enum import Enum
+from typing import Union, Type, Optional, Callable
+from typing import List, Dict, Any, Iterable, Set
+
+from .export_cache import Dirty_tracked
 
 JsonExportable = Union[int, float, bool, str, List["JsonExportable"], Dict[str, "JsonExportable"]]
 
@@ -56,3 +62,89 @@ def export_attr_to_json(obj: object, attrs: List[str]) -> Dict[str, JsonExportab
         else:
             json_data[attr] = getattr(obj, attr)
     return json_data
+
+def estimate_retained_size(obj: Any, exclude_attrs: Iterable[str] = (), _seen: Optional[Set[int]] = None) -> int:
+    """粗略估算对象及其引用的子对象所占用的内存字节数
+
+    枚举成员(特效等元数据)、类和函数为全局共享对象, 不计入估算结果
+
+    顶层对象引用的`Dirty_tracked`子对象按`cached_retained_size`计入, 未被修改的子对象不重新估算
+
+    Args:
+        obj (`Any`): 要估算的对象
+        exclude_attrs (`Iterable[str]`, optional): 顶层对象中不计入的属性名, 如共享的素材实例
+    """
+    nested = _seen is not None
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or isinstance(obj, (Enum, type)) or callable(obj):
+        return 0
+    _seen.add(id(obj))
+    if nested and isinstance(obj, Dirty_tracked):
+        return cached_retained_size(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_retained_size(key, _seen=_seen) + estimate_retained_size(value, _seen=_seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_retained_size(item, _seen=_seen)
+    elif hasattr(obj, "__dict__"):
+        attrs = {k: v for k, v in vars(obj).items() if k not in exclude_attrs}
+        size += estimate_retained_size(attrs, _seen=_seen)
+    return size
+
+def cached_retained_size(obj: Dirty_tracked) -> int:
+    """返回`estimate_retained_size`对`Dirty_tracked`对象的估算结果, 自上次估算后未被修改时直接复用
+
+    对象被原地修改(如向片段添加关键帧或动画)时缓存随导出缓存一起失效, 因此估算结果会包含这些增长.
+    可随时重建的缓存及所有者引用不计入.
+    """
+    size = obj.__dict__.get("_size_cache")
+    if size is None:
+        excluded = ("_export_cache", "_size_cache", "_owners") + obj._shared_attrs
+        size = estimate_retained_size(obj, exclude_attrs=excluded)
+        object.__setattr__(obj, "_size_cache", size)
+    return size
+
+JSON_ENCODERS = ("orjson", "ujson", "json")
+"""`encode_json`支持的编码库, "auto"按此顺序选择第一个已安装的"""
+
+def _compact_encoder(name: str) -> Optional[Callable[[Any], bytes]]:
+    """返回使用指定库的紧凑JSON编码函数, 库未安装时返回None"""
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        return None
+    if name == "orjson":
+        return lambda data: module.dumps(data, option=module.OPT_NON_STR_KEYS)
+    if name == "ujson":
+        return lambda data: module.dumps(data, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+    return lambda data: module.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+_COMPACT_ENCODERS: Dict[str, Optional[Callable[[Any], bytes]]] = {}
+
+def encode_json(data: Any, encoder: str = "auto", indent: Optional[int] = None) -> bytes:
+    """将数据编码为UTF-8的JSON字节串, 非ASCII字符不转义
+
+    Args:
+        data (`Any`): 要编码的数据
+        encoder (`str`, optional): 编码库, 可选`JSON_ENCODERS`中的库名, 默认"auto"选择第一个已安装的
+        indent (`int`, optional): 缩进空格数, 默认为None即不含空白的紧凑格式; 指定缩进时总是使用标准库json
+
+    Raises:
+        `ValueError`: 不支持或未安装指定的编码库
+    """
+    if indent is not None:
+        return json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+
+    names = JSON_ENCODERS if encoder == "auto" else (encoder,)
+    for name in names:
+        if name not in JSON_ENCODERS:
+            raise ValueError(f"不支持的JSON编码库: {name}, 可选: {', '.join(JSON_ENCODERS)}")
+        if name not in _COMPACT_ENCODERS:
+            _COMPACT_ENCODERS[name] = _compact_encoder(name)
+        if _COMPACT_ENCODERS[name] is not None:
+            return _COMPACT_ENCODERS[name](data)
+    raise ValueError(f"JSON编码库{encoder}未安装")
@@ -19,10 +19,8 @@ else:
             self.args = args
         def __getitem__(self, key):
             return key
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, TYPE_CHECKING
 
-from pyJianYingDraft.metadata.capcut_effect_meta import CapCut_Video_character_effect_type, CapCut_Video_scene_effect_type
-from pyJianYingDraft.metadata.capcut_mask_meta import CapCut_Mask_type
 from settings import IS_CAPCUT_ENV
 
 from .time_util import tim, Timerange
@@ -30,11 +28,14 @@ from .segment import Visual_segment, Clip_settings
 from .local_materials import Video_material
 from .animation import Segment_animations, Video_animation
 
-from .metadata import Effect_meta, Effect_param_instance
-from .metadata import Mask_meta, Mask_type, Filter_type, Transition_type, CapCut_Transition_type
-from .metadata import Intro_type, Outro_type, Group_animation_type
-from .metadata import CapCut_Intro_type, CapCut_Outro_type, CapCut_Group_animation_type
-from .metadata import Video_scene_effect_type, Video_character_effect_type
+from .metadata import Effect_meta, Effect_param_instance, loaded_types
+from .metadata import Mask_meta, Mask_type, CapCut_Mask_type
+
+if TYPE_CHECKING:
+    from .metadata import Filter_type, Transition_type, CapCut_Transition_type
+    from .metadata import Intro_type, Outro_type, Group_animation_type
+    from .metadata import CapCut_Intro_type, CapCut_Outro_type, CapCut_Group_animation_type
+    from .metadata import Video_scene_effect_type, Video_character_effect_type
 
 
 class Mask:
@@ -119,7 +120,7 @@ class Video_effect:
 
     adjust_params: List[Effect_param_instance]
 
-    def __init__(self, effect_meta: Union[Video_scene_effect_type, Video_character_effect_type],
+    def __init__(self, effect_meta: Union["Video_scene_effect_type", "Video_character_effect_type"],
                  params: Optional[List[Optional[float]]] = None, *,
                  apply_target_type: Literal[0, 2] = 0):
         """根据给定的特效元数据及参数列表构造一个视频特效对象, params的范围是0~100"""
@@ -131,16 +132,16 @@ class Video_effect:
         self.adjust_params = []
 
         if IS_CAPCUT_ENV:
-            if isinstance(effect_meta, CapCut_Video_scene_effect_type):
+            if isinstance(effect_meta, loaded_types("CapCut_Video_scene_effect_type")):
                 self.effect_type = "video_effect"
-            elif isinstance(effect_meta, CapCut_Video_character_effect_type):
+            elif isinstance(effect_meta, loaded_types("CapCut_Video_character_effect_type")):
                 self.effect_type = "face_effect"
             else:
                 raise TypeError("Invalid effect meta type %s" % type(effect_meta))
         else:
-            if isinstance(effect_meta, Video_scene_effect_type):
+            if isinstance(effect_meta, loaded_types("Video_scene_effect_type")):
                 self.effect_type = "video_effect"
-            elif isinstance(effect_meta, Video_character_effect_type):
+            elif isinstance(effect_meta, loaded_types("Video_character_effect_type")):
                 self.effect_type = "face_effect"
             else:
                 raise TypeError("Invalid effect meta type %s" % type(effect_meta))
@@ -248,7 +249,7 @@ class Transition:
     is_overlap: bool
     """是否与上一个片段重叠(?)"""
 
-    def __init__(self, effect_meta: Union[Transition_type, CapCut_Transition_type], duration: Optional[int] = None):
+    def __init__(self, effect_meta: Union["Transition_type", "CapCut_Transition_type"], duration: Optional[int] = None):
         """根据给定的转场元数据及持续时间构造一个转场对象"""
         self.name = effect_meta.value.name
         self.global_id = uuid.uuid4().hex
@@ -379,7 +380,12 @@ class Video_segment(Visual_segment):
         self.mask = None
         self.background_filling = None
 
-    def add_animation(self, animation_type: Union[Intro_type, Outro_type, Group_animation_type, CapCut_Intro_type, CapCut_Outro_type, CapCut_Group_animation_type],
+    def add_animation(self, animation_type: Union["Intro_type",
+                                                  "Outro_type",
+                                                  "Group_animation_type",
+                                                  "CapCut_Intro_type",
+                                                  "CapCut_Outro_type",
+                                                  "CapCut_Group_animation_type"],
                       duration: Optional[Union[int, str]] = None) -> "Video_segment":
         """将给定的入场/出场/组合动画添加到此片段的动画列表中
 
@@ -390,13 +396,13 @@ class Video_segment(Visual_segment):
         """
         if duration is not None:
             duration = tim(duration)
-        if (isinstance(animation_type, Intro_type) or isinstance(animation_type, CapCut_Intro_type)):
+        if isinstance(animation_type, loaded_types("Intro_type", "CapCut_Intro_type")):
             start = 0
             duration = duration or animation_type.value.duration
-        elif isinstance(animation_type, Outro_type) or isinstance(animation_type, CapCut_Outro_type):
+        elif isinstance(animation_type, loaded_types("Outro_type", "CapCut_Outro_type")):
             duration = duration or animation_type.value.duration
             start = self.target_timerange.duration - duration
-        elif isinstance(animation_type, Group_animation_type) or isinstance(animation_type, CapCut_Group_animation_type):
+        elif isinstance(animation_type, loaded_types("Group_animation_type", "CapCut_Group_animation_type")):
             start = 0
             duration = duration or self.target_timerange.duration
         else:
@@ -410,7 +416,7 @@ class Video_segment(Visual_segment):
 
         return self
 
-    def add_effect(self, effect_type: Union[Video_scene_effect_type, Video_character_effect_type],
+    def add_effect(self, effect_type: Union["Video_scene_effect_type", "Video_character_effect_type"],
                    params: Optional[List[Optional[float]]] = None) -> "Video_segment":
         """为视频片段添加一个作用于整个片段的特效
 
@@ -431,7 +437,7 @@ class Video_segment(Visual_segment):
 
         return self
 
-    def add_filter(self, filter_type: Filter_type, intensity: float = 100.0) -> "Video_segment":
+    def add_filter(self, filter_type: "Filter_type", intensity: float = 100.0) -> "Video_segment":
         """为视频片段添加一个滤镜
 
         Args:
@@ -484,7 +490,9 @@ class Video_segment(Visual_segment):
         self.extra_material_refs.append(self.mask.global_id)
         return self
 
-    def add_transition(self, transition_type: Union[Transition_type, CapCut_Transition_type], *, duration: Optional[Union[int, str]] = None) -> "Video_segment":
+    def add_transition(self, transition_type: Union["Transition_type",
+                                                    "CapCut_Transition_type"],
+                       *, duration: Optional[Union[int, str]] = None) -> "Video_segment":
         """为视频片段添加转场, 注意转场应当添加在**前面的**片段上
 
         Args:
@@ -2,9 +2,9 @@ import os
 import re
 import pyJianYingDraft as draft
 import shutil
-from util import zip_draft, is_windows_path
-from oss import upload_to_oss
-from typing import Dict
+from util import stream_draft_zip, is_windows_path
+from oss import upload_stream_to_oss
+from typing import Callable, Dict, Optional
 import sys
 
 # Python 3.6兼容性处理
@@ -17,14 +17,15 @@ else:
             self.args = args
         def __getitem__(self, key):
             return key
-from draft_cache import DRAFT_CACHE
-from save_task_cache import DRAFT_TASKS, get_task_status, update_tasks_cache, update_task_field, increment_task_field, update_task_fields, create_task
-from downloader import download_audio, download_file, download_image, download_video
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import imageio.v2 as imageio
-import subprocess
+from draft_cache import DRAFT_CACHE, draft_lock, locked_draft, sync_draft, update_cache
+from save_task_cache import (
+    get_task_status, update_tasks_cache, update_task_field, update_task_fields, start_task, wait_for_task_update,
+    request_task_cancel, task_cancel_requested, task_abandoned, TERMINAL_STATUSES
+)
+from asset_store import fetch_asset, stored_validator
+from download_scheduler import DOWNLOAD_SCHEDULER
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import json
-from get_duration_impl import get_video_duration
 import uuid
 import threading
 from collections import OrderedDict
@@ -32,14 +33,26 @@ import time
 import requests # Import requests for making HTTP calls
 import logging
 # Import configuration
-from settings import IS_CAPCUT_ENV, IS_UPLOAD_DRAFT, DRAFT_DOMAIN, PREVIEW_ROUTER
+from settings import IS_CAPCUT_ENV, IS_UPLOAD_DRAFT, DRAFT_DOMAIN, PREVIEW_ROUTER, SAVE_QUEUE_CONFIG, DRAFT_JSON_CONFIG, MEDIA_PROBE_CONFIG
+from save_job_queue import SaveJobQueue, SaveJob, SaveCancelled
+from pyJianYingDraft.util import encode_json
+from media_probe import probe_media, probe_image_size, first_stream, media_duration
 
 # --- Get your Logger instance ---
 # The name here must match the logger name you configured in app.py
 logger = logging.getLogger('flask_video_generator') 
 
 # Define task status enumeration type
-TaskStatus = Literal["initialized", "processing", "completed", "failed", "not_found"]
+TaskStatus = Literal["initialized", "queued", "processing", "completed", "failed", "cancelled", "not_found"]
+
+# A request waiting for a save run by another server process checks this often whether that process died
+OWNER_CHECK_SECONDS = 5.0
+
+# Saves run on a bounded worker pool instead of on the HTTP request threads
+SAVE_QUEUE = SaveJobQueue(
+    workers=SAVE_QUEUE_CONFIG.get("workers", 4),
+    max_queued=SAVE_QUEUE_CONFIG.get("max_queued", 1000)
+)
 
 def build_asset_path(draft_folder: str, draft_id: str, asset_type: str, material_name: str) -> str:
     """
@@ -62,9 +75,73 @@ def build_asset_path(draft_folder: str, draft_id: str, asset_type: str, material
         draft_real_path = os.path.join(draft_folder, draft_id, "assets", asset_type, material_name)
     return draft_real_path
 
-def save_draft_background(draft_id, draft_folder, task_id):
-    """Background save draft to OSS"""
+# Files of a saved draft that hold the draft content
+DRAFT_JSON_FILES = ("draft_info.json", "draft_content.json", "draft_content.json.bak")
+
+
+def _fix_platform_info(content: Dict) -> None:
+    """Mark the exported draft as created on Windows, with random device identifiers
+
+    :param content: Draft content from `Script_file.export_content`, modified in place
+    """
+    for key in ("platform", "last_modified_platform"):
+        # The exported platform dicts may be shared, replace them instead of modifying them
+        content[key] = {
+            **content.get(key, {}),
+            "os": "windows",
+            "os_version": "10.0.19045",
+            "device_id": uuid.uuid4().hex,
+            "hard_disk_id": uuid.uuid4().hex,
+            "mac_address": uuid.uuid4().hex
+        }
+
+
+class _SavedElsewhere(Exception):
+    """Another server process is already saving the draft"""
+
+
+def _check_cancelled(job: Optional[SaveJob]) -> None:
+    """Stop the save between phases if its job was cancelled, here or by another server process"""
+    if job is not None:
+        if not job.cancel_event.is_set() and task_cancel_requested(job.task_id):
+            job.cancel_event.set()
+        job.check_cancelled()
+
+@locked_draft
+def _prepare_saved_draft(draft_id: str, draft_folder: Optional[str], task_id: str,
+                         downloaded: Dict[str, str]) -> Optional[draft.Script_file]:
+    """Point the materials of a draft at its folder on the client and read their metadata from the downloads
+
+    Runs as a draft transaction on the current copy of the draft, which may have been replaced
+    by another request while the media was downloaded, and stores the updated draft.
+
+    :param downloaded: Downloaded files keyed by remote URL, probed instead of the remote media
+    :return: The updated draft to export, None if it no longer exists
+    """
+    script = DRAFT_CACHE.get(draft_id)
+    if script is None:
+        return None
+    if draft_folder:
+        for video in script.materials.videos:
+            kind = {"photo": "image", "video": "video"}.get(video.material_type)
+            if kind:
+                video.replace_path = build_asset_path(draft_folder, draft_id, kind, video.material_name)
+    local_paths = {id(material): downloaded[material.remote_url]
+                   for material in (*script.materials.audios, *script.materials.videos)
+                   if material.remote_url in downloaded}
+    update_media_metadata(script, task_id, local_paths)
+    update_cache(draft_id, script)
+    return script
+
+def save_draft_background(draft_id, draft_folder, task_id, job: Optional[SaveJob] = None):
+    """Background save draft to OSS
+
+    :param job: Queue job running this save, checked for cancellation between the phases
+    """
     try:
+        # Pick up changes made to the draft by other server processes
+        sync_draft(draft_id)
+
         # Get draft information from global cache
         if draft_id not in DRAFT_CACHE:
             task_status = {
@@ -152,13 +229,8 @@ def save_draft_background(draft_id, draft_folder, task_id):
         else:
             logger.warning("draft_meta_info.json文件不存在")
         
-        # Update task status
-        update_task_field(task_id, "message", "Updating media file metadata")
-        update_task_field(task_id, "progress", 5)
-        logger.info(f"Task {task_id} progress 5%: Updating media file metadata.")
-        
-        update_media_metadata(script, task_id)
-        
+        # Each media is fetched once (or taken from the asset store) before anything is probed,
+        # the metadata is then read from the downloaded files
         download_tasks = []
         
         audios = script.materials.audios
@@ -173,7 +245,7 @@ def save_draft_background(draft_id, draft_folder, task_id):
                 # Add audio download task
                 download_tasks.append({
                     'type': 'audio',
-                    'func': download_file,
+                    'func': fetch_asset,
                     'args': (remote_url, f"{draft_id}/assets/audio/{material_name}"),
                     'material': audio
                 })
@@ -186,9 +258,6 @@ def save_draft_background(draft_id, draft_folder, task_id):
                 material_name = video.material_name
                 
                 if video.material_type == 'photo':
-                    # Use helper function to build path
-                    if draft_folder:
-                        video.replace_path = build_asset_path(draft_folder, draft_id, "image", material_name)
                     if not remote_url:
                         logger.warning(f"Image file {material_name} has no remote_url, skipping download.")
                         continue
@@ -196,15 +265,12 @@ def save_draft_background(draft_id, draft_folder, task_id):
                     # Add image download task
                     download_tasks.append({
                         'type': 'image',
-                        'func': download_file,
+                        'func': fetch_asset,
                         'args': (remote_url, f"{draft_id}/assets/image/{material_name}"),
                         'material': video
                     })
                 
                 elif video.material_type == 'video':
-                    # Use helper function to build path
-                    if draft_folder:
-                        video.replace_path = build_asset_path(draft_folder, draft_id, "video", material_name)
                     if not remote_url:
                         logger.warning(f"Video file {material_name} has no remote_url, skipping download.")
                         continue
@@ -212,144 +278,99 @@ def save_draft_background(draft_id, draft_folder, task_id):
                     # Add video download task
                     download_tasks.append({
                         'type': 'video',
-                        'func': download_file,
+                        'func': fetch_asset,
                         'args': (remote_url, f"{draft_id}/assets/video/{material_name}"),
                         'material': video
                     })
 
-        update_task_field(task_id, "message", f"Collected {len(download_tasks)} download tasks in total")
-        update_task_field(task_id, "progress", 10)
+        _check_cancelled(job)
+        update_task_fields(task_id, message=f"Collected {len(download_tasks)} download tasks in total", progress=10)
         logger.info(f"Task {task_id} progress 10%: Collected {len(download_tasks)} download tasks in total.")
 
         # Execute all download tasks concurrently
         downloaded_paths = []
+        # Downloaded file of each material, keyed by its remote URL
+        downloaded: Dict[str, str] = {}
         completed_files = 0
         if download_tasks:
             logger.info(f"Starting concurrent download of {len(download_tasks)} files...")
             
-            # Use thread pool for concurrent downloads, maximum concurrency of 16
-            with ThreadPoolExecutor(max_workers=16) as executor:
-                # Submit all download tasks
-                future_to_task = {
-                    executor.submit(task['func'], *task['args']): task 
-                    for task in download_tasks
-                }
+            # Downloads run on the process-wide scheduler, shared fairly with other saves
+            future_to_task = {
+                DOWNLOAD_SCHEDULER.submit(task_id, *task['args'], download=task['func']): task
+                for task in download_tasks
+            }
                 
-                # Wait for all tasks to complete
-                for future in as_completed(future_to_task):
-                    task = future_to_task[future]
-                    try:
-                        local_path = future.result()
+            # Wait for all tasks to complete
+            for future in as_completed(future_to_task):
+                if job is not None and job.cancel_event.is_set():
+                    # Drop downloads that have not started, running ones finish in the background
+                    for pending in future_to_task:
+                        pending.cancel()
+                    _check_cancelled(job)
+                task = future_to_task[future]
+                try:
+                    if future.result():
+                        local_path = task['args'][1]
                         downloaded_paths.append(local_path)
+                        downloaded[task['material'].remote_url] = local_path
                         
-                        # Update task status - only update completed files count
-                        completed_files += 1
-                        update_task_field(task_id, "completed_files", completed_files)
-                        task_status = get_task_status(task_id)
-                        completed = task_status["completed_files"]
-                        total = len(download_tasks)
-                        update_task_field(task_id, "total_files", total)
-                        # Download part accounts for 60% of the total progress
-                        download_progress = 10 + int((completed / total) * 60)
-                        update_task_field(task_id, "progress", download_progress)
-                        update_task_field(task_id, "message", f"Downloaded {completed}/{total} files")
+                    # Update task status - only update completed files count
+                    completed_files += 1
+                    total = len(download_tasks)
+                    # Download part accounts for 55% of the total progress
+                    download_progress = 10 + int((completed_files / total) * 55)
+                    # Publish the whole progress step as a single task change event
+                    update_task_fields(task_id,
+                                       completed_files=completed_files,
+                                       total_files=total,
+                                       progress=download_progress,
+                                       message=f"Downloaded {completed_files}/{total} files")
                         
-                        logger.info(f"Task {task_id}: Successfully downloaded {task['type']} file, progress {download_progress}.")
-                    except Exception as e:
-                        logger.error(f"Task {task_id}: Download {task['type']} file failed: {str(e)}", exc_info=True)
-                        # Continue processing other files, don't interrupt the entire process
+                    logger.info(f"Task {task_id}: Successfully downloaded {task['type']} file, progress {download_progress}.")
+                except Exception as e:
+                    logger.error(f"Task {task_id}: Download {task['type']} file failed: {str(e)}", exc_info=True)
+                    # Continue processing other files, don't interrupt the entire process
             
             logger.info(f"Task {task_id}: Concurrent download completed, downloaded {len(downloaded_paths)} files in total.")
+
+        # Update task status
+        _check_cancelled(job)
+        update_task_fields(task_id, message="Updating media file metadata", progress=65)
+        logger.info(f"Task {task_id} progress 65%: Updating media file metadata.")
+
+        script = _prepare_saved_draft(draft_id, draft_folder, task_id, downloaded)
+        if script is None:
+            raise ValueError(f"Draft {draft_id} was removed while its media was downloaded")
         
         # Update task status - Start saving draft information
-        update_task_field(task_id, "progress", 70)
-        update_task_field(task_id, "message", "Saving draft information")
+        _check_cancelled(job)
+        update_task_fields(task_id, progress=70, message="Saving draft information")
         logger.info(f"Task {task_id} progress 70%: Saving draft information.")
         
-        script.dump(f"{draft_id}/draft_info.json")
-        logger.info(f"Draft information has been saved to {draft_id}/draft_info.json.")
-        
-        # Save draft content to draft_content.json
-        script_content = script.dumps()
-        with open(f"{draft_id}/draft_content.json", 'w', encoding='utf-8') as f:
-            f.write(script_content)
-        logger.info(f"Draft content has been saved to {draft_id}/draft_content.json.")
-        
-        # Create draft_content.json.bak backup
-        shutil.copy2(f"{draft_id}/draft_content.json", f"{draft_id}/draft_content.json.bak")
-        logger.info(f"Created backup: draft_content.json.bak")
-        
-        # 修复draft_info.json和draft_content.json中的平台信息
-        try:
-            # 修复draft_info.json
-            info_path = os.path.join(draft_id, "draft_info.json")
-            if os.path.exists(info_path):
-                with open(info_path, 'r', encoding='utf-8') as f:
-                    info_data = json.load(f)
-                
-                # 更新平台信息为Windows系统
-                import uuid
-                info_data["platform"]["os"] = "windows"
-                info_data["platform"]["os_version"] = "10.0.19045"
-                info_data["platform"]["device_id"] = str(uuid.uuid4()).replace("-", "")[:32]
-                info_data["platform"]["hard_disk_id"] = str(uuid.uuid4()).replace("-", "")[:32]
-                info_data["platform"]["mac_address"] = str(uuid.uuid4()).replace("-", "")[:32]
-                
-                info_data["last_modified_platform"]["os"] = "windows"
-                info_data["last_modified_platform"]["os_version"] = "10.0.19045"
-                info_data["last_modified_platform"]["device_id"] = str(uuid.uuid4()).replace("-", "")[:32]
-                info_data["last_modified_platform"]["hard_disk_id"] = str(uuid.uuid4()).replace("-", "")[:32]
-                info_data["last_modified_platform"]["mac_address"] = str(uuid.uuid4()).replace("-", "")[:32]
-                
-                with open(info_path, "w", encoding="utf-8") as f:
-                    json.dump(info_data, f, ensure_ascii=False, indent=4)
-                logger.info("✅ 修复draft_info.json平台信息")
-            
-            # 修复draft_content.json
-            content_path = os.path.join(draft_id, "draft_content.json")
-            if os.path.exists(content_path):
-                with open(content_path, 'r', encoding='utf-8') as f:
-                    content_data = json.load(f)
-                
-                # 更新平台信息为Windows系统
-                content_data["platform"]["os"] = "windows"
-                content_data["platform"]["os_version"] = "10.0.19045"
-                content_data["platform"]["device_id"] = str(uuid.uuid4()).replace("-", "")[:32]
-                content_data["platform"]["hard_disk_id"] = str(uuid.uuid4()).replace("-", "")[:32]
-                content_data["platform"]["mac_address"] = str(uuid.uuid4()).replace("-", "")[:32]
-                
-                content_data["last_modified_platform"]["os"] = "windows"
-                content_data["last_modified_platform"]["os_version"] = "10.0.19045"
-                content_data["last_modified_platform"]["device_id"] = str(uuid.uuid4()).replace("-", "")[:32]
-                content_data["last_modified_platform"]["hard_disk_id"] = str(uuid.uuid4()).replace("-", "")[:32]
-                content_data["last_modified_platform"]["mac_address"] = str(uuid.uuid4()).replace("-", "")[:32]
-                
-                with open(content_path, "w", encoding="utf-8") as f:
-                    json.dump(content_data, f, ensure_ascii=False, indent=4)
-                logger.info("✅ 修复draft_content.json平台信息")
-                
-        except Exception as e:
-            logger.error(f"修复平台信息失败: {str(e)}")
+        # Build the draft content once and write the same bytes to every draft file
+        with draft_lock(draft_id):
+            content = script.export_content()
+            _fix_platform_info(content)
+            draft_bytes = encode_json(
+                content,
+                encoder=DRAFT_JSON_CONFIG.get("encoder", "auto"),
+                indent=None if DRAFT_JSON_CONFIG.get("compact", True) else 4
+            )
+        for file_name in DRAFT_JSON_FILES:
+            with open(os.path.join(draft_id, file_name), "wb") as f:
+                f.write(draft_bytes)
+        logger.info(f"Draft content ({len(draft_bytes)} bytes) has been saved to {', '.join(DRAFT_JSON_FILES)} in {draft_id}.")
 
         draft_url = ""
-        # Always compress draft files for local storage
-        # Update task status - Start compressing draft
-        update_task_field(task_id, "progress", 80)
-        update_task_field(task_id, "message", "Compressing draft files")
-        logger.info(f"Task {task_id} progress 80%: Compressing draft files.")
-        
-        # Compress the entire draft directory
-        zip_path = zip_draft(draft_id)
-        logger.info(f"Draft directory {draft_id} has been compressed to {zip_path}.")
-        
         if IS_UPLOAD_DRAFT:
             # Update task status - Start uploading to OSS
-            update_task_field(task_id, "progress", 90)
-            update_task_field(task_id, "message", "Uploading to cloud storage")
-            logger.info(f"Task {task_id} progress 90%: Uploading to cloud storage.")
+            _check_cancelled(job)
+            update_task_fields(task_id, progress=80, message="Uploading to cloud storage")
+            logger.info(f"Task {task_id} progress 80%: Uploading to cloud storage.")
             
-            # Upload to OSS
-            draft_url = upload_to_oss(zip_path)
+            # The archive is built while it is uploaded (media stored as is, JSON deflated), no zip file is written
+            draft_url = upload_stream_to_oss(f"{draft_id}.zip", stream_draft_zip(draft_id))
             logger.info(f"Draft archive has been uploaded to OSS, URL: {draft_url}")
             update_task_field(task_id, "draft_url", draft_url)
 
@@ -360,20 +381,26 @@ def save_draft_background(draft_id, draft_folder, task_id):
         else:
             # Local download mode - generate local download URL
             draft_url = f"{DRAFT_DOMAIN}{PREVIEW_ROUTER}?draft_id={draft_id}"
-            logger.info(f"Draft archive saved locally, download URL: {draft_url}")
+            logger.info(f"Draft saved locally, download URL: {draft_url}")
             update_task_field(task_id, "draft_url", draft_url)
             
-            # Keep the draft folder for local download
+            # Keep the draft folder for local download, the download endpoint streams its archive
             logger.info(f"Draft folder {draft_id} kept for local download")
 
     
         # Update task status - Completed
-        update_task_field(task_id, "status", "completed")
-        update_task_field(task_id, "progress", 100)
-        update_task_field(task_id, "message", "Draft creation completed")
+        update_task_fields(task_id, status="completed", progress=100, message="Draft creation completed")
         logger.info(f"Task {task_id} completed, draft URL: {draft_url}")
         return draft_url
 
+    except SaveCancelled:
+        update_task_fields(task_id, status="cancelled", message="Task cancelled")
+        # A half-written draft folder is of no use, remove it
+        if os.path.exists(draft_id):
+            shutil.rmtree(draft_id, ignore_errors=True)
+        logger.info(f"Saving draft {draft_id} task {task_id} was cancelled.")
+        return ""
+
     except Exception as e:
         # Update task status - Failed
         update_task_fields(task_id, 
@@ -385,27 +412,69 @@ def save_draft_background(draft_id, draft_folder, task_id):
 def query_task_status(task_id: str):
     return get_task_status(task_id)
 
-def save_draft_impl(draft_id: str, draft_folder: str = None) -> Dict[str, str]:
-    """Start a background task to save the draft"""
+def cancel_save_task(task_id: str) -> bool:
+    """Cancel a queued or running save task
+
+    :return: Whether an unfinished task was found
+    """
+    job = SAVE_QUEUE.cancel(task_id)
+    if job is None:
+        # The save may be queued or running in another server process, which stops at its next cancellation point
+        return request_task_cancel(task_id)
+    if job.state == "cancelled":
+        update_task_fields(task_id, status="cancelled", message="Task cancelled")
+    else:
+        update_task_field(task_id, "message", "Cancellation requested")
+    return True
+
+def save_draft_impl(draft_id: str, draft_folder: str = None, is_async: Optional[bool] = None,
+                    priority: int = 0, tenant: str = "default") -> Dict[str, str]:
+    """Queue a task to save the draft
+
+    :param draft_id: Draft ID
+    :param draft_folder: Draft folder path on the client, optional
+    :param is_async: Return the task_id immediately instead of waiting for the draft_url,
+                     default from save_queue_config.async_by_default
+    :param priority: Queue priority, lower values run first
+    :param tenant: Caller identity, workers are shared fairly between tenants
+    """
     logger.info(f"Received save draft request: draft_id={draft_id}, draft_folder={draft_folder}")
+    if is_async is None:
+        is_async = SAVE_QUEUE_CONFIG.get("async_by_default", False)
     try:
         # Generate a unique task ID
         task_id = draft_id
-        create_task(task_id)
-        logger.info(f"Task {task_id} has been created.")
-        
-        # Changed to synchronous execution
+
+        def on_queued():
+            if not start_task(task_id, status="queued", message="Waiting for a save worker"):
+                raise _SavedElsewhere()
+            logger.info(f"Task {task_id} has been queued.")
+
+        def submit() -> Optional[SaveJob]:
+            try:
+                return SAVE_QUEUE.submit(
+                    task_id,
+                    lambda job: save_draft_background(draft_id, draft_folder, task_id, job),
+                    priority=priority,
+                    tenant=tenant,
+                    on_queued=on_queued
+                )
+            except _SavedElsewhere:
+                logger.info(f"Task {task_id} is already running in another server process.")
+                return None
+
+        # A save of this draft that is already queued or running is reused, also across server processes
+        job = submit()
+
+        if is_async:
+            return {
+                "success": True,
+                "task_id": task_id
+            }
         return {
             "success": True,
-            "draft_url": save_draft_background(draft_id, draft_folder, task_id)
+            "draft_url": (job.wait() if job is not None else _wait_for_other_process(task_id, submit)) or ""
             }
-
-        # # Start a background thread to execute the task
-        # thread = threading.Thread(
-        #     target=save_draft_background,
-        #     args=(draft_id, draft_folder, task_id)
-        # )
-        # thread.start()
         
     except Exception as e:
         logger.error(f"Failed to start save draft task {draft_id}: {str(e)}", exc_info=True)
@@ -414,203 +483,202 @@ def save_draft_impl(draft_id: str, draft_folder: str = None) -> Dict[str, str]:
             "error": str(e)
         }
 
-def update_media_metadata(script, task_id=None):
+def _wait_for_other_process(task_id: str, submit: Callable[[], Optional[SaveJob]]) -> str:
+    """Wait for a save running in another server process and return its draft_url
+
+    The owner is checked every OWNER_CHECK_SECONDS; if it died mid-save, the task is claimed
+    by this process and saved again.
+
+    :param submit: Queues the save in this process, returns None if another process owns the task
+    """
+    version = 0
+    while True:
+        version, task_status = wait_for_task_update(task_id, since_version=version, timeout=OWNER_CHECK_SECONDS)
+        if task_status["status"] in TERMINAL_STATUSES:
+            return task_status.get("draft_url", "")
+        if task_abandoned(task_id):
+            logger.warning(f"Server process running task {task_id} died, taking the save over.")
+            job = submit()
+            if job is not None:
+                return job.wait() or ""
+
+def _download_validator(remote_url: str, local_path: Optional[str]) -> Optional[Dict[str, str]]:
+    """Validators the asset store recorded for a downloaded material, so probing it needs no HEAD request"""
+    return stored_validator(remote_url) if local_path else None
+
+
+def _probe_audio(remote_url: str, timeout: float, local_path: Optional[str] = None) -> Dict:
+    """Probe an audio material: whether it contains video streams, and its duration"""
+    info = probe_media(remote_url, timeout=timeout, local_path=local_path, validator=_download_validator(remote_url, local_path))
+    return {"has_video": first_stream(info, "video") is not None, "duration": media_duration(info)}
+
+
+def _probe_photo(remote_url: str, timeout: float, local_path: Optional[str] = None) -> Dict:
+    """Probe the pixel size of an image material"""
+    return probe_image_size(remote_url, timeout=timeout, local_path=local_path, validator=_download_validator(remote_url, local_path))
+
+
+def _probe_video(remote_url: str, timeout: float, local_path: Optional[str] = None) -> Dict:
+    """Probe the size and duration of a video material"""
+    info = probe_media(remote_url, timeout=timeout, local_path=local_path, validator=_download_validator(remote_url, local_path))
+    stream = first_stream(info, "video")
+    if stream is None:
+        return {"width": None, "height": None, "duration": media_duration(info)}
+    return {"width": stream["width"], "height": stream["height"], "duration": media_duration(info, "video")}
+
+
+def _run_probes(probe_jobs, task_id=None, local_paths: Optional[Dict[int, str]] = None) -> Dict[int, Dict]:
+    """Run material probes on a bounded pool within the per-save deadline
+
+    :param probe_jobs: List of (material, probe function) pairs
+    :param task_id: Optional task ID for progress messages
+    :param local_paths: Downloaded files keyed by id(material), probed instead of the remote URLs
+    :return: Probe results keyed by id(material); materials whose probe failed or missed the deadline are absent
+    """
+    results: Dict[int, Dict] = {}
+    if not probe_jobs:
+        return results
+    local_paths = local_paths or {}
+    timeout = MEDIA_PROBE_CONFIG.get("timeout_seconds", 15)
+    deadline = time.time() + MEDIA_PROBE_CONFIG.get("deadline_seconds", 60)
+    executor = ThreadPoolExecutor(max_workers=max(1, MEDIA_PROBE_CONFIG.get("workers", 8)))
+    try:
+        futures = {
+            executor.submit(probe, material.remote_url, timeout, local_paths.get(id(material))): material
+            for material, probe in probe_jobs
+        }
+        try:
+            for future in as_completed(futures, timeout=max(0, deadline - time.time())):
+                material = futures[future]
+                try:
+                    results[id(material)] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to probe media {material.material_name}: {str(e)}", exc_info=True)
+                if task_id:
+                    update_task_field(task_id, "message", f"Processed media metadata {len(results)}/{len(futures)}")
+        except FuturesTimeoutError:
+            pending = [futures[f].material_name for f in futures if not f.done()]
+            logger.warning(f"Media probing exceeded its deadline, using fallback metadata for: {', '.join(pending)}")
+    finally:
+        # Probes still running after the deadline finish in the background, their results are ignored
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def _fit_segments_to_material(script, material, track_type, segment_type, kind: str) -> None:
+    """Shorten the segments using a material whose source range exceeds its newly probed duration"""
+    for track_name, track in script.tracks.items():
+        if track.track_type != track_type:
+            continue
+        for segment in track.segments:
+            if not isinstance(segment, segment_type) or segment.material_id != material.material_id:
+                continue
+            # Get current settings
+            current_target = segment.target_timerange
+            current_source = segment.source_timerange
+            speed = segment.speed.speed
+
+            # If the end time of source_timerange exceeds the new duration, adjust it
+            if current_source.end > material.duration or current_source.end <= 0:
+                new_source_duration = material.duration - current_source.start
+                if new_source_duration <= 0:
+                    logger.warning(f"Warning: {kind.capitalize()} segment {segment.segment_id} start time {current_source.start} "
+                                   f"exceeds {kind} duration {material.duration}, will skip this segment.")
+                    continue
+
+                # Update source_timerange, then target_timerange based on it and the speed
+                segment.source_timerange = draft.Timerange(current_source.start, new_source_duration)
+                new_target_duration = int(new_source_duration / speed)
+                segment.target_timerange = draft.Timerange(current_target.start, new_target_duration)
+
+                logger.info(f"Adjusted {kind} segment {segment.segment_id} timerange to fit the new {kind} duration.")
+
+
+def _apply_audio_probe(script, audio, result: Optional[Dict]) -> None:
+    material_name = audio.material_name
+    if result is None:
+        logger.warning(f"Warning: Unable to probe audio {material_name}, keeping its current duration.")
+        return
+    if result["has_video"]:
+        logger.warning(f"Warning: Audio file {material_name} contains video tracks, skipped its metadata update.")
+        return
+    if result["duration"] is None:
+        logger.warning(f"Warning: Unable to get audio {material_name} duration: duration information not found.")
+        return
+    # Convert seconds to microseconds
+    audio.duration = int(result["duration"] * 1000000)
+    logger.info(f"Successfully obtained audio {material_name} duration: {result['duration']:.2f} seconds ({audio.duration} microseconds).")
+    _fit_segments_to_material(script, audio, draft.Track_type.audio, draft.Audio_segment, "audio")
+
+
+def _apply_photo_probe(video, result: Optional[Dict]) -> None:
+    if result is None:
+        logger.warning(f"Failed to set image {video.material_name} dimensions, using default values 1920x1080.")
+        video.width = 1920
+        video.height = 1080
+        return
+    video.width = result["width"]
+    video.height = result["height"]
+    logger.info(f"Successfully set image {video.material_name} dimensions: {video.width}x{video.height}.")
+
+
+def _apply_video_probe(script, video, result: Optional[Dict]) -> None:
+    material_name = video.material_name
+    if not result or result["width"] is None:
+        logger.warning(f"Warning: Unable to get video {material_name} stream information, using default values 1920x1080.")
+        # Set default values
+        video.width = 1920
+        video.height = 1080
+    else:
+        video.width = result["width"]
+        video.height = result["height"]
+        logger.info(f"Successfully set video {material_name} dimensions: {video.width}x{video.height}.")
+
+    if not result or result["duration"] is None:
+        return
+    video.duration = int(result["duration"] * 1000000)  # Convert to microseconds
+    logger.info(f"Successfully obtained video {material_name} duration: {result['duration']:.2f} seconds ({video.duration} microseconds).")
+    if result["width"] is not None:
+        _fit_segments_to_material(script, video, draft.Track_type.video, draft.Video_segment, "video")
+
+
+def update_media_metadata(script, task_id=None, local_paths: Optional[Dict[int, str]] = None):
     """
     Update metadata for all media files in the script (duration, width/height, etc.)
     
     :param script: Draft script object
     :param task_id: Optional task ID for updating task status
+    :param local_paths: Files already downloaded for the materials, keyed by id(material);
+                        these are probed locally instead of fetching their remote URL again
     :return: None
     """
-    # Process audio file metadata
-    audios = script.materials.audios
-    if not audios:
-        logger.info("No audio files found in the draft.")
-    else:
-        for audio in audios:
-            remote_url = audio.remote_url
-            material_name = audio.material_name
-            if not remote_url:
-                logger.warning(f"Warning: Audio file {material_name} has no remote_url, skipped.")
-                continue
-            
-            try:
-                video_command = [
-                    'ffprobe',
-                    '-v', 'error',
-                    '-select_streams', 'v:0',
-                    '-show_entries', 'stream=codec_type',
-                    '-of', 'json',
-                    remote_url
-                ]
-                video_result = subprocess.check_output(video_command, stderr=subprocess.STDOUT)
-                video_result_str = video_result.decode('utf-8')
-                # Find JSON start position (first '{')
-                video_json_start = video_result_str.find('{')
-                if video_json_start != -1:
-                    video_json_str = video_result_str[video_json_start:]
-                    video_info = json.loads(video_json_str)
-                    if 'streams' in video_info and len(video_info['streams']) > 0:
-                        logger.warning(f"Warning: Audio file {material_name} contains video tracks, skipped its metadata update.")
-                        continue
-            except Exception as e:
-                logger.error(f"Error occurred while checking if audio {material_name} contains video streams: {str(e)}", exc_info=True)
-
-            # Get audio duration and set it
-            try:
-                duration_result = get_video_duration(remote_url)
-                if duration_result["success"]:
-                    if task_id:
-                        update_task_field(task_id, "message", f"Processing audio metadata: {material_name}")
-                    # Convert seconds to microseconds
-                    audio.duration = int(duration_result["output"] * 1000000)
-                    logger.info(f"Successfully obtained audio {material_name} duration: {duration_result['output']:.2f} seconds ({audio.duration} microseconds).")
-                    
-                    # Update timerange for all segments using this audio material
-                    for track_name, track in script.tracks.items():
-                        if track.track_type == draft.Track_type.audio:
-                            for segment in track.segments:
-                                if isinstance(segment, draft.Audio_segment) and segment.material_id == audio.material_id:
-                                    # Get current settings
-                                    current_target = segment.target_timerange
-                                    current_source = segment.source_timerange
-                                    speed = segment.speed.speed
-                                    
-                                    # If the end time of source_timerange exceeds the new audio duration, adjust it
-                                    if current_source.end > audio.duration or current_source.end <= 0:
-                                        # Adjust source_timerange to fit the new audio duration
-                                        new_source_duration = audio.duration - current_source.start
-                                        if new_source_duration <= 0:
-                                            logger.warning(f"Warning: Audio segment {segment.segment_id} start time {current_source.start} exceeds audio duration {audio.duration}, will skip this segment.")
-                                            continue
-                                            
-                                        # Update source_timerange
-                                        segment.source_timerange = draft.Timerange(current_source.start, new_source_duration)
-                                        
-                                        # Update target_timerange based on new source_timerange and speed
-                                        new_target_duration = int(new_source_duration / speed)
-                                        segment.target_timerange = draft.Timerange(current_target.start, new_target_duration)
-                                        
-                                        logger.info(f"Adjusted audio segment {segment.segment_id} timerange to fit the new audio duration.")
-                else:
-                    logger.warning(f"Warning: Unable to get audio {material_name} duration: {duration_result['error']}.")
-            except Exception as e:
-                logger.error(f"Error occurred while getting audio {material_name} duration: {str(e)}", exc_info=True)
-    
-    # Process video and image file metadata
-    videos = script.materials.videos
-    if not videos:
-        logger.info("No video or image files found in the draft.")
-    else:
-        for video in videos:
-            remote_url = video.remote_url
-            material_name = video.material_name
-            if not remote_url:
-                logger.warning(f"Warning: Media file {material_name} has no remote_url, skipped.")
-                continue
-                
-            if video.material_type == 'photo':
-                # Use imageio to get image width/height and set it
-                try:
-                    if task_id:
-                        update_task_field(task_id, "message", f"Processing image metadata: {material_name}")
-                    img = imageio.imread(remote_url)
-                    video.height, video.width = img.shape[:2]
-                    logger.info(f"Successfully set image {material_name} dimensions: {video.width}x{video.height}.")
-                except Exception as e:
-                    logger.error(f"Failed to set image {material_name} dimensions: {str(e)}, using default values 1920x1080.", exc_info=True)
-                    video.width = 1920
-                    video.height = 1080
-            
-            elif video.material_type == 'video':
-                # Get video duration and width/height information
-                try:
-                    if task_id:
-                        update_task_field(task_id, "message", f"Processing video metadata: {material_name}")
-                    # Use ffprobe to get video information
-                    command = [
-                        'ffprobe',
-                        '-v', 'error',
-                        '-select_streams', 'v:0',  # Select the first video stream
-                        '-show_entries', 'stream=width,height,duration',
-                        '-show_entries', 'format=duration',
-                        '-of', 'json',
-                        remote_url
-                    ]
-                    result = subprocess.check_output(command, stderr=subprocess.STDOUT)
-                    result_str = result.decode('utf-8')
-                    # Find JSON start position (first '{')
-                    json_start = result_str.find('{')
-                    if json_start != -1:
-                        json_str = result_str[json_start:]
-                        info = json.loads(json_str)
-                        
-                        if 'streams' in info and len(info['streams']) > 0:
-                            stream = info['streams'][0]
-                            # Set width and height
-                            video.width = int(stream.get('width', 0))
-                            video.height = int(stream.get('height', 0))
-                            logger.info(f"Successfully set video {material_name} dimensions: {video.width}x{video.height}.")
-                            
-                            # Set duration
-                            # Prefer stream duration, if not available use format duration
-                            duration = stream.get('duration') or info['format'].get('duration', '0')
-                            video.duration = int(float(duration) * 1000000)  # Convert to microseconds
-                            logger.info(f"Successfully obtained video {material_name} duration: {float(duration):.2f} seconds ({video.duration} microseconds).")
-                            
-                            # Update timerange for all segments using this video material
-                            for track_name, track in script.tracks.items():
-                                if track.track_type == draft.Track_type.video:
-                                    for segment in track.segments:
-                                        if isinstance(segment, draft.Video_segment) and segment.material_id == video.material_id:
-                                            # Get current settings
-                                            current_target = segment.target_timerange
-                                            current_source = segment.source_timerange
-                                            speed = segment.speed.speed
-
-                                            # If the end time of source_timerange exceeds the new video duration, adjust it
-                                            if current_source.end > video.duration or current_source.end <= 0:
-                                                # Adjust source_timerange to fit the new video duration
-                                                new_source_duration = video.duration - current_source.start
-                                                if new_source_duration <= 0:
-                                                    logger.warning(f"Warning: Video segment {segment.segment_id} start time {current_source.start} exceeds video duration {video.duration}, will skip this segment.")
-                                                    continue
-                                                    
-                                                # Update source_timerange
-                                                segment.source_timerange = draft.Timerange(current_source.start, new_source_duration)
-                                                
-                                                # Update target_timerange based on new source_timerange and speed
-                                                new_target_duration = int(new_source_duration / speed)
-                                                segment.target_timerange = draft.Timerange(current_target.start, new_target_duration)
-                                                
-                                                logger.info(f"Adjusted video segment {segment.segment_id} timerange to fit the new video duration.")
-                        else:
-                            logger.warning(f"Warning: Unable to get video {material_name} stream information.")
-                            # Set default values
-                            video.width = 1920
-                            video.height = 1080
-                    else:
-                        logger.warning(f"Warning: Could not find JSON data in ffprobe output.")
-                        # Set default values
-                        video.width = 1920
-                        video.height = 1080
-                except Exception as e:
-                    logger.error(f"Error occurred while getting video {material_name} information: {str(e)}, using default values 1920x1080.", exc_info=True)
-                    # Set default values
-                    video.width = 1920
-                    video.height = 1080
-                    
-                    # Try to get duration separately
-                    try:
-                        duration_result = get_video_duration(remote_url)
-                        if duration_result["success"]:
-                            # Convert seconds to microseconds
-                            video.duration = int(duration_result["output"] * 1000000)
-                            logger.info(f"Successfully obtained video {material_name} duration: {duration_result['output']:.2f} seconds ({video.duration} microseconds).")
-                        else:
-                            logger.warning(f"Warning: Unable to get video {material_name} duration: {duration_result['error']}.")
-                    except Exception as e2:
-                        logger.error(f"Error occurred while getting video {material_name} duration: {str(e2)}.", exc_info=True)
+    # Probe every remote material concurrently, then apply the results on this thread
+    probe_jobs = []
+    for audio in script.materials.audios:
+        if not audio.remote_url:
+            logger.warning(f"Warning: Audio file {audio.material_name} has no remote_url, skipped.")
+            continue
+        probe_jobs.append((audio, _probe_audio))
+    for video in script.materials.videos:
+        if not video.remote_url:
+            logger.warning(f"Warning: Media file {video.material_name} has no remote_url, skipped.")
+            continue
+        if video.material_type == 'photo':
+            probe_jobs.append((video, _probe_photo))
+        elif video.material_type == 'video':
+            probe_jobs.append((video, _probe_video))
+    if not probe_jobs:
+        logger.info("No remote media files found in the draft.")
+
+    results = _run_probes(probe_jobs, task_id, local_paths)
+    for material, probe in probe_jobs:
+        result = results.get(id(material))
+        if probe is _probe_audio:
+            _apply_audio_probe(script, material, result)
+        elif probe is _probe_photo:
+            _apply_photo_probe(material, result)
+        else:
+            _apply_video_probe(script, material, result)
 
     # After updating all segments' timerange, check if there are time range conflicts in each track, and delete the later segment in case of conflict
     logger.info("Checking track segment time range conflicts...")
@@ -656,6 +724,7 @@ def update_media_metadata(script, task_id=None):
             track.process_pending_keyframes()
             logger.info(f"Pending keyframes in track {track_name} have been processed.")
 
+@locked_draft
 def query_script_impl(draft_id: str, force_update: bool = True):
     """
     Query draft script object, with option to force refresh media metadata
@@ -744,7 +813,7 @@ def download_script(draft_id: str, draft_folder: str = None, script_data: Dict =
                 # Add audio download task
                 download_tasks.append({
                     'type': 'audio',
-                    'func': download_file,
+                    'func': fetch_asset,
                     'args': (remote_url, audio['path']),
                     'material': audio
                 })
@@ -767,7 +836,7 @@ def download_script(draft_id: str, draft_folder: str = None, script_data: Dict =
                     # Add image download task
                     download_tasks.append({
                         'type': 'image',
-                        'func': download_file,
+                        'func': fetch_asset,
                         'args': (remote_url, video['path']),
                         'material': video
                     })
@@ -783,7 +852,7 @@ def download_script(draft_id: str, draft_folder: str = None, script_data: Dict =
                     # Add video download task
                     download_tasks.append({
                         'type': 'video',
-                        'func': download_file,
+                        'func': fetch_asset,
                         'args': (remote_url, video['path']),
                         'material': video
                     })
@@ -794,28 +863,26 @@ def download_script(draft_id: str, draft_folder: str = None, script_data: Dict =
         if download_tasks:
             logger.info(f"Starting concurrent download of {len(download_tasks)} files...")
             
-            # Use thread pool for concurrent downloads, maximum concurrency of 16
-            with ThreadPoolExecutor(max_workers=16) as executor:
-                # Submit all download tasks
-                future_to_task = {
-                    executor.submit(task['func'], *task['args']): task 
-                    for task in download_tasks
-                }
+            # Downloads run on the process-wide scheduler, shared fairly with other saves
+            future_to_task = {
+                DOWNLOAD_SCHEDULER.submit(draft_id, *task['args'], download=task['func']): task
+                for task in download_tasks
+            }
                 
-                # Wait for all tasks to complete
-                for future in as_completed(future_to_task):
-                    task = future_to_task[future]
-                    try:
-                        local_path = future.result()
-                        downloaded_paths.append(local_path)
+            # Wait for all tasks to complete
+            for future in as_completed(future_to_task):
+                task = future_to_task[future]
+                try:
+                    local_path = future.result()
+                    downloaded_paths.append(local_path)
                         
-                        # Update task status - only update completed files count
-                        completed_files += 1
-                        logger.info(f"Downloaded {completed_files}/{len(download_tasks)} files.")
-                    except Exception as e:
-                        logger.error(f"Failed to download {task['type']} file {task['args'][0]}: {str(e)}", exc_info=True)
-                        logger.error("Download failed.")
-                        # Continue processing other files, don't interrupt the entire process
+                    # Update task status - only update completed files count
+                    completed_files += 1
+                    logger.info(f"Downloaded {completed_files}/{len(download_tasks)} files.")
+                except Exception as e:
+                    logger.error(f"Failed to download {task['type']} file {task['args'][0]}: {str(e)}", exc_info=True)
+                    logger.error("Download failed.")
+                    # Continue processing other files, don't interrupt the entire process
             
             logger.info(f"Concurrent download completed, downloaded {len(downloaded_paths)} files in total.")
         
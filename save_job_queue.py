@@ -0,0 +1,220 @@
+import heapq
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('flask_video_generator')
+
+
+class QueueFull(Exception):
+    """The save queue already holds the configured maximum number of waiting jobs"""
+
+
+class SaveCancelled(Exception):
+    """Raised inside a running save when its job has been cancelled"""
+
+
+class SaveJob:
+    """A queued or running draft save"""
+
+    def __init__(self, task_id: str, func: Callable[["SaveJob"], str], priority: int, tenant: str):
+        self.task_id = task_id
+        self.func = func
+        self.priority = priority
+        self.tenant = tenant
+        self.state = "queued"  # queued / running / done / cancelled
+        self.result: Optional[str] = None
+        # Save submitted while this job was running, queued once it finishes
+        self.follow_up: Optional["SaveJob"] = None
+        self.on_queued: Optional[Callable[[], None]] = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    def check_cancelled(self) -> None:
+        """Cancellation point, call between the phases of a save
+
+        :raises SaveCancelled: The job has been cancelled
+        """
+        if self.cancel_event.is_set():
+            raise SaveCancelled(f"Save task {self.task_id} was cancelled")
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait for the job to finish and return the result of its function"""
+        self.done_event.wait(timeout)
+        return self.result
+
+
+class SaveJobQueue:
+    """Bounded pool of save workers fed by a priority queue that is fair between tenants
+
+    Lower priority values run first. Among jobs of the same priority, tenants take turns,
+    so one tenant submitting many saves cannot starve the others. Jobs are identified by
+    task_id; submitting a task that is already queued returns the existing job. Submitting a
+    task that is running schedules one follow-up job, queued when the running one finishes,
+    so that later edits are saved; further submissions return that follow-up.
+    """
+
+    def __init__(self, workers: int, max_queued: int = 0):
+        """
+        :param workers: Number of saves running at the same time
+        :param max_queued: Maximum number of waiting jobs, 0 means unbounded
+        """
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self._condition = threading.Condition()
+        # tenant -> heap of (priority, sequence, job); OrderedDict order is the round-robin order
+        self._tenants: "OrderedDict[str, List[Tuple[int, int, SaveJob]]]" = OrderedDict()
+        self._jobs: Dict[str, SaveJob] = {}
+        self._queued = 0
+        self._running = 0
+        self._sequence = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._accepting = True
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"save-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, task_id: str, func: Callable[[SaveJob], str], priority: int = 0,
+               tenant: str = "default", on_queued: Optional[Callable[[], None]] = None) -> SaveJob:
+        """Queue a save job
+
+        :param task_id: Task ID, also used to deduplicate saves of the same draft
+        :param func: Function performing the save, called with the job for cancellation checks
+        :param priority: Lower values run first, default 0
+        :param tenant: Caller identity used for fair sharing of the workers
+        :param on_queued: Called before a new job becomes visible to the workers, e.g. to initialize its task status
+        :raises QueueFull: Too many jobs are waiting
+        """
+        with self._condition:
+            if not self._accepting:
+                raise QueueFull("Save queue is shutting down")
+            running = self._jobs.get(task_id)
+            if running is not None and not running.cancel_event.is_set():
+                if running.state == "queued":
+                    return running
+                if running.follow_up is not None:
+                    return running.follow_up
+            else:
+                running = None
+            if self.max_queued and self._queued >= self.max_queued:
+                raise QueueFull(f"Save queue is full ({self._queued} jobs waiting)")
+            job = SaveJob(task_id, func, priority, tenant)
+            if running is not None:
+                # The running save may have read the draft before the latest edits, save again after it
+                job.on_queued = on_queued
+                running.follow_up = job
+                self._queued += 1
+                return job
+            if on_queued is not None:
+                on_queued()
+            self._jobs[task_id] = job
+            heapq.heappush(self._tenants.setdefault(tenant, []), (priority, next(self._sequence), job))
+            self._queued += 1
+            self._start_workers()
+            self._condition.notify()
+            return job
+
+    def cancel(self, task_id: str) -> Optional[SaveJob]:
+        """Cancel a queued or running job, a running save stops at its next cancellation point
+
+        :return: The cancelled job (its state is "cancelled" if it had not started yet), None if no unfinished job exists
+        """
+        with self._condition:
+            job = self._jobs.get(task_id)
+            if job is None:
+                return None
+            job.cancel_event.set()
+            if job.follow_up is not None:
+                self._finish(job.follow_up, "cancelled")
+                job.follow_up = None
+            if job.state == "queued":
+                # Leave the heap entry in place, workers skip cancelled jobs when they pop them
+                self._finish(job, "cancelled")
+            return job
+
+    def _finish(self, job: SaveJob, state: str) -> None:
+        if job.state == "queued":
+            self._queued -= 1
+        job.state = state
+        if self._jobs.get(job.task_id) is job:
+            del self._jobs[job.task_id]
+        job.done_event.set()
+        if job.follow_up is not None:
+            self._release_follow_up(job.follow_up)
+            job.follow_up = None
+        self._condition.notify_all()
+
+    def _release_follow_up(self, job: SaveJob) -> None:
+        """Queue the follow-up of a finished job, it waited outside the heap until now"""
+        try:
+            if job.on_queued is not None:
+                job.on_queued()
+        except Exception as e:
+            logger.info(f"Follow-up save {job.task_id} dropped: {str(e)}")
+            self._finish(job, "cancelled")
+            return
+        self._jobs[job.task_id] = job
+        heapq.heappush(self._tenants.setdefault(job.tenant, []), (job.priority, next(self._sequence), job))
+
+    def _next_job(self) -> Optional[SaveJob]:
+        """Pop the best queued job: lowest priority value, ties broken by tenant rotation"""
+        best_tenant = None
+        best_priority = None
+        for tenant, heap in list(self._tenants.items()):
+            while heap and heap[0][2].state != "queued":
+                heapq.heappop(heap)
+            if not heap:
+                del self._tenants[tenant]
+                continue
+            if best_priority is None or heap[0][0] < best_priority:
+                best_tenant, best_priority = tenant, heap[0][0]
+        if best_tenant is None:
+            return None
+        job = heapq.heappop(self._tenants[best_tenant])[2]
+        # The tenant that was just served goes to the back of the rotation
+        self._tenants.move_to_end(best_tenant)
+        return job
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if not self._accepting:
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+                self._queued -= 1
+                job.state = "running"
+                self._running += 1
+            try:
+                job.result = job.func(job)
+            except Exception as e:
+                logger.error(f"Save job {job.task_id} failed: {str(e)}", exc_info=True)
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    # _finish only adjusts the queued count for queued jobs
+                    self._finish(job, "cancelled" if job.cancel_event.is_set() else "done")
+
+    def stats(self) -> Dict[str, int]:
+        """Queue statistics: workers, waiting and running jobs"""
+        with self._condition:
+            return {"workers": self.workers, "queued": self._queued, "running": self._running}
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Stop accepting jobs and wait for queued and running jobs to finish
+
+        :param timeout: Maximum seconds to wait, None waits until the queue is drained
+        :return: Whether the queue was fully drained
+        """
+        with self._condition:
+            self._accepting = False
+            drained = self._condition.wait_for(lambda: not self._queued and not self._running, timeout)
+            self._condition.notify_all()
+            return drained
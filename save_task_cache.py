@@ -1,142 +1,294 @@
 from collections import OrderedDict
+import os
+import time
 import threading
-from typing import Dict, Any
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional, Tuple
+
+import draft_cache
 
 # Using OrderedDict to implement LRU cache, limiting the maximum number to 1000
 DRAFT_TASKS: Dict[str, dict] = OrderedDict()  # Using Dict for type hinting
 MAX_TASKS_CACHE_SIZE = 1000
+# Task status is updated from save worker and download threads while requests read it
+_TASKS_LOCK = threading.RLock()
+
+# Change events: every update stamps the task with the next value of a global sequence,
+# waiters of a task sleep on a condition (sharing the task lock) that exists only while someone waits
+_sequence = 0
+_TASK_VERSIONS: Dict[str, int] = {}
+_TASK_CONDITIONS: Dict[str, threading.Condition] = {}
+_TASK_WAITERS: Dict[str, int] = {}
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "not_found")
+
+# With a shared draft backend task statuses are stored there as well, so every server process
+# can report the tasks of the others. Versions then come from the backend, and waiters poll it
+# at this interval for changes made by other processes.
+SHARED_POLL_SECONDS = 0.25
+
+
+def _shared_backend():
+    """The draft backend if it is shared between processes, else None"""
+    backend = draft_cache.DRAFT_BACKEND
+    return backend if backend.shared else None
+
+
+# With a shared backend, storing a status is database I/O. It runs outside the global task lock,
+# ordered by a lock of the task that exists only while someone writes, so other tasks and their
+# waiters are not held up.
+_WRITE_LOCKS: Dict[str, threading.Lock] = {}
+_WRITE_LOCK_USERS: Dict[str, int] = {}
+
+
+@contextmanager
+def _write_lock(task_id: str):
+    with _TASKS_LOCK:
+        lock = _WRITE_LOCKS.get(task_id)
+        if lock is None:
+            lock = _WRITE_LOCKS[task_id] = threading.Lock()
+        _WRITE_LOCK_USERS[task_id] = _WRITE_LOCK_USERS.get(task_id, 0) + 1
+    try:
+        with lock:
+            yield
+    finally:
+        with _TASKS_LOCK:
+            _WRITE_LOCK_USERS[task_id] -= 1
+            if not _WRITE_LOCK_USERS[task_id]:
+                del _WRITE_LOCK_USERS[task_id]
+                del _WRITE_LOCKS[task_id]
+
+
+def _default_status(status: str = "initialized", message: str = "Task initialized") -> dict:
+    return {
+        "status": status,
+        "message": message,
+        "progress": 0,
+        "completed_files": 0,
+        "total_files": 0,
+        "draft_url": ""
+    }
+
+
+def _notify(task_id: str, version: int) -> None:
+    """Record the new version of a task and wake up clients waiting for it, call with the task lock held"""
+    _TASK_VERSIONS[task_id] = version
+    condition = _TASK_CONDITIONS.get(task_id)
+    if condition is not None:
+        condition.notify_all()
+
+
+def _update(task_id: str, mutate: Callable[[], Optional[bool]]) -> None:
+    """Apply a change to the stored status of a task and publish it
+
+    :param mutate: Modifies DRAFT_TASKS while the task lock is held, returns False if nothing changed
+    """
+    global _sequence
+    backend = _shared_backend()
+    if backend is None:
+        with _TASKS_LOCK:
+            if mutate() is not False:
+                _sequence += 1
+                _notify(task_id, _sequence)
+        return
+    with _write_lock(task_id):
+        with _TASKS_LOCK:
+            if mutate() is False:
+                return
+            task_status = dict(DRAFT_TASKS[task_id])
+        version = backend.store_task(task_id, task_status)
+        with _TASKS_LOCK:
+            _notify(task_id, version)
+
+
+def _task_entry(task_id: str) -> dict:
+    """Get the stored status of a task for in-place modification, creating a default one if needed"""
+    task_status = DRAFT_TASKS.get(task_id)
+    if task_status is None:
+        # If the cache is full, delete the least recently used item
+        if len(DRAFT_TASKS) >= MAX_TASKS_CACHE_SIZE:
+            evicted_id, _ = DRAFT_TASKS.popitem(last=False)
+            _TASK_VERSIONS.pop(evicted_id, None)
+        task_status = _default_status()
+        DRAFT_TASKS[task_id] = task_status
+    else:
+        DRAFT_TASKS.move_to_end(task_id)
+    return task_status
 
 
 def update_tasks_cache(task_id: str, task_status: dict) -> None:
     """Update task status LRU cache
-    
+
     :param task_id: Task ID
     :param task_status: Task status information dictionary
     """
-
-    if task_id in DRAFT_TASKS:
-        # If the key exists, delete the old item
-        DRAFT_TASKS.pop(task_id)
-    elif len(DRAFT_TASKS) >= MAX_TASKS_CACHE_SIZE:
-        # If the cache is full, delete the least recently used item (the first item)
-        DRAFT_TASKS.popitem(last=False)
-    # Add new item to the end (most recently used)
-    DRAFT_TASKS[task_id] = task_status
+    def mutate():
+        if task_id in DRAFT_TASKS:
+            DRAFT_TASKS.move_to_end(task_id)
+        elif len(DRAFT_TASKS) >= MAX_TASKS_CACHE_SIZE:
+            # If the cache is full, delete the least recently used item (the first item)
+            evicted_id, _ = DRAFT_TASKS.popitem(last=False)
+            _TASK_VERSIONS.pop(evicted_id, None)
+        # Store a private copy, later field updates modify it in place
+        DRAFT_TASKS[task_id] = dict(task_status)
+    _update(task_id, mutate)
 
 def update_task_field(task_id: str, field: str, value: Any) -> None:
     """Update a single field in the task status
-    
+
     :param task_id: Task ID
     :param field: Field name to update
     :param value: New value for the field
     """
-    if task_id in DRAFT_TASKS:
-        # Copy the current status, modify the specified field, then update the cache
-        task_status = DRAFT_TASKS[task_id].copy()
-        task_status[field] = value
-        # Delete the old item and add the updated item
-        DRAFT_TASKS.pop(task_id)
-        DRAFT_TASKS[task_id] = task_status
-    else:
-        # If the task doesn't exist, create a default status and set the specified field
-        task_status = {
-            "status": "initialized",
-            "message": "Task initialized",
-            "progress": 0,
-            "completed_files": 0,
-            "total_files": 0,
-            "draft_url": ""
-        }
-        task_status[field] = value
-        # If the cache is full, delete the least recently used item
-        if len(DRAFT_TASKS) >= MAX_TASKS_CACHE_SIZE:
-            DRAFT_TASKS.popitem(last=False)
-        # Add new item
-        DRAFT_TASKS[task_id] = task_status
+    def mutate():
+        _task_entry(task_id)[field] = value
+    _update(task_id, mutate)
 
 def update_task_fields(task_id: str, **fields) -> None:
     """Update multiple fields in the task status
-    
+
     :param task_id: Task ID
     :param fields: Fields to update and their values, provided as keyword arguments
     """
-    if task_id in DRAFT_TASKS:
-        # Copy the current status, modify the specified fields, then update the cache
-        task_status = DRAFT_TASKS[task_id].copy()
-        for field, value in fields.items():
-            task_status[field] = value
-        # Delete the old item and add the updated item
-        DRAFT_TASKS.pop(task_id)
-        DRAFT_TASKS[task_id] = task_status
-    else:
-        # If the task doesn't exist, create a default status and set the specified fields
-        task_status = {
-            "status": "initialized",
-            "message": "Task initialized",
-            "progress": 0,
-            "completed_files": 0,
-            "total_files": 0,
-            "draft_url": ""
-        }
-        for field, value in fields.items():
-            task_status[field] = value
-        # If the cache is full, delete the least recently used item
-        if len(DRAFT_TASKS) >= MAX_TASKS_CACHE_SIZE:
-            DRAFT_TASKS.popitem(last=False)
-        # Add new item
-        DRAFT_TASKS[task_id] = task_status
+    def mutate():
+        _task_entry(task_id).update(fields)
+    _update(task_id, mutate)
 
 def increment_task_field(task_id: str, field: str, increment: int = 1) -> None:
     """Increment a numeric field in the task status
-    
+
     :param task_id: Task ID
     :param field: Field name to increment
     :param increment: Value to increment by, default is 1
     """
-    if task_id in DRAFT_TASKS:
-        # Copy the current status, increment the specified field, then update the cache
-        task_status = DRAFT_TASKS[task_id].copy()
+    def mutate():
+        if task_id not in DRAFT_TASKS:
+            return False
+        task_status = _task_entry(task_id)
         if field in task_status and isinstance(task_status[field], (int, float)):
             task_status[field] += increment
         else:
             task_status[field] = increment
-        # Delete the old item and add the updated item
-        DRAFT_TASKS.pop(task_id)
-        DRAFT_TASKS[task_id] = task_status
+    _update(task_id, mutate)
+
+def _snapshot(task_id: str) -> Tuple[int, dict]:
+    """(version, copy of the status) of a task, (0, not_found status) if it does not exist
+
+    With a shared backend the status is read from it without taking the task lock.
+    """
+    backend = _shared_backend()
+    if backend is not None:
+        loaded = backend.load_task(task_id)
+        if loaded is not None:
+            return loaded
+        return 0, _default_status("not_found", "Task does not exist")
+    with _TASKS_LOCK:
+        if task_id in DRAFT_TASKS:
+            # Update its position in the LRU cache
+            DRAFT_TASKS.move_to_end(task_id)
+            return _TASK_VERSIONS.get(task_id, 0), dict(DRAFT_TASKS[task_id])
+    return 0, _default_status("not_found", "Task does not exist")
 
 def get_task_status(task_id: str) -> dict:
     """Get task status
-    
+
     :param task_id: Task ID
-    :return: Task status information dictionary
+    :return: Snapshot of the task status information dictionary
     """
-    task_status = DRAFT_TASKS.get(task_id, {
-        "status": "not_found",
-        "message": "Task does not exist",
-        "progress": 0,
-        "completed_files": 0,
-        "total_files": 0,
-        "draft_url": ""
-    })
-    
-    # If the task is found, update its position in the LRU cache
-    if task_id in DRAFT_TASKS:
-        # First delete, then add to the end, implementing LRU update
-        update_tasks_cache(task_id, task_status)
-        
-    return task_status
+    return _snapshot(task_id)[1]
+
+def get_task_version(task_id: str) -> int:
+    """Get the change version of a task, 0 if the task does not exist
+
+    :param task_id: Task ID
+    """
+    return _snapshot(task_id)[0]
+
+def wait_for_task_update(task_id: str, since_version: int = 0, timeout: Optional[float] = 30.0) -> Tuple[int, dict]:
+    """Block until the task changes after `since_version` or the timeout expires
+
+    :param task_id: Task ID
+    :param since_version: Version the caller has already seen, 0 returns immediately for existing tasks
+    :param timeout: Maximum seconds to wait, None waits forever
+    :return: (current version, snapshot of the task status); the version equals `since_version` on timeout
+    """
+    version, task_status = _snapshot(task_id)
+    if version > since_version:
+        return version, task_status
+    shared = _shared_backend() is not None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _TASKS_LOCK:
+        condition = _TASK_CONDITIONS.get(task_id)
+        if condition is None:
+            condition = _TASK_CONDITIONS[task_id] = threading.Condition(_TASKS_LOCK)
+        _TASK_WAITERS[task_id] = _TASK_WAITERS.get(task_id, 0) + 1
+    try:
+        while version <= since_version:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            if shared:
+                # Local changes still wake the condition, changes of other processes are polled
+                remaining = SHARED_POLL_SECONDS if remaining is None else min(remaining, SHARED_POLL_SECONDS)
+            with _TASKS_LOCK:
+                # A local change published since the last snapshot must not be slept through
+                if _TASK_VERSIONS.get(task_id, 0) <= since_version:
+                    condition.wait(remaining)
+            version, task_status = _snapshot(task_id)
+    finally:
+        with _TASKS_LOCK:
+            _TASK_WAITERS[task_id] -= 1
+            if not _TASK_WAITERS[task_id]:
+                del _TASK_WAITERS[task_id]
+                del _TASK_CONDITIONS[task_id]
+    return max(version, since_version), task_status
 
 def create_task(task_id: str) -> None:
     """Create a new task and initialize its status
-    
+
     :param task_id: Task ID
     """
-    task_status = {
-        "status": "initialized",
-        "message": "Task initialized",
-        "progress": 0,
-        "completed_files": 0,
-        "total_files": 0,
-        "draft_url": ""
-    }
-    update_tasks_cache(task_id, task_status)
\ No newline at end of file
+    update_tasks_cache(task_id, _default_status())
+
+def start_task(task_id: str, **fields) -> bool:
+    """Create a task for this process, unless another server process is still running it
+
+    Without a shared backend there are no other processes and the task is always created.
+
+    :param task_id: Task ID
+    :param fields: Initial status fields, e.g. status and message
+    :return: Whether the task was created; False means another live process owns the unfinished task
+    """
+    task_status = _default_status()
+    task_status.update(fields)
+    backend = _shared_backend()
+    if backend is None:
+        update_tasks_cache(task_id, task_status)
+        return True
+    with _write_lock(task_id):
+        version = backend.claim_task(task_id, os.getpid(), task_status)
+        if not version:
+            return False
+        with _TASKS_LOCK:
+            _task_entry(task_id).clear()
+            DRAFT_TASKS[task_id].update(task_status)
+            _notify(task_id, version)
+    return True
+
+def request_task_cancel(task_id: str) -> bool:
+    """Ask the server process running a task to cancel it (shared backend only)
+
+    :return: Whether an unfinished task was found
+    """
+    backend = _shared_backend()
+    return backend is not None and backend.request_task_cancel(task_id)
+
+def task_cancel_requested(task_id: str) -> bool:
+    """Whether another server process asked to cancel the task"""
+    backend = _shared_backend()
+    return backend is not None and backend.task_cancel_requested(task_id)
+
+def task_abandoned(task_id: str) -> bool:
+    """Whether the server process running an unfinished task has died (shared backend only)"""
+    backend = _shared_backend()
+    return backend is not None and backend.task_abandoned(task_id)
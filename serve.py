@@ -0,0 +1,126 @@
+"""Production entry point of the CapCut API server
+
+    python serve.py
+
+Runs capcut_server with gunicorn: `workers` processes with `threads` request threads each
+(`server_config` in config.json). Several processes share drafts and save tasks through the
+sqlite draft backend, so more than one worker requires `draft_backend_config.type = "sqlite"`.
+
+On SIGTERM every worker stops accepting connections, finishes its in-flight requests and then
+waits up to `drain_timeout` seconds for its queued and running saves before exiting. Under
+gunicorn the wait is capped below `timeout`: the worker heartbeat stops once it no longer
+serves, and the master kills workers whose heartbeat is older than `timeout` (e.g. when they
+are replaced after a HUP or max_requests). Raise both to allow longer drains.
+
+Where gunicorn is not available (e.g. on Windows) a single threaded Werkzeug server is used.
+"""
+import signal
+import logging
+import threading
+
+from settings.local import SERVER_CONFIG, DRAFT_BACKEND_CONFIG
+
+logger = logging.getLogger('flask_video_generator')
+
+
+def check_worker_model(workers: int) -> None:
+    """Refuse worker counts the configured draft backend cannot support
+
+    :raises ValueError: Several workers with the in-process backend, each would hold its own drafts
+    """
+    if workers > 1 and DRAFT_BACKEND_CONFIG.get("type", "memory") == "memory":
+        raise ValueError(
+            f"Running {workers} worker processes requires a shared draft backend, "
+            f"set draft_backend_config.type to \"sqlite\" or server_config.workers to 1"
+        )
+
+
+# Seconds between the end of a worker's drain and the heartbeat timeout of the gunicorn master
+HEARTBEAT_MARGIN = 10
+
+
+def _drain_timeout() -> float:
+    return SERVER_CONFIG.get("drain_timeout", 100)
+
+
+def _worker_drain_timeout() -> float:
+    """Drain budget of a gunicorn worker, short enough to finish before the master kills it"""
+    return max(0, min(_drain_timeout(), SERVER_CONFIG.get("timeout", 120) - HEARTBEAT_MARGIN))
+
+
+def _worker_exit(server, worker) -> None:
+    # gunicorn hook, runs in the worker process once it has stopped serving requests and sending heartbeats
+    from server_lifecycle import drain
+    drain(_worker_drain_timeout())
+
+
+def gunicorn_options() -> dict:
+    """gunicorn settings derived from SERVER_CONFIG"""
+    return {
+        "bind": SERVER_CONFIG.get("bind", "0.0.0.0:9000"),
+        "workers": SERVER_CONFIG.get("workers", 1),
+        "worker_class": "gthread",
+        "threads": SERVER_CONFIG.get("threads", 16),
+        "timeout": SERVER_CONFIG.get("timeout", 120),
+        # The master kills workers still alive after graceful_timeout, leave room for draining the saves
+        "graceful_timeout": _worker_drain_timeout() + 30,
+        "worker_exit": _worker_exit,
+    }
+
+
+def run_gunicorn() -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class CapCutApplication(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_options().items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in each worker, so no draft state or database connection crosses a fork
+            from capcut_server import app
+            return app
+
+    CapCutApplication().run()
+
+
+def run_werkzeug() -> None:
+    """Single process fallback: threaded Werkzeug server with the same drain on SIGTERM/SIGINT"""
+    from werkzeug.serving import make_server
+    from capcut_server import app
+    from server_lifecycle import drain
+
+    host, _, port = SERVER_CONFIG.get("bind", "0.0.0.0:9000").rpartition(":")
+    server = make_server(host or "0.0.0.0", int(port), app, threaded=True)
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever() to return, which runs in this (main) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info(f"Serving on {host}:{port} with the Werkzeug server")
+    server.serve_forever()
+    drain(_drain_timeout())
+    server.server_close()
+
+
+def main() -> None:
+    workers = SERVER_CONFIG.get("workers", 1)
+    check_worker_model(workers)
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        if workers > 1:
+            raise SystemExit("gunicorn is required to run several worker processes: pip install gunicorn")
+        logger.warning("gunicorn is not installed, falling back to a single threaded Werkzeug server")
+        run_werkzeug()
+        return
+    if _worker_drain_timeout() < _drain_timeout():
+        logger.warning(f"drain_timeout is capped to {_worker_drain_timeout()}s, "
+                       f"server_config.timeout must exceed it by {HEARTBEAT_MARGIN}s")
+    run_gunicorn()
+
+
+if __name__ == '__main__':
+    main()
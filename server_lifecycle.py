@@ -0,0 +1,56 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import draft_cache
+from save_draft_impl import SAVE_QUEUE
+
+logger = logging.getLogger('flask_video_generator')
+
+# Set once the process starts shutting down; readiness then fails so load balancers stop sending requests
+_DRAINING = threading.Event()
+
+
+def is_draining() -> bool:
+    """Whether this server process is shutting down"""
+    return _DRAINING.is_set()
+
+
+def readiness() -> Tuple[bool, Dict]:
+    """Check whether this server process can take new requests
+
+    :return: (ready, details); not ready while draining, when the draft backend cannot be
+             reached or when the save queue is full
+    """
+    checks = {"draining": is_draining()}
+    ready = not checks["draining"]
+    try:
+        draft_cache.DRAFT_BACKEND.version("__readiness__")
+        checks["draft_backend"] = "ok"
+    except Exception as e:
+        checks["draft_backend"] = f"error: {str(e)}"
+        ready = False
+    queue = SAVE_QUEUE.stats()
+    checks["save_queue"] = queue
+    if SAVE_QUEUE.max_queued and queue["queued"] >= SAVE_QUEUE.max_queued:
+        ready = False
+    return ready, checks
+
+
+def drain(timeout: Optional[float] = None) -> bool:
+    """Stop accepting saves, wait for queued and running saves and persist the draft cache
+
+    Called when the process stops; new save requests are rejected from now on.
+
+    :param timeout: Maximum seconds to wait for the saves, None waits until they are done
+    :return: Whether all saves finished in time
+    """
+    _DRAINING.set()
+    stats = SAVE_QUEUE.stats()
+    logger.info(f"Draining: waiting for {stats['queued']} queued and {stats['running']} running saves")
+    drained = SAVE_QUEUE.shutdown(timeout)
+    if not drained:
+        stats = SAVE_QUEUE.stats()
+        logger.warning(f"Drain timed out, abandoning {stats['queued']} queued and {stats['running']} running saves")
+    draft_cache.DRAFT_CACHE.flush()
+    return drained
@@ -37,6 +37,97 @@ MP4_OSS_CONFIG = {
     "endpoint": ""
 }
 
+# 草稿缓存配置：内存中最多保留的草稿数及估算内存预算(字节)、冷数据落盘目录、空闲落盘时间(秒)、磁盘上最多保留的草稿数及缓存分片数
+DRAFT_CACHE_CONFIG = {
+    "max_memory_drafts": 10000,
+    "max_memory_bytes": 2 * 1024 ** 3,
+    "spill_dir": "./tmp/draft_store",
+    "idle_seconds": 1800,
+    "max_disk_drafts": 100000,
+    "shards": 16
+}
+
+# 草稿状态后端配置：memory 为进程内(单进程)，sqlite 为本机多进程共享；并发修改冲突时的最大重试次数
+DRAFT_BACKEND_CONFIG = {
+    "type": "memory",
+    "sqlite_path": "./tmp/draft_state.db",
+    "max_retries": 10
+}
+
+# 草稿保存队列配置：同时执行的保存任务数、最多排队任务数(0为不限)、保存接口默认是否异步返回
+SAVE_QUEUE_CONFIG = {
+    "workers": 4,
+    "max_queued": 1000,
+    "async_by_default": False
+}
+
+# 媒体探测结果缓存配置：内存条目上限、过期后重新校验ETag/Last-Modified的秒数、落盘目录(为空则不落盘)、磁盘条目上限
+MEDIA_PROBE_CACHE_CONFIG = {
+    "max_entries": 10000,
+    "ttl_seconds": 86400,
+    "disk_dir": "./tmp/probe_cache",
+    "max_disk_entries": 100000
+}
+
+# 媒体探测配置：并发探测数、每次保存探测阶段的总时限(秒)、单个素材的探测超时(秒)
+MEDIA_PROBE_CONFIG = {
+    "workers": 8,
+    "deadline_seconds": 60,
+    "timeout_seconds": 15
+}
+
+# 素材下载配置：共享连接池中每个域名的最大连接数、连接池缓存的域名数、读取块大小(字节)；
+# 分段并行下载(默认关闭)：是否启用、启用分段的最小文件大小、每段最小大小、最大段数
+DOWNLOAD_CONFIG = {
+    "max_connections_per_host": 16,
+    "max_hosts": 64,
+    "chunk_size": 64 * 1024,
+    "segmented": False,
+    "segmented_min_size": 64 * 1024 * 1024,
+    "min_segment_size": 16 * 1024 * 1024,
+    "max_segments": 8
+}
+
+# 下载调度配置：全进程共享的下载线程数、每个域名并发下载数的上限和初始值(按失败率和下载速度自动调整)
+DOWNLOAD_SCHEDULER_CONFIG = {
+    "workers": 32,
+    "max_per_host": 8,
+    "initial_per_host": 4
+}
+
+# OSS上传配置：超过阈值(字节)的文件分片并发上传，断点信息保存在checkpoint_dir，中断后从已上传的分片继续；
+# 分片大小(字节)、并发上传的分片数、失败重试次数
+OSS_UPLOAD_CONFIG = {
+    "multipart_threshold": 64 * 1024 * 1024,
+    "part_size": 8 * 1024 * 1024,
+    "num_threads": 4,
+    "max_retries": 3,
+    "checkpoint_dir": "./tmp/oss_checkpoints"
+}
+
+# 生产服务配置(python serve.py)：监听地址、worker进程数(大于1时草稿状态后端必须为sqlite)、每个进程的请求线程数、请求超时(秒)、停止时等待保存任务完成的秒数
+SERVER_CONFIG = {
+    "bind": "0.0.0.0:9000",
+    "workers": 1,
+    "threads": 16,
+    "timeout": 120,
+    "drain_timeout": 100
+}
+
+# 素材存储配置：下载的素材按内容去重保存并以硬链接放入草稿目录；是否启用、存储目录、磁盘预算(字节)、按ETag重新校验的秒数
+ASSET_STORE_CONFIG = {
+    "enabled": True,
+    "root": "./tmp/asset_store",
+    "max_bytes": 20 * 1024 ** 3,
+    "revalidate_seconds": 86400
+}
+
+# 草稿JSON写出配置：编码库(auto/orjson/ujson/json)、是否写出不含缩进的紧凑JSON
+DRAFT_JSON_CONFIG = {
+    "encoder": "auto",
+    "compact": True
+}
+
 # 尝试加载本地配置文件
 if os.path.exists(CONFIG_FILE_PATH):
     try:
@@ -73,6 +164,61 @@ if os.path.exists(CONFIG_FILE_PATH):
                 MP4_OSS_CONFIG = local_config["mp4_oss_config"]
                 print(f"✅ 配置加载: MP4 OSS配置已更新")
 
+            # 更新草稿缓存配置
+            if "draft_cache_config" in local_config:
+                DRAFT_CACHE_CONFIG.update(local_config["draft_cache_config"])
+                print(f"✅ 配置加载: 草稿缓存配置已更新")
+
+            # 更新草稿状态后端配置
+            if "draft_backend_config" in local_config:
+                DRAFT_BACKEND_CONFIG.update(local_config["draft_backend_config"])
+                print(f"✅ 配置加载: draft_backend = {DRAFT_BACKEND_CONFIG.get('type')}")
+
+            # 更新草稿保存队列配置
+            if "save_queue_config" in local_config:
+                SAVE_QUEUE_CONFIG.update(local_config["save_queue_config"])
+                print(f"✅ 配置加载: 保存队列配置已更新")
+
+            # 更新媒体探测结果缓存配置
+            if "media_probe_cache_config" in local_config:
+                MEDIA_PROBE_CACHE_CONFIG.update(local_config["media_probe_cache_config"])
+                print(f"✅ 配置加载: 媒体探测缓存配置已更新")
+
+            # 更新媒体探测配置
+            if "media_probe_config" in local_config:
+                MEDIA_PROBE_CONFIG.update(local_config["media_probe_config"])
+                print(f"✅ 配置加载: 媒体探测配置已更新")
+
+            # 更新素材下载配置
+            if "download_config" in local_config:
+                DOWNLOAD_CONFIG.update(local_config["download_config"])
+                print(f"✅ 配置加载: segmented_download = {DOWNLOAD_CONFIG.get('segmented')}")
+
+            # 更新下载调度配置
+            if "download_scheduler_config" in local_config:
+                DOWNLOAD_SCHEDULER_CONFIG.update(local_config["download_scheduler_config"])
+                print(f"✅ 配置加载: download_workers = {DOWNLOAD_SCHEDULER_CONFIG.get('workers')}")
+
+            # 更新OSS上传配置
+            if "oss_upload_config" in local_config:
+                OSS_UPLOAD_CONFIG.update(local_config["oss_upload_config"])
+                print(f"✅ 配置加载: oss_multipart_threshold = {OSS_UPLOAD_CONFIG.get('multipart_threshold')}")
+
+            # 更新生产服务配置
+            if "server_config" in local_config:
+                SERVER_CONFIG.update(local_config["server_config"])
+                print(f"✅ 配置加载: server_workers = {SERVER_CONFIG.get('workers')}")
+
+            # 更新素材存储配置
+            if "asset_store_config" in local_config:
+                ASSET_STORE_CONFIG.update(local_config["asset_store_config"])
+                print(f"✅ 配置加载: asset_store_enabled = {ASSET_STORE_CONFIG.get('enabled')}")
+
+            # 更新草稿JSON写出配置
+            if "draft_json_config" in local_config:
+                DRAFT_JSON_CONFIG.update(local_config["draft_json_config"])
+                print(f"✅ 配置加载: draft_json_encoder = {DRAFT_JSON_CONFIG.get('encoder')}")
+
     except json.JSONDecodeError as e:
         print(f"❌ 配置文件JSON格式错误: {e}")
         print("使用默认配置")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from asset_store import AssetStore, FETCH_HIT, FETCH_DOWNLOADED
+
+
+class _AssetHandler(BaseHTTPRequestHandler):
+    """按路径返回服务器files中的内容并统计GET次数, 只响应GET请求, 条件请求的ETag匹配时返回304"""
+
+    def do_GET(self):
+        data = self.server.files[self.path]
+        etag = '"%d"' % hash(data)
+        if self.headers.get("If-None-Match"):
+            self.server.revalidations.append(self.path)
+            if self.headers["If-None-Match"] == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            data = data[:1]
+        else:
+            self.server.gets.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server(files):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AssetHandler)
+    server.files = files
+    server.gets = []
+    server.revalidations = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_second_draft_reuses_download():
+    """同一URL只下载一次, 草稿目录中的文件与存储共享内容"""
+    server, base = _start_server({"/a.mp4": b"a" * 1000, "/copy.mp4": b"a" * 1000})
+    with tempfile.TemporaryDirectory() as directory:
+        store = AssetStore(os.path.join(directory, "store"), max_bytes=0)
+        first = os.path.join(directory, "draft1", "assets", "video", "a.mp4")
+        second = os.path.join(directory, "draft2", "assets", "video", "a.mp4")
+        assert store.fetch(f"{base}/a.mp4", first)
+        assert store.fetch(f"{base}/a.mp4", second)
+        assert server.gets == ["/a.mp4"]
+        with open(second, "rb") as f:
+            assert f.read() == b"a" * 1000
+        assert os.stat(first).st_ino == os.stat(second).st_ino
+
+        # 不同URL的相同内容只保存一份
+        assert store.fetch(f"{base}/copy.mp4", os.path.join(directory, "draft3", "copy.mp4"))
+        assert store.stats() == {"bytes": 1000, "hits": 1, "misses": 2, "evictions": 0}
+        # 下载时记录的ETag可供媒体探测复用
+        assert store.validator(f"{base}/a.mp4") == {"etag": '"%d"' % hash(b"a" * 1000)}
+        assert store.validator(f"{base}/missing.mp4") is None
+    server.shutdown()
+
+
+def test_concurrent_fetches_share_one_download():
+    """并发获取同一URL时只下载一次"""
+    server, base = _start_server({"/b.mp4": b"b" * 10000})
+    with tempfile.TemporaryDirectory() as directory:
+        store = AssetStore(os.path.join(directory, "store"), max_bytes=0)
+        results = []
+        threads = [threading.Thread(target=lambda n=n: results.append(
+            store.fetch(f"{base}/b.mp4", os.path.join(directory, f"draft{n}", "b.mp4")))) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(results) == [FETCH_DOWNLOADED] + [FETCH_HIT] * 7
+        assert server.gets == ["/b.mp4"]
+    server.shutdown()
+
+
+def test_least_recently_used_files_are_evicted():
+    """超出磁盘预算时删除最久未使用的素材, 之后再次获取会重新下载"""
+    files = {f"/{n}.mp4": bytes([n]) * 400 for n in range(3)}
+    server, base = _start_server(files)
+    with tempfile.TemporaryDirectory() as directory:
+        store = AssetStore(os.path.join(directory, "store"), max_bytes=1000)
+        for n in range(3):
+            assert store.fetch(f"{base}/{n}.mp4", os.path.join(directory, "draft", f"{n}.mp4"))
+        assert store.stats()["bytes"] <= 1000
+        assert store.stats()["evictions"] == 1
+
+        assert store.fetch(f"{base}/0.mp4", os.path.join(directory, "again", "0.mp4"))
+        assert server.gets.count("/0.mp4") == 2
+        assert server.gets.count("/2.mp4") == 1
+    server.shutdown()
+
+
+def test_old_entries_are_revalidated_with_conditional_get():
+    """超过revalidate_seconds的条目通过条件GET请求重新验证, 未修改时复用, 修改后重新下载"""
+    files = {"/c.mp4": b"c" * 1000}
+    server, base = _start_server(files)
+    with tempfile.TemporaryDirectory() as directory:
+        store = AssetStore(os.path.join(directory, "store"), max_bytes=0, revalidate_seconds=0)
+        assert store.fetch(f"{base}/c.mp4", os.path.join(directory, "draft1", "c.mp4")) == FETCH_DOWNLOADED
+        assert store.fetch(f"{base}/c.mp4", os.path.join(directory, "draft2", "c.mp4")) == FETCH_HIT
+        assert server.gets == ["/c.mp4"] and server.revalidations == ["/c.mp4"]
+
+        files["/c.mp4"] = b"d" * 1000
+        assert store.fetch(f"{base}/c.mp4", os.path.join(directory, "draft3", "c.mp4")) == FETCH_DOWNLOADED
+        assert server.gets == ["/c.mp4", "/c.mp4"]
+        assert store.validator(f"{base}/c.mp4") == {"etag": '"%d"' % hash(b"d" * 1000)}
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    test_second_draft_reuses_download()
+    test_concurrent_fetches_share_one_download()
+    test_least_recently_used_files_are_evicted()
+    test_old_entries_are_revalidated_with_conditional_get()
+    print("🎉 素材存储测试通过")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+from capcut_server import app
+from create_draft import create_draft
+from draft_cache import DRAFT_CACHE, serialize_draft
+
+
+def _video(index: int, track_name: str = "main") -> dict:
+    return {"op": "add_video", "params": {"video_url": f"https://example.com/batch/{index}.mp4", "start": 0, "end": 1,
+                                          "duration": 1, "target_start": index, "track_name": track_name}}
+
+
+def _text(index: int) -> dict:
+    return {"op": "add_text", "params": {"text": f"字幕{index}", "start": index, "end": index + 1, "track_name": "text_main"}}
+
+
+def test_batch_creates_and_edits_draft():
+    """批量接口创建草稿并按顺序执行所有操作, 返回每个操作的结果"""
+    client = app.test_client()
+    response = client.post("/batch", json={"operations": [_video(0), _video(1), _text(0)]}).get_json()
+    assert response["success"], response["error"]
+    draft_id = response["output"]["draft_id"]
+    assert [item["op"] for item in response["output"]["results"]] == ["add_video", "add_video", "add_text"]
+    assert all(item["success"] for item in response["output"]["results"])
+    assert all(item["output"]["draft_id"] == draft_id for item in response["output"]["results"])
+    script = DRAFT_CACHE[draft_id]
+    assert len(script.tracks["main"].segments) == 2
+    assert len(script.tracks["text_main"].segments) == 1
+
+
+def test_failed_batch_changes_nothing():
+    """任一操作失败时草稿恢复到批量操作之前的状态"""
+    client = app.test_client()
+    _, draft_id = create_draft()
+    assert client.post("/batch", json={"draft_id": draft_id, "operations": [_video(0)]}).get_json()["success"]
+    before = serialize_draft(DRAFT_CACHE[draft_id])
+
+    operations = [_video(1), _text(1), {"op": "add_effect", "params": {"effect_type": "不存在的特效"}}, _video(2)]
+    response = client.post("/batch", json={"draft_id": draft_id, "operations": operations}).get_json()
+    assert not response["success"]
+    assert "Operation 2 (add_effect)" in response["error"]
+    assert [item["success"] for item in response["output"]["results"]] == [True, True, False]
+    script = DRAFT_CACHE[draft_id]
+    assert len(script.tracks["main"].segments) == 1
+    assert "text_main" not in script.tracks
+    assert serialize_draft(script) == before
+
+
+def test_invalid_batch_is_rejected_up_front():
+    """操作名无效或草稿不存在时不执行任何操作, 失败时不保留为批量操作新建的草稿"""
+    client = app.test_client()
+    _, draft_id = create_draft()
+    response = client.post("/batch", json={"draft_id": draft_id, "operations": [_video(0), {"op": "save_draft"}]}).get_json()
+    assert not response["success"] and "Operation 1 is invalid" in response["error"]
+    assert "main" not in DRAFT_CACHE[draft_id].tracks
+
+    response = client.post("/batch", json={"draft_id": "dfd_cat_missing", "operations": [_video(0)]}).get_json()
+    assert not response["success"] and "does not exist" in response["error"]
+
+    drafts = len(DRAFT_CACHE)
+    response = client.post("/batch", json={"operations": [_video(0), {"op": "add_effect", "params": {}}]}).get_json()
+    assert not response["success"] and response["output"]["draft_id"] == ""
+    assert len(DRAFT_CACHE) == drafts
+
+
+def benchmark(operations: int = 100) -> None:
+    """对比逐个请求与一次批量请求构建相同草稿的耗时"""
+    client = app.test_client()
+    started = time.perf_counter()
+    draft_id = client.post("/create_draft", json={}).get_json()["output"]["draft_id"]
+    for index in range(operations):
+        client.post("/add_video", json={**_video(index)["params"], "draft_id": draft_id})
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = client.post("/batch", json={"operations": [_video(index) for index in range(operations)]}).get_json()
+    batched = time.perf_counter() - started
+    assert response["success"]
+    print(f"\n{operations}个操作: 逐个请求 {single:.3f}s, 批量请求 {batched:.3f}s")
+
+
+if __name__ == "__main__":
+    test_batch_creates_and_edits_draft()
+    test_failed_batch_changes_nothing()
+    test_invalid_batch_is_rejected_up_front()
+    print("🎉 批量操作测试通过")
+    benchmark()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gzip
+import json
+import time
+
+from flask import Flask, jsonify
+
+from catalog_cache import catalog_endpoint
+from capcut_server import app, get_video_scene_effect_types
+
+
+def test_catalog_served_with_etag_and_gzip():
+    """目录接口返回gzip压缩内容和ETag, 客户端持有当前版本时返回304"""
+    client = app.test_client()
+    expected = get_video_scene_effect_types.__wrapped__()
+
+    response = client.get("/get_video_scene_effect_types", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    body = json.loads(gzip.decompress(response.get_data()))
+    assert body == {"success": True, "output": expected, "error": ""}
+    gzip_etag = response.headers["ETag"]
+
+    plain = client.get("/get_video_scene_effect_types")
+    assert "Content-Encoding" not in plain.headers
+    assert json.loads(plain.get_data()) == body
+    assert plain.headers["ETag"] != gzip_etag
+
+    for etag in (gzip_etag, plain.headers["ETag"], "W/" + gzip_etag):
+        cached = client.get("/get_video_scene_effect_types", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+        assert cached.status_code == 304 and cached.get_data() == b""
+    assert client.get("/get_video_scene_effect_types", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_catalog_built_once_and_failures_not_cached():
+    """目录只在首次请求时构建一次, 构建失败时返回错误且下次请求重新构建"""
+    test_app = Flask(__name__)
+    calls = []
+
+    @test_app.route("/types")
+    @catalog_endpoint("test types")
+    def types():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("metadata unavailable")
+        return [{"name": "a"}]
+
+    client = test_app.test_client()
+    failed = client.get("/types").get_json()
+    assert not failed["success"] and "test types" in failed["error"]
+    for _ in range(3):
+        assert client.get("/types").get_json()["output"] == [{"name": "a"}]
+    assert len(calls) == 2
+
+
+def benchmark(requests: int = 200) -> None:
+    """对比每次重建目录与使用预编码缓存的耗时"""
+    client = app.test_client()
+    build = get_video_scene_effect_types.__wrapped__
+    with app.test_request_context():
+        started = time.perf_counter()
+        for _ in range(requests):
+            jsonify({"success": True, "output": build(), "error": ""}).get_data()
+        rebuilt = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get("/get_video_scene_effect_types", headers={"Accept-Encoding": "gzip"}).get_data()
+    cached = time.perf_counter() - started
+    size = len(client.get("/get_video_scene_effect_types").get_data())
+    gzip_size = len(client.get("/get_video_scene_effect_types", headers={"Accept-Encoding": "gzip"}).get_data())
+    print(f"\n{requests}次场景特效目录请求: 每次重建 {rebuilt:.3f}s, 预编码缓存 {cached:.3f}s, 响应 {size}B -> gzip {gzip_size}B")
+
+
+if __name__ == "__main__":
+    test_catalog_served_with_etag_and_gzip()
+    test_catalog_built_once_and_failures_not_cached()
+    print("🎉 目录接口缓存测试通过")
+    benchmark()
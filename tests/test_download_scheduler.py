@@ -0,0 +1,154 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import tempfile
+import threading
+from concurrent.futures import wait
+
+from asset_store import FETCH_HIT
+from download_scheduler import DownloadScheduler, MIN_RATE_SAMPLE_BYTES
+
+
+class _FakeDownloads:
+    """记录每个域名和全局同时进行的下载数, 以及下载完成的顺序"""
+
+    def __init__(self, seconds: float = 0.05, fail_hosts=()):
+        self.seconds = seconds
+        self.fail_hosts = set(fail_hosts)
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.total_active = 0
+        self.total_peak = 0
+        self.finished = []
+
+    def __call__(self, url, local_path):
+        host = url.split("/")[2]
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+            self.total_active += 1
+            self.total_peak = max(self.total_peak, self.total_active)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.active[host] -= 1
+            self.total_active -= 1
+            self.finished.append(url)
+        return host not in self.fail_hosts
+
+
+def test_global_and_per_host_limits():
+    """全局下载数和每个域名的并发下载数不超过上限"""
+    scheduler = DownloadScheduler(workers=4, max_per_host=2, initial_per_host=2)
+    downloads = _FakeDownloads()
+    futures = [
+        scheduler.submit(f"task{n % 3}", f"http://{host}/{n}.mp4", f"/nonexistent/{n}.mp4", download=downloads)
+        for n in range(12) for host in ("a.example", "b.example", "c.example")
+    ]
+    wait(futures, timeout=10)
+    assert all(future.result() for future in futures)
+    assert downloads.total_peak <= 4
+    assert max(downloads.peak.values()) <= 2
+    stats = scheduler.stats()
+    assert stats["queued"] == 0 and stats["active"] == 0 and stats["completed"] == 36
+
+
+def test_tasks_share_workers_fairly():
+    """后提交的任务不必等待先提交任务的全部下载完成"""
+    scheduler = DownloadScheduler(workers=1, max_per_host=1, initial_per_host=1)
+    downloads = _FakeDownloads(seconds=0.01)
+    gate = threading.Event()
+    # 第一个下载阻塞工作线程, 让两个任务的下载都进入队列
+    blocker = scheduler.submit("big", "http://a.example/blocker.mp4", "/nonexistent", download=lambda url, path: gate.wait())
+    while not scheduler.stats()["active"]:
+        time.sleep(0.01)
+    big = [scheduler.submit("big", f"http://a.example/big{n}.mp4", "/nonexistent", download=downloads) for n in range(10)]
+    small = [scheduler.submit("small", f"http://a.example/small{n}.mp4", "/nonexistent", download=downloads) for n in range(2)]
+    assert scheduler.stats()["queued"] == 12
+    gate.set()
+    wait([blocker] + big + small, timeout=10)
+    order = [url.rsplit("/", 1)[1] for url in downloads.finished]
+    assert order[:4] == ["big0.mp4", "small0.mp4", "big1.mp4", "small1.mp4"] or \
+        order[:4] == ["small0.mp4", "big0.mp4", "small1.mp4", "big1.mp4"]
+
+
+def test_limit_adapts_to_failures():
+    """下载失败时域名并发上限减半, 成功时逐步恢复"""
+    scheduler = DownloadScheduler(workers=8, max_per_host=8, initial_per_host=8)
+    failing = _FakeDownloads(seconds=0, fail_hosts={"bad.example"})
+    for n in range(3):
+        scheduler.submit("task", f"http://bad.example/{n}.mp4", "/nonexistent", download=failing).result(timeout=5)
+    host = scheduler._hosts["bad.example"]
+    assert int(host.limit) == 1
+    assert scheduler.stats()["failed"] == 3
+
+    failing.fail_hosts.clear()
+    for n in range(10):
+        scheduler.submit("task", f"http://bad.example/ok{n}.mp4", "/nonexistent", download=failing).result(timeout=5)
+    assert int(host.limit) >= 3
+
+
+def test_asset_store_hits_do_not_affect_host_limit():
+    """素材库命中不是网络传输, 不计入域名的传输速度样本, 也不改变并发上限"""
+    scheduler = DownloadScheduler(workers=1, max_per_host=8, initial_per_host=4)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "asset.mp4")
+
+        def transfer(url, local_path):
+            with open(local_path, "wb") as f:
+                f.write(b"\0" * MIN_RATE_SAMPLE_BYTES)
+            time.sleep(0.05)
+            return True
+
+        def hit(url, local_path):
+            with open(local_path, "wb") as f:
+                f.write(b"\0" * MIN_RATE_SAMPLE_BYTES)
+            return FETCH_HIT
+
+        def run(name, download, completed):
+            scheduler.submit("task", f"http://cdn.example/{name}.mp4", path, download=download).result(timeout=5)
+            # The future resolves before the worker records the feedback
+            while scheduler.stats()["completed"] < completed:
+                time.sleep(0.001)
+
+        run("0", transfer, 1)
+        host = scheduler._hosts["cdn.example"]
+        best_rate, limit = host.best_rate, host.limit
+        for n in range(20):
+            run(f"hit{n}", hit, 2 + n)
+        assert host.best_rate == best_rate and host.limit == limit
+        assert host.completed == 21
+
+        run("1", transfer, 22)
+        assert host.limit > limit
+
+
+def test_cancelled_downloads_do_not_run():
+    """尚未开始的下载被取消后不会执行"""
+    scheduler = DownloadScheduler(workers=1, max_per_host=1)
+    downloads = _FakeDownloads(seconds=0.01)
+    gate = threading.Event()
+    scheduler.submit("task", "http://a.example/first.mp4", "/nonexistent", download=lambda url, path: gate.wait())
+    queued = [scheduler.submit("task", f"http://a.example/{n}.mp4", "/nonexistent", download=downloads) for n in range(5)]
+    while not scheduler.stats()["active"]:
+        time.sleep(0.01)
+    assert all(future.cancel() for future in queued)
+    gate.set()
+    last = scheduler.submit("task", "http://a.example/last.mp4", "/nonexistent", download=downloads)
+    assert last.result(timeout=5)
+    assert downloads.finished == ["http://a.example/last.mp4"]
+    assert scheduler.stats()["queued"] == 0
+
+
+if __name__ == "__main__":
+    test_global_and_per_host_limits()
+    test_tasks_share_workers_fairly()
+    test_limit_adapts_to_failures()
+    test_asset_store_hits_do_not_affect_host_limit()
+    test_cancelled_downloads_do_not_run()
+    print("🎉 下载调度测试通过")
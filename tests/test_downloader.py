@@ -0,0 +1,212 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from downloader import download_file
+from settings.local import DOWNLOAD_CONFIG
+
+
+@contextmanager
+def segmented_download(**options):
+    """临时启用分段下载并覆盖下载配置"""
+    original = dict(DOWNLOAD_CONFIG)
+    DOWNLOAD_CONFIG.update(segmented=True, **options)
+    try:
+        yield
+    finally:
+        DOWNLOAD_CONFIG.clear()
+        DOWNLOAD_CONFIG.update(original)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """支持长连接和Range请求的本地素材服务器
+
+    服务器的truncate集合中的路径第一次请求时只返回一半内容后断开连接；
+    accept_ranges为False时忽略Range请求头；rate不为空时限制每个连接的速度(字节/秒)
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        data = server.files[self.path]
+        server.requests.append((self.path, self.headers.get("Range"), self.client_address[1]))
+        start, end = 0, len(data) - 1
+        if (server.accept_ranges and self.headers.get("Range")
+                and self.headers.get("If-Range", '"v1"') == '"v1"'):
+            first, _, last = self.headers["Range"].split("=")[1].partition("-")
+            start, end = int(first), int(last) if last else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.end_headers()
+        if self.path in server.truncate:
+            server.truncate.discard(self.path)
+            self.wfile.write(data[start:start + (end + 1 - start) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        body = data[start:end + 1]
+        if server.rate is None:
+            self.wfile.write(body)
+            return
+        block = 64 * 1024
+        for offset in range(0, len(body), block):
+            self.wfile.write(body[offset:offset + block])
+            time.sleep(block / server.rate)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_media(files, truncate=(), accept_ranges=True, rate=None):
+    """启动本地素材服务器, 返回(server, base_url), 用完后调用server.shutdown()"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    server.files = files
+    server.truncate = set(truncate)
+    server.accept_ranges = accept_ranges
+    server.rate = rate
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_interrupted_download_resumes():
+    """连接中断后从已下载的位置续传, 完成后原子重命名"""
+    data = os.urandom(200_000)
+    server, base = serve_media({"/clip.mp4": data}, truncate={"/clip.mp4"})
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            target = os.path.join(directory, "assets", "clip.mp4")
+            assert download_file(f"{base}/clip.mp4", target, max_retries=3, timeout=10)
+            with open(target, "rb") as f:
+                assert f.read() == data
+            assert not os.path.exists(f"{target}.part")
+            # 第二次请求从已写入的字节处续传
+            first, second = [request[1] for request in server.requests]
+            assert first is None
+            assert 0 < int(second[len("bytes="):-1]) <= len(data) // 2
+    finally:
+        server.shutdown()
+
+
+def test_failed_download_leaves_no_file():
+    """下载失败时不留下不完整的文件"""
+    with tempfile.TemporaryDirectory() as directory:
+        target = os.path.join(directory, "missing.mp4")
+        assert not download_file("http://127.0.0.1:9/missing.mp4", target, max_retries=1, timeout=2)
+        assert os.listdir(directory) == []
+
+
+def test_connections_are_reused():
+    """连续下载复用同一个连接"""
+    server, base = serve_media({f"/{n}.mp4": b"x" * 1000 for n in range(10)})
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for n in range(10):
+                assert download_file(f"{base}/{n}.mp4", os.path.join(directory, f"{n}.mp4"))
+        assert len({request[2] for request in server.requests}) == 1
+    finally:
+        server.shutdown()
+
+
+def test_segmented_download():
+    """支持Range的大文件按段并行下载到预分配的文件中"""
+    data = os.urandom(1_000_003)
+    server, base = serve_media({"/big.mp4": data})
+    try:
+        with segmented_download(segmented_min_size=1000, min_segment_size=300_000, max_segments=8):
+            with tempfile.TemporaryDirectory() as directory:
+                target = os.path.join(directory, "big.mp4")
+                assert download_file(f"{base}/big.mp4", target)
+                with open(target, "rb") as f:
+                    assert f.read() == data
+                assert os.listdir(directory) == ["big.mp4"]
+        # 一次探测请求加上按文件大小划分的3段
+        ranges = [request[1] for request in server.requests]
+        assert ranges[0] == "bytes=0-0"
+        assert sorted(ranges[1:]) == ["bytes=0-333334", "bytes=333335-666669", "bytes=666670-1000002"]
+    finally:
+        server.shutdown()
+
+
+def test_segmented_download_falls_back():
+    """服务器不支持Range或文件较小时使用单个连接下载"""
+    data = os.urandom(100_000)
+    server, base = serve_media({"/plain.mp4": data, "/small.mp4": data[:10]}, accept_ranges=False)
+    try:
+        with segmented_download(segmented_min_size=1000, min_segment_size=10_000):
+            with tempfile.TemporaryDirectory() as directory:
+                assert download_file(f"{base}/plain.mp4", os.path.join(directory, "plain.mp4"))
+                with open(os.path.join(directory, "plain.mp4"), "rb") as f:
+                    assert f.read() == data
+                server.accept_ranges = True
+                assert download_file(f"{base}/small.mp4", os.path.join(directory, "small.mp4"))
+        # 探测请求之后各自只有一次完整的GET
+        assert [request[1] for request in server.requests] == ["bytes=0-0", None, "bytes=0-0", None]
+    finally:
+        server.shutdown()
+
+
+def benchmark_segmented(size: int = 32 * 1024 * 1024, rate: int = 8 * 1024 * 1024) -> None:
+    """对比单连接限速为rate时单流下载与分段并行下载大文件的耗时"""
+    server, base = serve_media({"/large.mp4": os.urandom(size)}, rate=rate)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            download_file(f"{base}/large.mp4", os.path.join(directory, "single.mp4"))
+            single = time.perf_counter() - started
+            with segmented_download(segmented_min_size=0, min_segment_size=4 * 1024 * 1024, max_segments=8):
+                started = time.perf_counter()
+                download_file(f"{base}/large.mp4", os.path.join(directory, "segmented.mp4"))
+                segmented = time.perf_counter() - started
+        print(f"\n{size // 1024 // 1024}MB文件(单连接{rate // 1024 // 1024}MB/s): 单流 {single:.2f}s, 分段 {segmented:.2f}s")
+    finally:
+        server.shutdown()
+
+
+def benchmark(count: int = 200, size: int = 256 * 1024) -> None:
+    """对比复用连接池与每个文件新建连接下载小文件的吞吐"""
+    server, base = serve_media({f"/{n}.mp4": os.urandom(size) for n in range(count)})
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            for n in range(count):
+                download_file(f"{base}/{n}.mp4", os.path.join(directory, f"pooled_{n}.mp4"))
+            pooled = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for n in range(count):
+                with requests.get(f"{base}/{n}.mp4", stream=True) as response:
+                    with open(os.path.join(directory, f"fresh_{n}.mp4"), "wb") as f:
+                        for chunk in response.iter_content(64 * 1024):
+                            f.write(chunk)
+            fresh = time.perf_counter() - started
+        megabytes = count * size / 1024 / 1024
+        print(f"\n{count}个文件共{megabytes:.0f}MB: 复用连接 {megabytes / pooled:.1f}MB/s, 新建连接 {megabytes / fresh:.1f}MB/s")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_interrupted_download_resumes()
+    test_failed_download_leaves_no_file()
+    test_connections_are_reused()
+    test_segmented_download()
+    test_segmented_download_falls_back()
+    print("🎉 下载器测试通过")
+    benchmark()
+    benchmark_segmented()
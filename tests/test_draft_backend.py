@@ -0,0 +1,154 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import draft_cache
+from draft_backend import DraftBackend, InProcessDraftBackend, SQLiteDraftBackend, VersionConflict
+from create_draft import create_draft
+from add_video_track import add_video_track
+from add_image_impl import add_image_impl
+import save_draft_impl
+
+PROCESSES = 4
+EDITS_PER_PROCESS = 5
+
+
+def test_sqlite_backend_versioning():
+    """存储需基于最新版本，过期版本写入会被拒绝"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteDraftBackend(os.path.join(tmp, "state.db"))
+        assert backend.version("d1") == 0
+        assert backend.store("d1", b"a", 0) == 1
+        assert backend.store("d1", b"b", 1) == 2
+        for stale in (0, 1):
+            try:
+                backend.store("d1", b"c", stale)
+                assert False, "stale version must be rejected"
+            except VersionConflict:
+                pass
+        assert backend.load("d1") == (2, b"b")
+
+
+def _edit_in_worker(db_path, draft_id, worker):
+    # Forked worker: fresh connection and an empty local cache, like a separate server process
+    draft_cache.DRAFT_BACKEND = SQLiteDraftBackend(db_path)
+    draft_cache.BACKEND_MAX_RETRIES = 100
+    draft_cache.DRAFT_CACHE.pop(draft_id)
+    for index in range(EDITS_PER_PROCESS):
+        add_video_track(video_url=f"https://example.com/backend/{worker}_{index}.mp4", draft_id=draft_id,
+                        start=0, end=1, duration=1, target_start=worker * EDITS_PER_PROCESS + index,
+                        track_name="main")
+
+
+def test_backends_implement_every_method():
+    """后端基类为抽象类, 进程内后端不保存任务状态, 任务相关方法均为空操作"""
+    try:
+        DraftBackend()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("抽象后端不应能实例化")
+
+    backend = InProcessDraftBackend()
+    assert backend.claim_task("t1", os.getpid(), {"status": "pending"})
+    assert backend.store_task("t1", {"status": "completed"}) == 0
+    assert backend.load_task("t1") is None
+    assert not backend.request_task_cancel("t1") and not backend.task_cancel_requested("t1")
+    assert not backend.task_abandoned("t1")
+
+
+def test_processes_share_one_draft():
+    """多个进程并发编辑同一草稿，所有修改都应保留"""
+    print("=== 多进程共享草稿测试 ===")
+    original_backend = draft_cache.DRAFT_BACKEND
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "state.db")
+        draft_cache.DRAFT_BACKEND = SQLiteDraftBackend(db_path)
+        try:
+            _, draft_id = create_draft(width=1080, height=1920)
+            context = multiprocessing.get_context("fork")
+            workers = [context.Process(target=_edit_in_worker, args=(db_path, draft_id, worker))
+                       for worker in range(PROCESSES)]
+            for process in workers:
+                process.start()
+            for process in workers:
+                process.join()
+                assert process.exitcode == 0
+
+            draft_cache.sync_draft(draft_id)
+            script = draft_cache.DRAFT_CACHE[draft_id]
+            assert len(script.tracks["main"].segments) == PROCESSES * EDITS_PER_PROCESS
+            assert draft_cache.DRAFT_BACKEND.version(draft_id) == 1 + PROCESSES * EDITS_PER_PROCESS
+            print(f"✅ {PROCESSES} 个进程共写入 {PROCESSES * EDITS_PER_PROCESS} 个片段")
+        finally:
+            draft_cache.DRAFT_BACKEND = original_backend
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """返回一张64x48的PNG图片"""
+
+    def do_GET(self):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 48)).save(buffer, "PNG")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(buffer.getvalue())))
+        self.end_headers()
+        self.wfile.write(buffer.getvalue())
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_save_stores_probed_metadata():
+    """共享后端下保存草稿时读取到的素材元数据会写入后端, 其他进程可见"""
+    original_backend = draft_cache.DRAFT_BACKEND
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        draft_cache.DRAFT_BACKEND = SQLiteDraftBackend(os.path.join(tmp, "state.db"))
+        draft_id = None
+        original_upload = save_draft_impl.IS_UPLOAD_DRAFT
+        # 保存在本地, 不上传OSS
+        save_draft_impl.IS_UPLOAD_DRAFT = False
+        try:
+            image_url = f"http://127.0.0.1:{server.server_address[1]}/{os.urandom(8).hex()}.png"
+            draft_id = add_image_impl(image_url=image_url)["draft_id"]
+            version = draft_cache.DRAFT_BACKEND.version(draft_id)
+            assert save_draft_impl.save_draft_background(draft_id, "C:\\drafts", f"task_{draft_id}")
+
+            assert draft_cache.DRAFT_BACKEND.version(draft_id) == version + 1
+            # 丢弃本地副本, 从后端重新加载, 如同另一个进程读取该草稿
+            draft_cache.DRAFT_CACHE.pop(draft_id)
+            draft_cache.sync_draft(draft_id)
+            photo = draft_cache.DRAFT_CACHE[draft_id].materials.videos[0]
+            assert (photo.width, photo.height) == (64, 48)
+            assert photo.replace_path.startswith("C:\\drafts")
+        finally:
+            draft_cache.DRAFT_BACKEND = original_backend
+            save_draft_impl.IS_UPLOAD_DRAFT = original_upload
+            server.shutdown()
+            if draft_id:
+                shutil.rmtree(draft_id, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_sqlite_backend_versioning()
+    test_backends_implement_every_method()
+    test_processes_share_one_draft()
+    test_save_stores_probed_metadata()
+    print("\n🎉 草稿后端测试全部通过")
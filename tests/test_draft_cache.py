@@ -0,0 +1,172 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+import subprocess
+
+import pyJianYingDraft as draft
+from pyJianYingDraft import Track_type, Keyframe_property
+from draft_cache import TieredDraftCache, ShardedDraftCache, process_spill_dir
+
+
+def _cache(spill_dir: str, max_size: int = 2, idle_seconds: float = 0) -> TieredDraftCache:
+    return TieredDraftCache(max_size=max_size, spill_dir=spill_dir, idle_seconds=idle_seconds, max_disk_drafts=100)
+
+
+def _draft(width: int) -> draft.Script_file:
+    return draft.Script_file(width, 1080)
+
+
+def test_retained_size_counts_changes_after_insertion():
+    """片段加入轨道后添加的关键帧同样计入估算大小, 未修改时重复读取不重新估算"""
+    script = draft.Script_file(1080, 1920)
+    script.add_track(Track_type.text, "text")
+    segment = draft.Text_segment("hello", draft.Timerange(0, 1_000_000))
+    script.add_segment(segment, "text")
+    inserted = script.retained_size
+
+    for index in range(100):
+        segment.add_keyframe(Keyframe_property.alpha, index * 1000, 0.5)
+    grown = script.retained_size
+    assert grown > inserted
+    assert script.tracks["text"]._size_cache == grown - script._base_retained_size
+    assert script.retained_size == grown
+
+
+def test_byte_budget_evicts_least_recently_used():
+    """估算大小超出字节预算时按最近最少使用顺序落盘, 正在写入的草稿即使单独超出预算也保留在内存中"""
+    size = _draft(100).retained_size
+    with tempfile.TemporaryDirectory() as spill_dir:
+        cache = TieredDraftCache(max_size=100, spill_dir=spill_dir, idle_seconds=0, max_disk_drafts=100,
+                                 max_bytes=size * 2 + size // 2)
+        cache.put("a", _draft(100))
+        cache.put("b", _draft(200))
+        cache.put("a", cache["a"])
+        cache.put("c", _draft(300))
+        assert list(cache) == ["a", "c"] and "b" in cache
+
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["bytes"] == size * 2
+        assert stats["max_entries"] == 100 and stats["max_bytes"] == size * 2 + size // 2
+        assert stats["spilled_entries"] == 1 and stats["evictions"] == 1
+
+        cache.max_bytes = size // 2
+        cache.put("d", _draft(400))
+        assert list(cache) == ["d"] and cache.stats()["bytes"] == size
+
+
+def test_stats_follow_growth_and_aggregate_shards():
+    """统计中的字节数随草稿原地增长更新, 分片缓存汇总各分片的统计"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        cache = ShardedDraftCache(shards=4, max_size=100, spill_dir=spill_dir, idle_seconds=0, max_disk_drafts=100)
+        script = draft.Script_file(1080, 1920)
+        script.add_track(Track_type.text, "text")
+        segment = draft.Text_segment("hello", draft.Timerange(0, 1_000_000))
+        script.add_segment(segment, "text")
+        for index in range(8):
+            cache.put(f"d{index}", _draft(100))
+        cache.put("grown", script)
+        inserted = script.retained_size
+        before = cache.stats()
+        assert before["shards"] == 4 and before["entries"] == 9
+        assert before["bytes"] == sum(shard.stats()["bytes"] for shard in cache.shards)
+
+        for index in range(100):
+            segment.add_keyframe(Keyframe_property.alpha, index * 1000, 0.5)
+        assert cache.stats()["bytes"] - before["bytes"] == script.retained_size - inserted > 0
+
+
+def test_evicted_drafts_spill_and_rehydrate():
+    """超出条数上限的草稿写入磁盘, 再次访问时从磁盘加载回内存并删除磁盘副本"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        cache = _cache(spill_dir)
+        for index in range(3):
+            cache.put(f"d{index}", _draft(100 + index))
+        assert list(cache) == ["d1", "d2"] and "d0" in cache
+        assert os.path.exists(os.path.join(spill_dir, "d0.draft"))
+
+        assert cache.get("d0").width == 100
+        assert not os.path.exists(os.path.join(spill_dir, "d0.draft"))
+        stats = cache.stats()
+        assert stats["rehydrations"] == 1 and stats["evictions"] == 2
+        # 加载回内存又挤出了d1
+        assert stats["spilled_entries"] == 1 and "d1" not in list(cache)
+
+
+def test_idle_drafts_spill():
+    """超过idle_seconds未访问的草稿写入磁盘, 访问时仍能取回"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        cache = _cache(spill_dir, max_size=10, idle_seconds=60)
+        cache.put("idle", _draft(100))
+        cache.put("busy", _draft(200))
+        cache._last_access["idle"] -= 120
+
+        assert cache.spill_idle() == 1
+        assert list(cache) == ["busy"] and cache.stats()["idle_spills"] == 1
+        assert cache["idle"].width == 100
+
+
+def test_pop_deletes_spilled_draft_without_loading():
+    """删除已落盘的草稿时直接删除磁盘文件, 不加载到内存"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        cache = _cache(spill_dir, max_size=1)
+        cache.put("old", _draft(100))
+        cache.put("new", _draft(200))
+        assert cache.pop("old", "missing") == "missing"
+        assert "old" not in cache and not os.path.exists(os.path.join(spill_dir, "old.draft"))
+        assert cache.stats()["rehydrations"] == 0
+        assert cache.pop("new").width == 200 and len(cache) == 0
+
+
+def test_spilled_drafts_survive_restart():
+    """关闭时写入磁盘的草稿在同一目录上新建的缓存实例中可以取回"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        cache = _cache(spill_dir)
+        cache.put("a", _draft(100))
+        cache.put("b", _draft(200))
+        cache.flush()
+
+        restarted = _cache(spill_dir)
+        assert len(restarted) == 0 and "a" in restarted and "b" in restarted
+        assert restarted["b"].width == 200 and restarted["a"].width == 100
+
+
+def test_process_spill_dir_adopts_drafts_of_exited_processes():
+    """每个进程使用自己的落盘子目录, 已退出进程及旧版本直接存放的草稿被接管, 仍在运行的进程的草稿不受影响"""
+    with tempfile.TemporaryDirectory() as spill_root:
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        running = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        try:
+            for directory, name in ((str(exited.pid), "orphan"), (str(running.pid), "foreign"), ("", "legacy")):
+                cache = _cache(os.path.join(spill_root, directory))
+                cache.put(name, _draft(100))
+                cache.flush()
+
+            own_dir = process_spill_dir(spill_root)
+            assert own_dir == os.path.join(spill_root, str(os.getpid()))
+            assert not os.path.exists(os.path.join(spill_root, str(exited.pid)))
+            assert os.path.exists(os.path.join(spill_root, str(running.pid), "foreign.draft"))
+            cache = _cache(own_dir)
+            assert "orphan" in cache and "legacy" in cache and "foreign" not in cache
+            assert cache["orphan"].width == 100
+        finally:
+            running.kill()
+            running.wait()
+        assert process_spill_dir("") == ""
+
+
+if __name__ == "__main__":
+    test_retained_size_counts_changes_after_insertion()
+    test_byte_budget_evicts_least_recently_used()
+    test_stats_follow_growth_and_aggregate_shards()
+    test_evicted_drafts_spill_and_rehydrate()
+    test_idle_drafts_spill()
+    test_pop_deletes_spilled_draft_without_loading()
+    test_spilled_drafts_survive_restart()
+    test_process_spill_dir_adopts_drafts_of_exited_processes()
+    print("🎉 草稿缓存测试通过")
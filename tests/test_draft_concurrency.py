@@ -0,0 +1,104 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pyJianYingDraft as draft
+from create_draft import create_draft
+from add_video_track import add_video_track
+from draft_cache import DRAFT_CACHE, draft_lock
+from save_task_cache import create_task, increment_task_field, get_task_status
+
+VIDEO_URL = "https://example.com/concurrency/{}.mp4"
+WORKERS = 16
+
+
+def _video_segments(draft_id, track_name="main"):
+    script = DRAFT_CACHE[draft_id]
+    track = script.tracks[track_name]
+    return sorted(track.segments, key=lambda seg: seg.target_timerange.start)
+
+
+def test_concurrent_edits_of_one_draft():
+    """16个线程同时向同一草稿写入，两两争抢同一时间位置，每个位置只能有一个片段成功"""
+    print("=== 同一草稿并发编辑测试 ===")
+    _, draft_id = create_draft(width=1080, height=1920)
+    add_video_track(video_url=VIDEO_URL.format("base"), draft_id=draft_id, start=0, end=1,
+                    duration=1, target_start=100, track_name="main")
+
+    barrier = threading.Barrier(WORKERS)
+
+    def worker(index):
+        barrier.wait()
+        slot = index // 2
+        try:
+            add_video_track(video_url=VIDEO_URL.format(index), draft_id=draft_id, start=0, end=2,
+                            duration=2, target_start=slot * 3, track_name="main")
+            return True
+        except draft.exceptions.SegmentOverlap:
+            return False
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        results = list(pool.map(worker, range(WORKERS)))
+
+    segments = _video_segments(draft_id)
+    assert results.count(True) == WORKERS // 2
+    assert len(segments) == WORKERS // 2 + 1
+    for previous, current in zip(segments, segments[1:]):
+        assert previous.end <= current.start
+    print(f"✅ {len(segments)} 个片段，无重叠")
+
+
+def test_concurrent_edits_of_many_drafts():
+    """多个草稿并发编辑互不干扰"""
+    print("=== 多草稿并发编辑测试 ===")
+    draft_ids = [create_draft(width=1080, height=1920)[1] for _ in range(WORKERS)]
+    per_draft = 5
+
+    def worker(draft_id):
+        for index in range(per_draft):
+            add_video_track(video_url=VIDEO_URL.format(f"{draft_id}_{index}"), draft_id=draft_id,
+                            start=0, end=1, duration=1, target_start=index, track_name="main")
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        list(pool.map(worker, draft_ids))
+
+    for draft_id in draft_ids:
+        assert len(_video_segments(draft_id)) == per_draft
+    print(f"✅ {len(draft_ids)} 个草稿各 {per_draft} 个片段")
+
+
+def test_draft_lock_is_reentrant():
+    """同一线程可重复获取草稿锁"""
+    with draft_lock("reentrant_draft"):
+        with draft_lock("reentrant_draft"):
+            pass
+
+
+def test_concurrent_task_updates():
+    """并发递增任务字段不丢失更新"""
+    task_id = "concurrency_task"
+    create_task(task_id)
+    increments = 200
+
+    def worker(_):
+        for _ in range(increments):
+            increment_task_field(task_id, "completed_files")
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        list(pool.map(worker, range(WORKERS)))
+
+    assert get_task_status(task_id)["completed_files"] == WORKERS * increments
+
+
+if __name__ == "__main__":
+    test_concurrent_edits_of_one_draft()
+    test_concurrent_edits_of_many_drafts()
+    test_draft_lock_is_reentrant()
+    test_concurrent_task_updates()
+    print("\n🎉 并发测试全部通过")
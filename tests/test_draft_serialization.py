@@ -0,0 +1,101 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import importlib
+
+import pyJianYingDraft as draft
+from pyJianYingDraft import Track_type
+from pyJianYingDraft.util import encode_json, JSON_ENCODERS
+from save_draft_impl import _fix_platform_info
+
+
+def _large_script(segment_count: int):
+    script = draft.Script_file(1080, 1920)
+    script.add_track(Track_type.video, "main")
+    material = draft.Video_material(material_type="photo", remote_url="https://example.com/图片.png",
+                                    material_name="图片.png", width=100, height=100, duration=10_000_000)
+    for index in range(segment_count):
+        script.add_segment(draft.Video_segment(material, draft.Timerange(index * 1_000_000, 1_000_000)), "main")
+    return script
+
+
+def _installed_encoders():
+    encoders = []
+    for name in JSON_ENCODERS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        encoders.append(name)
+    return encoders
+
+
+def test_encoders_produce_same_content():
+    """各编码库写出的紧凑JSON与缩进JSON内容一致, 且非ASCII字符不转义"""
+    content = _large_script(20).export_content()
+    expected = json.loads(json.dumps(content, ensure_ascii=False, indent=4))
+    for encoder in _installed_encoders():
+        data = encode_json(content, encoder=encoder)
+        assert b"\n" not in data
+        assert "图片".encode("utf-8") in data
+        assert json.loads(data) == expected
+    assert len(encode_json(content)) < len(encode_json(content, indent=4))
+
+
+def test_unknown_encoder_rejected():
+    """不支持的编码库报错"""
+    try:
+        encode_json({}, encoder="simplejson2")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知编码库应抛出ValueError")
+
+
+def test_platform_fix_does_not_touch_script():
+    """修正平台信息只修改本次导出的内容"""
+    script = _large_script(1)
+    content = script.export_content()
+    _fix_platform_info(content)
+    assert content["platform"]["os"] == "windows"
+    assert content["last_modified_platform"]["os"] == "windows"
+    assert content["platform"]["device_id"] != content["last_modified_platform"]["device_id"]
+    assert script.export_content().get("platform", {}).get("os_version") != "10.0.19045"
+
+
+def benchmark(segment_count: int = 5000) -> None:
+    """对比旧的保存方式(两次缩进导出, 读回修正后重写)与单次紧凑导出的耗时和写出字节数"""
+    script = _large_script(segment_count)
+
+    started = time.perf_counter()
+    old_bytes = 0
+    for _ in range(2):
+        text = script.dumps()
+        data = json.loads(text)
+        _fix_platform_info(data)
+        old_bytes += len(json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8"))
+    old_bytes += len(text.encode("utf-8"))  # .bak
+    old_time = time.perf_counter() - started
+
+    for encoder in _installed_encoders():
+        started = time.perf_counter()
+        content = script.export_content()
+        _fix_platform_info(content)
+        new_bytes = len(encode_json(content, encoder=encoder)) * 3
+        new_time = time.perf_counter() - started
+        print(f"{segment_count}个片段 {encoder}: {old_time * 1000:.0f}ms/{old_bytes}字节 -> "
+              f"{new_time * 1000:.0f}ms/{new_bytes}字节")
+
+
+if __name__ == "__main__":
+    test_encoders_produce_same_content()
+    test_unknown_encoder_rejected()
+    test_platform_fix_does_not_touch_script()
+    print("🎉 草稿序列化测试通过")
+    benchmark()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import time
+import uuid
+import shutil
+import zipfile
+import tempfile
+
+from util import stream_draft_zip, write_draft_zip
+from save_task_cache import create_task, update_task_fields
+
+
+def _make_draft(directory: str, video_size: int = 3 * 1024 * 1024) -> dict:
+    files = {
+        "draft_info.json": b'{"tracks": []}' * 1000,
+        "assets/video/clip.mp4": os.urandom(video_size),
+        "assets/audio/voice.MP3": os.urandom(1000),
+        "assets/image/cover.png": os.urandom(1000),
+    }
+    for name, data in files.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    return files
+
+
+def _check_archive(data: bytes, files: dict) -> None:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == sorted(files)
+        for name, content in files.items():
+            assert archive.read(name) == content
+            expected = zipfile.ZIP_DEFLATED if name.endswith(".json") else zipfile.ZIP_STORED
+            assert archive.getinfo(name).compress_type == expected, name
+
+
+def test_streamed_archive_stores_media_and_deflates_json():
+    """流式生成的压缩包可正常解压, 媒体文件不压缩, JSON使用DEFLATE"""
+    with tempfile.TemporaryDirectory() as directory:
+        files = _make_draft(directory)
+        chunks = list(stream_draft_zip(directory, chunk_size=64 * 1024))
+        # 每次产出的数据量不超过读取块大小加上文件头
+        assert max(len(chunk) for chunk in chunks) < 64 * 1024 + 1024
+        _check_archive(b"".join(chunks), files)
+
+        buffer = io.BytesIO()
+        write_draft_zip(directory, buffer)
+        _check_archive(buffer.getvalue(), files)
+
+
+def test_download_endpoint_streams_saved_folder():
+    """本地模式的下载接口直接从草稿目录流式返回压缩包"""
+    from capcut_server import app
+
+    draft_id = f"dfd_cat_zip_{uuid.uuid4().hex[:8]}"
+    os.makedirs(draft_id)
+    try:
+        files = _make_draft(draft_id, video_size=100_000)
+        create_task(draft_id)
+        update_task_fields(draft_id, status="processing")
+        client = app.test_client()
+        assert client.get(f"/draft/downloader?draft_id={draft_id}").status_code == 409
+
+        update_task_fields(draft_id, status="completed")
+        response = client.get(f"/draft/downloader?draft_id={draft_id}")
+        assert response.status_code == 200
+        assert response.mimetype == "application/zip"
+        assert response.is_streamed
+        _check_archive(response.get_data(), files)
+
+        assert client.get("/draft/downloader?draft_id=../etc").status_code == 400
+    finally:
+        shutil.rmtree(draft_id, ignore_errors=True)
+
+
+def benchmark(video_size: int = 200 * 1024 * 1024) -> None:
+    """对比全部DEFLATE与按类型选择压缩方式打包大视频草稿的耗时"""
+    with tempfile.TemporaryDirectory() as directory:
+        _make_draft(directory, video_size=video_size)
+        started = time.perf_counter()
+        with zipfile.ZipFile(os.path.join(directory, "..", "deflate.zip"), "w", zipfile.ZIP_DEFLATED) as zipf:
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    zipf.write(os.path.join(root, name), os.path.relpath(os.path.join(root, name), directory))
+        deflated = time.perf_counter() - started
+        os.remove(os.path.join(directory, "..", "deflate.zip"))
+
+        started = time.perf_counter()
+        size = sum(len(chunk) for chunk in stream_draft_zip(directory))
+        streamed = time.perf_counter() - started
+    print(f"\n{video_size // 1024 // 1024}MB草稿: 全部DEFLATE {deflated:.2f}s, 流式(媒体不压缩) {streamed:.2f}s, 压缩包 {size // 1024 // 1024}MB")
+
+
+if __name__ == "__main__":
+    test_streamed_archive_stores_media_and_deflates_json()
+    test_download_endpoint_streams_saved_folder()
+    print("🎉 草稿压缩包测试通过")
+    benchmark()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import pyJianYingDraft as draft
+from pyJianYingDraft.metadata import lookup_effect
+from add_effect_impl import add_effect_impl
+from settings import IS_CAPCUT_ENV
+
+
+def test_from_name_ignores_case_spaces_and_underscores():
+    """按名称查找时忽略大小写、空格和下划线, 找不到时给出前缀匹配及拼写相近的名称"""
+    assert draft.CapCut_Mask_type.from_name("rectangle") is draft.CapCut_Mask_type.Rectangle
+    assert draft.CapCut_Transition_type.from_name("dissolve ii") is draft.CapCut_Transition_type.Dissolve_II
+    assert draft.Mask_type.from_name("矩形") is draft.Mask_type.矩形
+
+    assert draft.CapCut_Transition_type.suggest("dissolve", 3) == ["Dissolve", "Dissolve_1", "Dissolve_II"]
+    try:
+        draft.CapCut_Mask_type.from_name("Rectangel")
+    except ValueError as e:
+        assert "did you mean: Rectangle" in str(e)
+    else:
+        raise AssertionError("未知名称应抛出ValueError")
+
+
+def test_lookup_effect_searches_families_in_order():
+    """在多个枚举中依次查找, 都找不到时合并各枚举的建议"""
+    scene, character = draft.Video_scene_effect_type, draft.Video_character_effect_type
+    scene_name = next(iter(scene.__members__))
+    character_name = next(name for name in character.__members__ if name not in scene.__members__)
+    assert lookup_effect(scene_name, scene, character) is scene[scene_name]
+    assert lookup_effect(character_name, scene, character) is character[character_name]
+
+    try:
+        lookup_effect(character_name + "x", scene, character)
+    except ValueError as e:
+        assert character_name in str(e)
+    else:
+        raise AssertionError("未知名称应抛出ValueError")
+
+
+def test_add_effect_falls_back_to_character_effects():
+    """添加特效时场景特效中没有的名称会在人物特效中查找"""
+    character = draft.CapCut_Video_character_effect_type if IS_CAPCUT_ENV else draft.Video_character_effect_type
+    scene = draft.CapCut_Video_scene_effect_type if IS_CAPCUT_ENV else draft.Video_scene_effect_type
+    name = next(name for name in character.__members__ if name not in scene.__members__)
+    assert add_effect_impl(effect_type=name.lower(), params=[])["draft_id"]
+
+
+def benchmark(lookups: int = 2000) -> None:
+    """对比逐个比较成员名与使用名称索引查找的耗时"""
+    enum_cls = draft.Video_scene_effect_type
+    names = list(enum_cls.__members__)[-50:]
+
+    def linear(name):
+        name = name.lower().replace(" ", "").replace("_", "")
+        for effect in enum_cls:
+            if effect.name.lower().replace(" ", "").replace("_", "") == name:
+                return effect
+
+    started = time.perf_counter()
+    for index in range(lookups):
+        linear(names[index % len(names)])
+    scanned = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for index in range(lookups):
+        enum_cls.from_name(names[index % len(names)])
+    indexed = time.perf_counter() - started
+    print(f"\n{lookups}次特效名称查找({len(enum_cls.__members__)}个成员): 逐个比较 {scanned:.3f}s, 名称索引 {indexed:.3f}s")
+
+
+if __name__ == "__main__":
+    test_from_name_ignores_case_spaces_and_underscores()
+    test_lookup_effect_searches_families_in_order()
+    test_add_effect_falls_back_to_character_effects()
+    print("🎉 特效名称查找测试通过")
+    benchmark()
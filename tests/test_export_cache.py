@@ -0,0 +1,81 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy
+import json
+import pickle
+
+import pyJianYingDraft as draft
+from pyJianYingDraft import Track_type, Clip_settings, Keyframe_property
+
+
+def _script_with_segments(count: int = 3):
+    script = draft.Script_file(1080, 1920)
+    script.add_track(Track_type.video, "main")
+    material = draft.Video_material(material_type="photo", remote_url="https://example.com/a.png", material_name="a.png",
+                                    width=100, height=100, duration=10_000_000)
+    segments = []
+    for index in range(count):
+        segment = draft.Video_segment(material, draft.Timerange(index * 1_000_000, 1_000_000),
+                                      clip_settings=Clip_settings())
+        script.add_segment(segment, "main")
+        segments.append(segment)
+    return script, segments
+
+
+def test_unchanged_segments_reuse_export():
+    """未修改的片段复用上次导出结果, 修改后只重新导出该片段"""
+    script, segments = _script_with_segments()
+    script.dumps()
+    first, second = segments[0].cached_export(), segments[1].cached_export()
+
+    segments[1].volume = 0.5
+    content = json.loads(script.dumps())
+    assert segments[0].cached_export() is first
+    assert segments[1].cached_export() is not second
+    assert content["tracks"][0]["segments"][1]["volume"] == 0.5
+
+
+def test_nested_changes_invalidate_owners():
+    """修改时间范围、图像调节设置或关键帧时所属片段和轨道的导出结果同步更新"""
+    script, segments = _script_with_segments()
+    script.dumps()
+
+    segments[0].target_timerange.duration = 500_000
+    segments[1].clip_settings.transform_x = 0.25
+    segments[2].add_keyframe(Keyframe_property.alpha, 0, 0.5)
+    exported = json.loads(script.dumps())["tracks"][0]["segments"]
+    assert exported[0]["target_timerange"]["duration"] == 500_000
+    assert exported[1]["clip"]["transform"]["x"] == 0.25
+    assert exported[2]["common_keyframes"][0]["keyframe_list"][0]["values"] == [0.5]
+
+    segments[2].common_keyframes[0].add_keyframe(1_000, 0.8)
+    exported = json.loads(script.dumps())["tracks"][0]["segments"]
+    assert len(exported[2]["common_keyframes"][0]["keyframe_list"]) == 2
+
+    script.tracks["main"].segments.pop(0)
+    assert len(json.loads(script.dumps())["tracks"][0]["segments"]) == 2
+
+
+def test_tracking_survives_copy_and_pickle():
+    """深拷贝和pickle后的草稿仍能感知修改"""
+    script, _ = _script_with_segments()
+    script.dumps()
+    for restored in (copy.deepcopy(script), pickle.loads(pickle.dumps(script))):
+        restored.dumps()
+        restored.tracks["main"].segments[0].target_timerange.start = 42
+        exported = json.loads(restored.dumps())["tracks"][0]["segments"]
+        assert exported[0]["target_timerange"]["start"] == 42
+    # 原草稿不受影响
+    assert json.loads(script.dumps())["tracks"][0]["segments"][0]["target_timerange"]["start"] == 0
+
+
+if __name__ == "__main__":
+    test_unchanged_segments_reuse_export()
+    test_nested_changes_invalidate_owners()
+    test_tracking_survives_copy_and_pickle()
+    print("🎉 导出缓存测试通过")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from PIL import Image
+
+from media_probe import read_image_size, probe_image_size, IMAGE_HEADER_BYTES
+
+
+def _encode(fmt: str, size=(50, 30), mode="RGB", **options) -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def test_read_size_of_supported_formats():
+    """从文件头读取PNG、JPEG、GIF、WebP、BMP的宽高"""
+    samples = {
+        "png": _encode("PNG"),
+        "jpeg": _encode("JPEG"),
+        "jpeg_exif": _encode("JPEG", exif=b"Exif\x00\x00" + b"\x00" * 4096),
+        "gif": _encode("GIF"),
+        "bmp": _encode("BMP"),
+        "webp_lossy": _encode("WEBP"),
+        "webp_lossless": _encode("WEBP", mode="RGBA", lossless=True),
+    }
+    for name, data in samples.items():
+        assert read_image_size(data) == (50, 30), name
+    assert read_image_size(b"not an image") is None
+    assert read_image_size(_encode("PNG")[:20]) is None
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """返回服务器的image数据, 支持Range请求并记录请求头"""
+
+    def do_GET(self):
+        data = self.server.image
+        self.server.ranges.append(self.headers.get("Range"))
+        if self.headers.get("Range"):
+            end = int(self.headers["Range"].split("-")[1])
+            data = data[:end + 1]
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_remote_image_uses_range_request():
+    """远程图片只请求文件头部分"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    # 体积远大于读取上限的PNG
+    server.image = _encode("PNG", size=(3000, 2000), mode="RGB", compress_level=0)
+    server.ranges = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert len(server.image) > IMAGE_HEADER_BYTES
+        url = f"http://127.0.0.1:{server.server_address[1]}/big.png"
+        assert probe_image_size(url, timeout=5) == {"width": 3000, "height": 2000}
+        assert server.ranges == [f"bytes=0-{IMAGE_HEADER_BYTES - 1}"]
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_read_size_of_supported_formats()
+    test_remote_image_uses_range_request()
+    print("🎉 图片文件头测试通过")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import uuid
+import tempfile
+import threading
+from types import SimpleNamespace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import media_probe
+from media_probe import ProbeCache, probe_media, probe_image_size, first_stream, media_duration
+from get_duration_impl import get_video_duration
+import pyJianYingDraft as draft
+from save_draft_impl import _run_probes, update_media_metadata
+from settings.local import MEDIA_PROBE_CONFIG
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    """只响应HEAD请求, ETag取自服务器的etag属性, 支持If-None-Match"""
+
+    def do_HEAD(self):
+        etag = self.server.etag
+        self.server.head_requests += 1
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+        else:
+            self.send_response(200)
+            self.send_header("ETag", etag)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server(etag: str = '"v1"'):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MediaHandler)
+    server.etag = etag
+    server.head_requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+
+
+def _counting_probe(calls, value):
+    def probe():
+        calls.append(value)
+        return value
+    return probe
+
+
+def test_hits_and_queries():
+    """同一素材同一查询只探测一次, 不同查询分别缓存"""
+    server, url = _start_server()
+    cache = ProbeCache(max_entries=10, ttl_seconds=3600)
+    calls = []
+    assert cache.get(url, "duration", _counting_probe(calls, 1.5)) == 1.5
+    assert cache.get(url, "duration", _counting_probe(calls, 9.9)) == 1.5
+    assert cache.get(url, "size", _counting_probe(calls, [1920, 1080])) == [1920, 1080]
+    assert calls == [1.5, [1920, 1080]]
+    assert cache.stats()["hits"] == 1
+    server.shutdown()
+
+
+def test_revalidation_with_etag():
+    """过期条目通过ETag校验, 未变化时复用结果, 变化后重新探测"""
+    server, url = _start_server()
+    cache = ProbeCache(max_entries=10, ttl_seconds=0)
+    calls = []
+    cache.get(url, "duration", _counting_probe(calls, 1.0))
+    assert cache.get(url, "duration", _counting_probe(calls, 2.0)) == 1.0
+    assert cache.stats()["revalidations"] == 1
+
+    server.etag = '"v2"'
+    assert cache.get(url, "duration", _counting_probe(calls, 2.0)) == 2.0
+    assert calls == [1.0, 2.0]
+    assert cache.stats()["invalidations"] == 1
+    server.shutdown()
+
+
+def test_disk_tier_and_lru_bound():
+    """落盘的结果在新实例中可用, 内存条目数不超过上限"""
+    server, url = _start_server()
+    with tempfile.TemporaryDirectory() as disk_dir:
+        cache = ProbeCache(max_entries=2, ttl_seconds=3600, disk_dir=disk_dir)
+        calls = []
+        for index in range(3):
+            cache.get(f"{url}?n={index}", "duration", _counting_probe(calls, index))
+        assert cache.stats()["memory_entries"] == 2
+        assert cache.stats()["disk_entries"] == 3
+
+        restarted = ProbeCache(max_entries=2, ttl_seconds=3600, disk_dir=disk_dir)
+        assert restarted.get(f"{url}?n=0", "duration", _counting_probe(calls, -1)) == 0
+        assert calls == [0, 1, 2]
+    server.shutdown()
+
+
+def test_local_file_change_invalidates():
+    """本地文件被修改后重新探测"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "clip.mp4")
+        with open(path, "wb") as f:
+            f.write(b"a")
+        cache = ProbeCache(max_entries=10, ttl_seconds=3600)
+        calls = []
+        cache.get(path, "duration", _counting_probe(calls, 1))
+        assert cache.get(path, "duration", _counting_probe(calls, 2)) == 1
+        with open(path, "wb") as f:
+            f.write(b"changed")
+        assert cache.get(path, "duration", _counting_probe(calls, 2)) == 2
+
+
+def test_probes_run_concurrently_within_deadline():
+    """素材并发探测, 超过总时限的探测被放弃"""
+    def sleepy_probe(remote_url, timeout, local_path=None):
+        time.sleep(float(remote_url))
+        return {"slept": float(remote_url)}
+
+    original = dict(MEDIA_PROBE_CONFIG)
+    MEDIA_PROBE_CONFIG.update(workers=8, deadline_seconds=1.5)
+    try:
+        materials = [SimpleNamespace(remote_url=str(delay), material_name=f"m{index}")
+                     for index, delay in enumerate([0.5, 0.5, 0.5, 0.5, 5])]
+        started = time.time()
+        results = _run_probes([(material, sleepy_probe) for material in materials])
+        assert time.time() - started < 3
+        assert [id(material) in results for material in materials] == [True, True, True, True, False]
+    finally:
+        MEDIA_PROBE_CONFIG.clear()
+        MEDIA_PROBE_CONFIG.update(original)
+
+
+def test_single_ffprobe_per_media():
+    """素材构造、时长查询共用一次ffprobe的结果"""
+    calls = []
+
+    def fake_ffprobe(media_path, args, timeout=None):
+        calls.append(media_path)
+        return {
+            "streams": [{"codec_type": "audio", "duration": "12.5"}],
+            "format": {"format_name": "mp3", "duration": "12.6"}
+        }
+
+    original = media_probe.run_ffprobe
+    media_probe.run_ffprobe = fake_ffprobe
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "voice.mp3")
+            with open(path, "wb") as f:
+                f.write(b"id3")
+            audio = draft.Audio_material(path=path)
+            assert audio.duration == 12_500_000
+            assert get_video_duration(path)["output"] == 12.5
+            info = probe_media(path)
+            assert first_stream(info, "video") is None
+            assert media_duration(info, "video") == 12.6
+            assert calls == [path]
+    finally:
+        media_probe.run_ffprobe = original
+
+
+def test_metadata_read_from_downloaded_files():
+    """已下载的素材从本地文件读取元数据, 结果仍按URL缓存"""
+    from PIL import Image
+
+    # 服务器只响应HEAD, 任何GET请求都会失败并退回默认尺寸
+    server, url = _start_server()
+    url = f"{url}?v={uuid.uuid4().hex}"
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "a.png")
+            Image.new("RGB", (64, 48)).save(path)
+            script = draft.Script_file(1080, 1920)
+            photo = draft.Video_material(material_type="photo", remote_url=url, material_name="a.png",
+                                         width=1, height=1, duration=10_000_000)
+            script.add_material(photo)
+            update_media_metadata(script, local_paths={id(photo): path})
+            assert (photo.width, photo.height) == (64, 48)
+            # 探测本地副本时不再向服务器发送HEAD请求
+            assert server.head_requests == 0
+        # 本地文件已删除, 再次查询命中URL的缓存
+        assert probe_image_size(url) == {"width": 64, "height": 48}
+    finally:
+        media_probe.PROBE_CACHE.invalidate(url)
+        server.shutdown()
+
+
+def test_known_validator_skips_head_request():
+    """调用方提供下载时记录的ETag时不发送HEAD请求, 过期后用该ETag重新验证"""
+    server, url = _start_server()
+    try:
+        cache = ProbeCache(max_entries=10, ttl_seconds=0)
+        calls = []
+        assert cache.get(url, "duration", _counting_probe(calls, 1), validator={"etag": '"v1"'}) == 1
+        assert server.head_requests == 0
+        assert cache.get(url, "duration", _counting_probe(calls, 2)) == 1
+        assert server.head_requests == 1 and calls == [1]
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_hits_and_queries()
+    test_revalidation_with_etag()
+    test_disk_tier_and_lru_bound()
+    test_local_file_change_invalidates()
+    test_probes_run_concurrently_within_deadline()
+    test_single_ffprobe_per_media()
+    test_metadata_read_from_downloaded_files()
+    test_known_validator_skips_head_request()
+    print("🎉 媒体探测缓存测试通过")
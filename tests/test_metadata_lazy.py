@@ -0,0 +1,73 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import subprocess
+
+import pyJianYingDraft as draft
+from pyJianYingDraft.animation import Video_animation, Text_animation
+from pyJianYingDraft.audio_segment import Audio_effect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+loaded = sorted(m for m in sys.modules if m.startswith("pyJianYingDraft.metadata."))
+{access}
+after = sorted(m for m in sys.modules if m.startswith("pyJianYingDraft.metadata."))
+print(json.dumps({{"loaded": loaded, "after": after, "elapsed": elapsed}}))
+"""
+
+
+def _probe(module: str, access: str = "") -> dict:
+    """在新的解释器中导入模块, 返回导入后及执行access后已加载的元数据模块"""
+    output = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, access=access)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_metadata_loaded_on_first_use():
+    """导入服务时不加载特效/动画等元数据, 首次访问某个枚举时只加载其所在模块"""
+    probe = _probe("capcut_server", "import pyJianYingDraft as draft; draft.CapCut_Transition_type.Dissolve")
+    assert probe["loaded"] == ["pyJianYingDraft.metadata.capcut_mask_meta", "pyJianYingDraft.metadata.effect_meta",
+                               "pyJianYingDraft.metadata.mask_meta"]
+    assert set(probe["after"]) - set(probe["loaded"]) == {"pyJianYingDraft.metadata.capcut_transition_meta"}
+
+
+def test_lazy_types_behave_like_eager_imports():
+    """按需加载的枚举与直接从子模块导入的是同一对象, 类型判断不受影响"""
+    from pyJianYingDraft.metadata.animation_meta import Intro_type
+    from pyJianYingDraft.metadata.capcut_text_animation_meta import CapCut_Text_outro
+    assert draft.Intro_type is Intro_type and draft.metadata.Intro_type is Intro_type
+    assert "Font_type" in dir(draft.metadata)
+
+    assert Video_animation(Intro_type.渐显, 0, 500000).animation_type == "in"
+    assert Text_animation(CapCut_Text_outro.Fade_Out, 0, 500000).animation_type == "out"
+    assert Audio_effect(draft.Tone_effect_type.花栗鼠).category_id == "tone"
+    try:
+        draft.No_such_type
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("未知名称应抛出AttributeError")
+
+
+def benchmark() -> None:
+    """对比按需加载与加载全部元数据时导入服务的耗时"""
+    lazy = _probe("capcut_server")["elapsed"]
+    eager = _probe("capcut_server; from pyJianYingDraft import *")["elapsed"]
+    print(f"\n导入capcut_server: 按需加载元数据 {lazy:.3f}s, 加载全部元数据 {eager:.3f}s")
+
+
+if __name__ == "__main__":
+    test_metadata_loaded_on_first_use()
+    test_lazy_types_behave_like_eager_imports()
+    print("🎉 元数据按需加载测试通过")
+    benchmark()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+from xml.etree import ElementTree
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import oss2
+
+import oss
+from settings.local import OSS_CONFIG, OSS_UPLOAD_CONFIG
+
+
+class _OssHandler(BaseHTTPRequestHandler):
+    """本地OSS替身: 支持简单上传和分片上传(初始化、上传分片、列出分片、完成、取消), 不校验签名
+
+    服务器的fail_parts为{分片号: HTTP状态码}, 对应分片的下一次上传返回该错误
+    """
+    protocol_version = "HTTP/1.1"
+
+    def _parse(self):
+        url = urlparse(self.path)
+        # 路径形式: /<bucket>/<key>
+        key = url.path.split("/", 2)[2]
+        return key, {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _reply(self, status: int, body: bytes = b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("x-oss-request-id", uuid.uuid4().hex)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, code: str):
+        body = f"<?xml version=\"1.0\"?><Error><Code>{code}</Code><Message>{code}</Message></Error>".encode()
+        self._reply(status, body, {"Content-Type": "application/xml"})
+
+    def do_PUT(self):
+        server = self.server
+        key, query = self._parse()
+        body = self._read_body()
+        etag = '"%s"' % hashlib.md5(body).hexdigest().upper()
+        if "uploadId" not in query:
+            server.objects[key] = body
+            server.puts += 1
+            return self._reply(200, headers={"ETag": etag})
+        upload = server.uploads.get(query["uploadId"])
+        if upload is None:
+            return self._error(404, "NoSuchUpload")
+        number = int(query["partNumber"])
+        with server.lock:
+            status = server.fail_parts.pop(number, None)
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(server.part_delay)
+        with server.lock:
+            server.active -= 1
+        if status is not None:
+            return self._error(status, "InternalError" if status >= 500 else "AccessDenied")
+        upload[number] = body
+        server.part_uploads.append(number)
+        self._reply(200, headers={"ETag": etag})
+
+    def do_POST(self):
+        server = self.server
+        key, query = self._parse()
+        body = self._read_body()
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            server.uploads[upload_id] = {}
+            xml = (f"<InitiateMultipartUploadResult><Bucket>b</Bucket><Key>{key}</Key>"
+                   f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+            return self._reply(200, xml.encode(), {"Content-Type": "application/xml"})
+        upload = server.uploads.pop(query["uploadId"], None)
+        if upload is None:
+            return self._error(404, "NoSuchUpload")
+        numbers = [int(node.findtext("PartNumber")) for node in ElementTree.fromstring(body).findall("Part")]
+        server.objects[key] = b"".join(upload[number] for number in numbers)
+        xml = f"<CompleteMultipartUploadResult><Key>{key}</Key><ETag>\"x\"</ETag></CompleteMultipartUploadResult>"
+        self._reply(200, xml.encode(), {"Content-Type": "application/xml", "ETag": '"x"'})
+
+    def do_GET(self):
+        key, query = self._parse()
+        upload = self.server.uploads.get(query.get("uploadId"))
+        if upload is None:
+            return self._error(404, "NoSuchUpload")
+        parts = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><LastModified>2024-01-01T00:00:00.000Z</LastModified>"
+            f"<ETag>\"{hashlib.md5(data).hexdigest().upper()}\"</ETag><Size>{len(data)}</Size></Part>"
+            for number, data in sorted(upload.items())
+        )
+        xml = f"<ListPartsResult><IsTruncated>false</IsTruncated><NextPartNumberMarker>0</NextPartNumberMarker>{parts}</ListPartsResult>"
+        self._reply(200, xml.encode(), {"Content-Type": "application/xml"})
+
+    def do_DELETE(self):
+        key, query = self._parse()
+        self.server.uploads.pop(query.get("uploadId"), None)
+        self._reply(204)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def oss_stand_in(part_delay: float = 0.0, **upload_config):
+    """启动本地OSS替身, 并临时将OSS配置指向它"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OssHandler)
+    server.objects, server.uploads, server.fail_parts = {}, {}, {}
+    server.part_uploads, server.puts = [], 0
+    server.lock, server.active, server.peak, server.part_delay = threading.Lock(), 0, 0, part_delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    original_oss, original_upload = dict(OSS_CONFIG), dict(OSS_UPLOAD_CONFIG)
+    with tempfile.TemporaryDirectory() as directory:
+        OSS_CONFIG.update(endpoint=f"http://127.0.0.1:{server.server_address[1]}", bucket_name="drafts",
+                          access_key_id="id", access_key_secret="secret")
+        OSS_UPLOAD_CONFIG.update(checkpoint_dir=os.path.join(directory, "checkpoints"), **upload_config)
+        try:
+            yield server, directory
+        finally:
+            OSS_CONFIG.clear()
+            OSS_CONFIG.update(original_oss)
+            OSS_UPLOAD_CONFIG.clear()
+            OSS_UPLOAD_CONFIG.update(original_upload)
+            server.shutdown()
+
+
+def test_bucket_is_reused():
+    """同一配置的上传复用同一个Bucket对象"""
+    with oss_stand_in():
+        assert oss.get_bucket() is oss.get_bucket()
+
+
+def test_small_file_single_request():
+    """小于阈值的文件一次请求上传"""
+    with oss_stand_in(multipart_threshold=1024 * 1024) as (server, directory):
+        path = os.path.join(directory, "small.zip")
+        with open(path, "wb") as f:
+            f.write(b"zip" * 100)
+        url = oss.upload_to_oss(path)
+        assert "small.zip" in url
+        assert server.objects["small.zip"] == b"zip" * 100
+        assert server.puts == 1 and not server.part_uploads
+        assert not os.path.exists(path)
+
+
+def test_failed_upload_resumes_from_checkpoint():
+    """分片上传中断后, 再次上传只上传缺少的分片"""
+    data = os.urandom(1024 * 1024)
+    with oss_stand_in(multipart_threshold=100 * 1024, part_size=100 * 1024, num_threads=2) as (server, directory):
+        path = os.path.join(directory, "draft.zip")
+        with open(path, "wb") as f:
+            f.write(data)
+        # 403错误不会重试, 上传失败
+        server.fail_parts[6] = 403
+        try:
+            oss.upload_file(oss.get_bucket(), "draft.zip", path)
+            assert False, "upload should fail"
+        except oss2.exceptions.ServerError as e:
+            assert e.status == 403
+        first_run = list(server.part_uploads)
+        assert 6 not in first_run
+
+        oss.upload_file(oss.get_bucket(), "draft.zip", path)
+        assert server.objects["draft.zip"] == data
+        # 每个分片只成功上传一次
+        assert sorted(server.part_uploads) == list(range(1, 12))
+
+
+def test_transient_part_failure_is_retried():
+    """服务端5xx错误自动重试, 从断点继续"""
+    data = os.urandom(300 * 1024)
+    with oss_stand_in(multipart_threshold=100 * 1024, part_size=100 * 1024, num_threads=1) as (server, directory):
+        path = os.path.join(directory, "draft.zip")
+        with open(path, "wb") as f:
+            f.write(data)
+        server.fail_parts[2] = 503
+        oss.upload_file(oss.get_bucket(), "draft.zip", path)
+        assert server.objects["draft.zip"] == data
+        assert sorted(server.part_uploads) == [1, 2, 3]
+
+
+def test_stream_uploads_parts_concurrently():
+    """流式上传按分片并发上传, 内容与输入一致"""
+    data = os.urandom(1024 * 1024)
+    chunks = (data[offset:offset + 10_000] for offset in range(0, len(data), 10_000))
+    with oss_stand_in(part_delay=0.05, part_size=100 * 1024, num_threads=4) as (server, directory):
+        url = oss.upload_stream_to_oss("draft.zip", chunks)
+        assert "draft.zip" in url
+        assert server.objects["draft.zip"] == data
+        assert len(server.part_uploads) == 11
+        assert server.peak > 1
+        assert not server.uploads
+
+        oss.upload_stream_to_oss("small.zip", iter([b"a", b"b"]))
+        assert server.objects["small.zip"] == b"ab"
+
+
+if __name__ == "__main__":
+    test_bucket_is_reused()
+    test_small_file_single_request()
+    test_failed_upload_resumes_from_checkpoint()
+    test_transient_part_failure_is_retried()
+    test_stream_uploads_parts_concurrently()
+    print("🎉 OSS上传测试通过")
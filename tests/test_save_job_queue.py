@@ -0,0 +1,148 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+
+from save_job_queue import SaveJobQueue
+from save_task_cache import wait_for_task_update, TERMINAL_STATUSES
+from create_draft import create_draft
+from save_draft_impl import save_draft_impl
+
+
+def _blocked_queue():
+    """单worker队列, 第一个任务阻塞worker直到release被设置"""
+    queue = SaveJobQueue(workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker(job):
+        started.set()
+        release.wait(10)
+        return "blocker"
+
+    queue.submit("blocker", blocker)
+    started.wait(10)
+    return queue, release
+
+
+def test_priority_and_tenant_fairness():
+    """优先级高的任务先执行, 同优先级时租户轮流执行"""
+    queue, release = _blocked_queue()
+    order = []
+
+    def record(job):
+        order.append(job.task_id)
+        return job.task_id
+
+    for index in range(3):
+        queue.submit(f"a{index}", record, tenant="a")
+    queue.submit("b0", record, tenant="b")
+    queue.submit("urgent", record, priority=-1, tenant="a")
+    release.set()
+    assert queue.shutdown(timeout=10)
+
+    assert order[0] == "urgent"
+    # 租户b的任务不会排在租户a的所有任务之后
+    assert order.index("b0") < order.index("a2")
+
+
+def test_cancel_queued_and_running_jobs():
+    """排队中的任务直接取消, 运行中的任务在下一个检查点停止"""
+    queue, release = _blocked_queue()
+    ran = []
+    queued = queue.submit("queued", lambda job: ran.append(job.task_id))
+    assert queue.cancel("queued") is queued
+    assert queued.state == "cancelled"
+    release.set()
+
+    in_progress = threading.Event()
+
+    def long_save(job):
+        in_progress.set()
+        for _ in range(1000):
+            job.check_cancelled()
+            threading.Event().wait(0.01)
+        return "finished"
+
+    running = queue.submit("running", long_save)
+    in_progress.wait(10)
+    queue.cancel("running")
+    assert running.wait(10) is None
+    assert running.state == "cancelled"
+    assert ran == []
+    assert queue.cancel("unknown") is None
+    queue.shutdown(timeout=10)
+
+
+def test_duplicate_submission_returns_existing_job():
+    """同一task_id在排队中时重复提交返回同一个任务"""
+    queue, release = _blocked_queue()
+    first = queue.submit("same", lambda job: "done")
+    assert queue.submit("same", lambda job: "other") is first
+    release.set()
+    assert first.wait(10) == "done"
+    queue.shutdown(timeout=10)
+
+
+def test_submission_during_running_save_queues_follow_up():
+    """保存运行中时再次提交不复用该任务, 而是在其结束后再保存一次, 之后的提交复用这个后续任务"""
+    queue = SaveJobQueue(workers=1)
+    release = threading.Event()
+    started = threading.Event()
+    runs = []
+
+    def save(job):
+        runs.append(job)
+        started.set()
+        release.wait(10)
+        return f"save{len(runs)}"
+
+    first = queue.submit("draft", save)
+    started.wait(10)
+    follow_up = queue.submit("draft", save)
+    assert follow_up is not first and follow_up.state == "queued"
+    assert queue.submit("draft", save) is follow_up
+    assert queue.stats()["queued"] == 1
+    release.set()
+    assert first.wait(10) == "save1"
+    assert follow_up.wait(10) == "save2"
+    assert len(runs) == 2
+
+    release.clear()
+    started.clear()
+    running = queue.submit("draft", save)
+    started.wait(10)
+    pending = queue.submit("draft", save)
+    queue.cancel("draft")
+    assert pending.state == "cancelled"
+    release.set()
+    running.wait(10)
+    assert queue.shutdown(timeout=10)
+    assert len(runs) == 3
+
+
+def test_async_save_returns_task_id():
+    """异步保存立即返回task_id, 任务最终进入结束状态"""
+    _, draft_id = create_draft(width=1080, height=1920)
+    result = save_draft_impl(draft_id, is_async=True)
+    assert result["success"] and result["task_id"] == draft_id
+
+    version, status = 0, {}
+    for _ in range(100):
+        version, status = wait_for_task_update(draft_id, since_version=version, timeout=1)
+        if status["status"] in TERMINAL_STATUSES:
+            break
+    assert status["status"] in TERMINAL_STATUSES
+
+
+if __name__ == "__main__":
+    test_priority_and_tenant_fairness()
+    test_cancel_queued_and_running_jobs()
+    test_duplicate_submission_returns_existing_job()
+    test_submission_during_running_save_queues_follow_up()
+    test_async_save_returns_task_id()
+    print("🎉 保存队列测试通过")
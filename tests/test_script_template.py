@@ -0,0 +1,60 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import copy
+from unittest import mock
+
+import pyJianYingDraft as draft
+
+
+def test_template_is_shared_and_not_modified():
+    """新建草稿不再读取模板文件, 导出也不修改共享的模板内容"""
+    template_before = copy.deepcopy(draft.Script_file._template_content)
+
+    with mock.patch("builtins.open", side_effect=AssertionError("template must not be re-read")):
+        first = draft.Script_file(1080, 1920)
+        second = draft.Script_file(1920, 1080, fps=60)
+
+    first_json = json.loads(first.dumps())
+    second_json = json.loads(second.dumps())
+
+    assert first_json["canvas_config"]["width"] == 1080
+    assert second_json["canvas_config"]["width"] == 1920
+    assert second_json["fps"] == 60.0
+    # 模板中未被覆盖的字段原样导出
+    assert first_json["keyframes"] == template_before["keyframes"]
+    assert first.content == {} and second.content == {}
+    assert draft.Script_file._template_content == template_before
+
+
+def test_overrides_are_merged_on_dumps():
+    """草稿自身覆盖的字段优先于模板"""
+    script = draft.Script_file(1080, 1920)
+    script.content["name"] = "my draft"
+    assert json.loads(script.dumps())["name"] == "my draft"
+    assert draft.Script_file._template_content["name"] != "my draft"
+
+
+def test_modifying_export_leaves_template_intact():
+    """修改导出结果中的嵌套字段不会改动共享的模板, 也不影响其他草稿的导出"""
+    template_before = copy.deepcopy(draft.Script_file._template_content)
+    content = draft.Script_file(1080, 1920).export_content()
+    for key in draft.Script_file._template_nested_keys:
+        assert content[key] == template_before[key]
+    content["keyframes"]["videos"].append({"id": "added"})
+    content["config"]["modified"] = True
+
+    assert draft.Script_file._template_content == template_before
+    assert draft.Script_file(1080, 1920).export_content()["keyframes"] == template_before["keyframes"]
+
+
+if __name__ == "__main__":
+    test_template_is_shared_and_not_modified()
+    test_overrides_are_merged_on_dumps()
+    test_modifying_export_leaves_template_intact()
+    print("🎉 模板共享测试通过")
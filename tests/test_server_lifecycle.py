@@ -0,0 +1,188 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+
+import draft_cache
+import server_lifecycle
+import save_draft_impl
+from draft_backend import SQLiteDraftBackend
+from save_job_queue import SaveJobQueue, QueueFull
+from save_task_cache import (start_task, update_task_fields, get_task_status, wait_for_task_update,
+                             request_task_cancel, task_cancel_requested)
+import serve
+from serve import check_worker_model, gunicorn_options
+from settings.local import DRAFT_BACKEND_CONFIG, SERVER_CONFIG
+
+
+@contextmanager
+def shared_backend():
+    """临时使用本机多进程共享的SQLite后端"""
+    original = draft_cache.DRAFT_BACKEND
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "state.db")
+        draft_cache.DRAFT_BACKEND = SQLiteDraftBackend(db_path)
+        try:
+            yield db_path
+        finally:
+            draft_cache.DRAFT_BACKEND = original
+
+
+def _run_task_in_worker(db_path, task_id, started, release):
+    # 模拟另一个服务进程: 认领任务, 更新进度, 等待后完成
+    draft_cache.DRAFT_BACKEND = SQLiteDraftBackend(db_path)
+    assert start_task(task_id, status="queued", message="Waiting for a save worker")
+    update_task_fields(task_id, status="processing", progress=50)
+    started.set()
+    release.wait(10)
+    update_task_fields(task_id, status="completed", progress=100, draft_url="https://example.com/draft")
+
+
+def test_health_endpoints():
+    """健康检查始终返回200, 就绪检查在停止服务期间返回503"""
+    from capcut_server import app
+
+    client = app.test_client()
+    assert client.get("/healthz").status_code == 200
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.get_json()["output"]["draft_backend"] == "ok"
+
+    server_lifecycle._DRAINING.set()
+    try:
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.get_json()["output"]["draining"] is True
+    finally:
+        server_lifecycle._DRAINING.clear()
+
+
+def test_drain_waits_for_running_saves():
+    """停止服务时拒绝新的保存任务, 并等待执行中的保存完成"""
+    original = server_lifecycle.SAVE_QUEUE
+    queue = server_lifecycle.SAVE_QUEUE = SaveJobQueue(workers=1)
+    finished = []
+    try:
+        queue.submit("slow", lambda job: time.sleep(0.3) or finished.append("slow"))
+        assert server_lifecycle.drain(timeout=5)
+        assert finished == ["slow"]
+        assert not server_lifecycle.readiness()[0]
+        try:
+            queue.submit("late", lambda job: "")
+            assert False, "submit must fail while draining"
+        except QueueFull:
+            pass
+    finally:
+        server_lifecycle.SAVE_QUEUE = original
+        server_lifecycle._DRAINING.clear()
+
+
+def test_task_status_shared_between_processes():
+    """共享后端下, 任务状态、取消请求和任务归属在进程之间可见"""
+    task_id = "shared_task"
+    with shared_backend() as db_path:
+        context = multiprocessing.get_context("fork")
+        started, release = context.Event(), context.Event()
+        worker = context.Process(target=_run_task_in_worker, args=(db_path, task_id, started, release))
+        worker.start()
+        try:
+            assert started.wait(10)
+            status = get_task_status(task_id)
+            assert status["status"] == "processing" and status["progress"] == 50
+            # 另一个存活进程正在执行该任务, 本进程不能重复认领
+            assert not start_task(task_id, status="queued")
+            assert request_task_cancel(task_id)
+            assert task_cancel_requested(task_id)
+
+            version, _ = wait_for_task_update(task_id)
+            threading.Timer(0.2, release.set).start()
+            new_version, status = wait_for_task_update(task_id, since_version=version, timeout=5)
+            assert new_version > version
+            assert status["status"] == "completed" and status["draft_url"] == "https://example.com/draft"
+        finally:
+            release.set()
+            worker.join()
+        assert worker.exitcode == 0
+
+        # 任务结束后可以重新认领, 取消标记被清除
+        assert start_task(task_id, status="queued")
+        assert not task_cancel_requested(task_id)
+        update_task_fields(task_id, status="completed")
+
+
+def test_dead_owner_releases_task():
+    """认领任务的进程退出后, 未完成的任务可被其他进程接管, 等待该任务的请求不会一直挂起"""
+    with shared_backend():
+        backend = draft_cache.DRAFT_BACKEND
+        process = multiprocessing.get_context("fork").Process(target=lambda: None)
+        process.start()
+        process.join()
+        assert backend.claim_task("orphan", process.pid, {"status": "processing"})
+        assert start_task("orphan", status="queued")
+        assert get_task_status("orphan")["status"] == "queued"
+
+        # 等待其他进程保存结果的请求发现其已退出后, 接管并重新保存
+        assert backend.claim_task("abandoned", process.pid, {"status": "processing"})
+        queue = SaveJobQueue(workers=1)
+
+        def submit():
+            if not start_task("abandoned", status="queued"):
+                return None
+            return queue.submit("abandoned", lambda job: "https://example.com/taken-over")
+
+        original = save_draft_impl.OWNER_CHECK_SECONDS
+        save_draft_impl.OWNER_CHECK_SECONDS = 0.1
+        try:
+            assert save_draft_impl._wait_for_other_process("abandoned", submit) == "https://example.com/taken-over"
+        finally:
+            save_draft_impl.OWNER_CHECK_SECONDS = original
+        queue.shutdown(timeout=5)
+
+
+def test_worker_model_requires_shared_backend():
+    """多个worker进程必须使用共享的草稿状态后端"""
+    original = dict(DRAFT_BACKEND_CONFIG)
+    try:
+        DRAFT_BACKEND_CONFIG["type"] = "memory"
+        check_worker_model(1)
+        try:
+            check_worker_model(4)
+            assert False, "memory backend must be rejected for several workers"
+        except ValueError:
+            pass
+        DRAFT_BACKEND_CONFIG["type"] = "sqlite"
+        check_worker_model(4)
+    finally:
+        DRAFT_BACKEND_CONFIG.clear()
+        DRAFT_BACKEND_CONFIG.update(original)
+    options = gunicorn_options()
+    assert options["worker_class"] == "gthread"
+    assert options["graceful_timeout"] > 0 and callable(options["worker_exit"])
+
+    # worker退出时停止发送心跳, 等待保存完成的时间必须短于主进程判定超时的时间
+    original = dict(SERVER_CONFIG)
+    try:
+        SERVER_CONFIG.update(timeout=120, drain_timeout=300)
+        assert serve._worker_drain_timeout() < 120
+        SERVER_CONFIG.update(timeout=400)
+        assert serve._worker_drain_timeout() == 300
+    finally:
+        SERVER_CONFIG.clear()
+        SERVER_CONFIG.update(original)
+
+
+if __name__ == "__main__":
+    test_health_endpoints()
+    test_drain_waits_for_running_saves()
+    test_task_status_shared_between_processes()
+    test_dead_owner_releases_task()
+    test_worker_model_requires_shared_backend()
+    print("🎉 生产服务模式测试通过")
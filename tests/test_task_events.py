@@ -0,0 +1,127 @@
+#!/usr/bin/env python3.9
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import tempfile
+import threading
+
+import draft_cache
+from draft_backend import SQLiteDraftBackend
+from save_task_cache import create_task, update_task_fields, wait_for_task_update, get_task_version, get_task_status
+from capcut_server import app
+
+
+def test_wait_wakes_up_on_change():
+    """等待中的客户端在任务更新时立即被唤醒"""
+    task_id = "events_wait_task"
+    create_task(task_id)
+    version = get_task_version(task_id)
+
+    timer = threading.Timer(0.2, update_task_fields, args=(task_id,), kwargs={"progress": 42})
+    timer.start()
+    started = time.time()
+    new_version, status = wait_for_task_update(task_id, since_version=version, timeout=10)
+    assert time.time() - started < 5
+    assert new_version > version
+    assert status["progress"] == 42
+
+    # 没有新变化时超时返回原版本
+    same_version, _ = wait_for_task_update(task_id, since_version=new_version, timeout=0.1)
+    assert same_version == new_version
+
+
+def test_stream_pushes_progress_until_completed():
+    """SSE接口推送每次进度变化, 任务完成后结束"""
+    task_id = "events_stream_task"
+    create_task(task_id)
+
+    def progress():
+        for step in (30, 60):
+            time.sleep(0.1)
+            update_task_fields(task_id, status="processing", progress=step)
+        time.sleep(0.1)
+        update_task_fields(task_id, status="completed", progress=100)
+
+    threading.Thread(target=progress).start()
+    client = app.test_client()
+    response = client.get(f"/stream_draft_status?task_id={task_id}")
+    assert response.mimetype == "text/event-stream"
+
+    events = [json.loads(line[len("data: "):]) for line in response.get_data(as_text=True).splitlines()
+              if line.startswith("data: ")]
+    assert events[-1]["status"] == "completed"
+    assert [event["progress"] for event in events][-1] == 100
+    assert len(events) >= 2
+
+    # 无法解析的Last-Event-ID按0处理, 从当前状态开始推送
+    response = client.get(f"/stream_draft_status?task_id={task_id}", headers={"Last-Event-ID": "not-a-version"})
+    assert response.status_code == 200
+    assert '"status": "completed"' in response.get_data(as_text=True)
+
+
+def test_long_poll_returns_version():
+    """长轮询返回版本号, 下次请求可携带版本等待新变化"""
+    task_id = "events_poll_task"
+    create_task(task_id)
+    client = app.test_client()
+    first = client.post("/query_draft_status", json={"task_id": task_id}).get_json()
+    assert first["success"]
+
+    threading.Timer(0.1, update_task_fields, args=(task_id,), kwargs={"progress": 7}).start()
+    second = client.post("/query_draft_status",
+                         json={"task_id": task_id, "version": first["version"], "wait": 10}).get_json()
+    assert second["version"] > first["version"]
+    assert second["output"]["progress"] == 7
+
+
+class _SlowBackend(SQLiteDraftBackend):
+    """写入指定任务的状态时阻塞, 模拟繁忙的数据库"""
+
+    def __init__(self, path, slow_task):
+        super().__init__(path)
+        self.slow_task = slow_task
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def store_task(self, task_id, status):
+        if task_id == self.slow_task:
+            self.writing.set()
+            self.release.wait(10)
+        return super().store_task(task_id, status)
+
+
+def test_shared_backend_writes_do_not_block_other_tasks():
+    """共享后端下, 一个任务的状态写入较慢时不影响其他任务的更新、查询和等待"""
+    original = draft_cache.DRAFT_BACKEND
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = draft_cache.DRAFT_BACKEND = _SlowBackend(os.path.join(tmp, "state.db"), "events_slow_task")
+        try:
+            writer = threading.Thread(target=update_task_fields, args=("events_slow_task",), kwargs={"progress": 1})
+            writer.start()
+            assert backend.writing.wait(5)
+
+            started = time.time()
+            create_task("events_fast_task")
+            version = get_task_version("events_fast_task")
+            threading.Timer(0.1, update_task_fields, args=("events_fast_task",), kwargs={"progress": 5}).start()
+            new_version, status = wait_for_task_update("events_fast_task", since_version=version, timeout=5)
+            assert new_version > version and status["progress"] == 5
+            assert get_task_status("events_fast_task")["progress"] == 5
+            assert time.time() - started < 2
+        finally:
+            backend.release.set()
+            writer.join()
+            draft_cache.DRAFT_BACKEND = original
+
+
+if __name__ == "__main__":
+    test_wait_wakes_up_on_change()
+    test_stream_pushes_progress_until_completed()
+    test_long_poll_returns_version()
+    test_shared_backend_writes_do_not_block_other_tasks()
+    print("🎉 任务事件测试通过")
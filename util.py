@@ -1,4 +1,6 @@
+import os
 import shutil
+import zipfile
 import subprocess
 import json
 import re
@@ -27,23 +29,101 @@ def is_windows_path(path):
     return re.match(r'^[a-zA-Z]:\\|\\\\', path) is not None
 
 
+# Extensions of media that is already compressed (or barely compressible), stored in draft
+# archives as is instead of being deflated again
+STORED_EXTENSIONS = frozenset({
+    ".mp4", ".mov", ".m4v", ".mkv", ".webm", ".avi", ".flv",
+    ".mp3", ".m4a", ".aac", ".ogg", ".opus", ".flac", ".wav",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".heic",
+    ".zip", ".gz", ".7z",
+})
+
+# Read size when copying draft files into an archive
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+def zip_compression(path):
+    """Zip compression method for a file: stored for compressed media, deflate for everything else (JSON...)"""
+    return zipfile.ZIP_STORED if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+class _ZipStreamBuffer:
+    """Write-only, unseekable file object collecting the bytes ZipFile produces between two drains"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _write_draft_entries(zipf, draft_name, chunk_size):
+    """Add the files of a draft folder to an open ZipFile, yielding after every chunk written
+
+    Entries are named relative to the folder (the archive holds its contents, not the folder itself).
+    """
+    for root, dirs, files in os.walk(draft_name):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            zinfo = zipfile.ZipInfo.from_file(file_path, os.path.relpath(file_path, draft_name))
+            zinfo.compress_type = zip_compression(file_path)
+            with open(file_path, "rb") as src, zipf.open(zinfo, "w") as dest:
+                for block in iter(lambda: src.read(chunk_size), b""):
+                    dest.write(block)
+                    yield
+
+
+def write_draft_zip(draft_name, fileobj, chunk_size=ZIP_CHUNK_SIZE):
+    """Write the zip archive of a draft folder to a file object (seekable or not)"""
+    with zipfile.ZipFile(fileobj, "w") as zipf:
+        for _ in _write_draft_entries(zipf, draft_name, chunk_size):
+            pass
+
+
+def stream_draft_zip(draft_name, chunk_size=ZIP_CHUNK_SIZE):
+    """Generate the zip archive of a draft folder as it is built, without writing it to disk
+
+    Suitable as the body of an upload or a streamed HTTP response; memory use is bounded by
+    about `chunk_size` whatever the size of the media.
+
+    :param draft_name: Draft folder
+    :param chunk_size: Read size of the draft files
+    :return: Iterator of archive bytes
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, "w") as zipf:
+        for _ in _write_draft_entries(zipf, draft_name, chunk_size):
+            data = buffer.drain()
+            if data:
+                yield data
+    # Central directory, written when the archive is closed
+    data = buffer.drain()
+    if data:
+        yield data
+
+
 def zip_draft(draft_name):
     # Compress folder contents directly (not the folder itself)
     zip_path = f"./tmp/zip/{draft_name}.zip"
     
     # Ensure tmp/zip directory exists
-    import os
     os.makedirs("./tmp/zip", exist_ok=True)
     
-    # Create zip file with folder contents, not the folder itself
-    import zipfile
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(draft_name):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Add file to zip with relative path (without draft_name prefix)
-                arcname = os.path.relpath(file_path, draft_name)
-                zipf.write(file_path, arcname)
+    # Write next to the target and rename, so the previous archive stays readable meanwhile
+    tmp_path = f"{zip_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write_draft_zip(draft_name, f)
+    os.replace(tmp_path, zip_path)
     
     return zip_path
 